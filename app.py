@@ -1,22 +1,39 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, UploadFile, File
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 import logging
-import json
-import io
+
+from batching import MICROBATCH_ENABLED, MicroBatcher
+from executor import BULK_WORKERS, SINGLE_WORKERS, InferenceExecutor
+from featurizer import CompiledFeaturizer
+from lookup import LOOKUP_TABLES_ENABLED, LookupTable
+from memory_budget import MemoryBudgetExceeded, get_memory_budget
+from metrics import CONTENT_TYPE, MODEL_SECONDS, REQUEST_ROWS, STAGE_SECONDS, MetricsMiddleware, render_metrics
+from model_registry import MODEL_ADMIN_TOKEN, ModelRegistry, admin_authorized, warmup_frame
+from model_store import ModelHandle, process_memory, startup_report
+from prediction_sink import debug_sample, get_prediction_sink
+from rollups import record_scores
+from responses import GZIP_LEVEL, GZIP_MIN_BYTES, encode_results, negotiate_format, results_response
+from streaming import iter_upload_chunks, stream_predictions
+from uploads import UploadSource, detect_upload_format, read_upload, upload_source
+from tree_ensemble import TreePredictor
+from validation import ATTRITION_RULES, EMPLOYEE_COLUMNS, UPLOAD_COLUMNS, validate_frame, validate_record
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-prediction_logger = logging.getLogger("predictions")
-prediction_handler = logging.FileHandler("predictions.log")
-prediction_handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
-prediction_logger.addHandler(prediction_handler)
-prediction_logger.setLevel(logging.INFO)
+# Prediction records go through a queue-backed background writer
+prediction_sink = get_prediction_sink()
+
+# Whole-file uploads are admitted against the process's bulk memory budget
+bulk_memory = get_memory_budget()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,14 +51,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load the attrition model
-try:
-    logger.info("Loading attrition model...")
-    attrition_model = joblib.load("attrition_model.pkl")
-    logger.info(f"Attrition model loaded. Expects {attrition_model.n_features_in_} features.")
-except Exception as e:
-    logger.error(f"Error loading attrition model: {str(e)}")
-    raise Exception(f"Error loading attrition model: {str(e)}")
+# Compress large bulk responses for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+# Per-route latency, status and in-flight gauges for /metrics
+app.add_middleware(MetricsMiddleware)
+
+ATTRITION_MODEL_PATH = "attrition_model.pkl"
+ATTRITION_FEATURES = ["JobSatisfaction", "WorkLifeBalance", "OverTime"]
+OVERTIME_MAP = {"Yes": 1, "No": 0}
+
+# Separate pools keep single-record latency low while bulk uploads are being scored
+single_executor = InferenceExecutor("single", SINGLE_WORKERS, preload=[__name__])
+bulk_executor = InferenceExecutor("bulk", BULK_WORKERS, preload=[__name__])
 
 # Define input data model
 class EmployeeData(BaseModel):
@@ -67,159 +89,248 @@ async def root():
 
 # Preprocessing function
 def preprocess_data(data: pd.DataFrame, categorical_columns: List[str]) -> pd.DataFrame:
-    """Preprocess categorical columns into numeric format."""
-    data = data.copy()
+    """Preprocess categorical columns into numeric format.
+
+    The result shares every other column with `data`; only the mapped column is new.
+    """
+    data = data.copy(deep=False)
     if "OverTime" in data.columns:
-        data["OverTime"] = data["OverTime"].map({"Yes": 1, "No": 0})
+        # Plain numbers even when OverTime arrives as a categorical
+        data["OverTime"] = np.asarray(data["OverTime"].map(OVERTIME_MAP))
     return data
 
-def preprocess_and_predict(data: pd.DataFrame, model, features: List[str]) -> tuple:
+def preprocess_and_predict(data: pd.DataFrame, model, features: List[str], name: str = "attrition") -> tuple:
     """Preprocess data and predict using the model."""
     try:
-        X = data.reindex(columns=features, fill_value=0)
-        predictions = model.predict(X)
-        probabilities = model.predict_proba(X) if hasattr(model, "predict_proba") else None
+        with MODEL_SECONDS.time(name, "reindex"):
+            X = data.reindex(columns=features, fill_value=0)
+        with MODEL_SECONDS.time(name, "predict"):
+            predictions = model.predict(X)
+        with MODEL_SECONDS.time(name, "predict_proba"):
+            probabilities = model.predict_proba(X) if hasattr(model, "predict_proba") else None
         return predictions, probabilities
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+# Same features as preprocess_data + reindex, built straight from request dicts without pandas
+attrition_featurizer = CompiledFeaturizer.from_value_maps(ATTRITION_FEATURES, {"OverTime": OVERTIME_MAP}, fill_value=0)
+
+class AttritionModel:
+    """The attrition forest with its flattened trees and lookup table."""
+
+    def __init__(self, model, flat_trees=None):
+        self.model = model
+        self.trees = TreePredictor(model, flat=flat_trees)
+        # The model only reads three Likert/Yes-No inputs, so every valid combination is scored once up front
+        self.lookup = LookupTable.build(ATTRITION_FEATURES, ATTRITION_RULES, self.predict_model_records) if LOOKUP_TABLES_ENABLED else None
+
+    def predict_frame(self, data: pd.DataFrame) -> tuple:
+        """Preprocess raw employee rows and run the attrition model."""
+        categorical_columns = ["OverTime"]
+        data = preprocess_data(data, categorical_columns)
+        return preprocess_and_predict(data, self.model, ATTRITION_FEATURES)
+
+    def predict_model_records(self, records: List[Dict]) -> tuple:
+        """Compiled featurizer, then one predict_proba call."""
+        with MODEL_SECONDS.time("attrition", "featurize"):
+            X = attrition_featurizer.transform_records(records)
+        with MODEL_SECONDS.time("attrition", "predict_proba"):
+            probabilities = self.trees.predict_proba(X)
+        # Same arg-max RandomForestClassifier.predict uses, without a second pass over the trees
+        predictions = self.model.classes_.take(np.argmax(probabilities, axis=1))
+        return predictions, probabilities
+
+    def predict_records(self, records: List[Dict]) -> tuple:
+        """Hot path for single-record requests: table lookup, or the model for out-of-domain rows."""
+        if self.lookup is not None:
+            with MODEL_SECONDS.time("attrition", "lookup"):
+                return self.lookup.predict_records(records, self.predict_model_records)
+        return self.predict_model_records(records)
+
+def warm_up_attrition(model: AttritionModel) -> None:
+    """Run sample rows through every prediction path before the model takes traffic."""
+    sample = warmup_frame(EMPLOYEE_COLUMNS)
+    if sample is None:
+        return
+    records = sample.to_dict("records")
+    model.predict_model_records(records[:1])
+    model.predict_records(records)
+    model.predict_frame(sample)
+
+# Load the attrition model
+try:
+    logger.info("Loading attrition model...")
+    attrition = ModelHandle("attrition", ATTRITION_MODEL_PATH, build=AttritionModel, warmup=warm_up_attrition)
+    if attrition.loaded:
+        logger.info(f"Attrition model loaded. Expects {attrition.get().model.n_features_in_} features.")
+except Exception as e:
+    logger.error(f"Error loading attrition model: {str(e)}")
+    raise Exception(f"Error loading attrition model: {str(e)}")
+
+# Replaced artifacts are reloaded, warmed up and swapped in without a restart
+model_registry = ModelRegistry([attrition])
+model_registry.start()
+
+def predict_attrition_frame(raw_data: pd.DataFrame) -> tuple:
+    """Attrition (predictions, probabilities) for validated raw employee rows."""
+    model = attrition.get()
+    if model.lookup is not None:
+        with MODEL_SECONDS.time("attrition", "lookup"):
+            return model.lookup.predict_frame(raw_data, model.predict_frame)
+    return model.predict_frame(raw_data)
+
+def predict_attrition_records(records: List[Dict]) -> tuple:
+    return attrition.get().predict_records(records)
+
+attrition_batcher = MicroBatcher("attrition", predict_attrition_records, single_executor) if MICROBATCH_ENABLED else None
+
+@app.get("/executor_stats")
+async def executor_stats():
+    return {
+        "executors": [single_executor.stats(), bulk_executor.stats()],
+        "memory_budget": bulk_memory.stats(),
+        "batchers": [attrition_batcher.stats()] if attrition_batcher is not None else [],
+        "lookup_tables": [attrition.get().lookup.stats()] if attrition.loaded and attrition.get().lookup is not None else []
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/model_stats")
+async def model_stats():
+    return {"startup": startup, "registry": model_registry.stats(), "memory": process_memory()}
+
+@app.post("/models/{name}/reload")
+async def reload_model(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Reload a model from its configured artifact and swap it in, in this worker process only.
+
+    Requires the HR_ADMIN_TOKEN value in the X-Admin-Token header. To roll out a model,
+    replace its artifact in place: every worker's watcher reloads it within
+    HR_MODEL_RELOAD_POLL_SECONDS, and this endpoint only skips the wait for the worker
+    that answers it.
+    """
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model reload over HTTP is disabled; set HR_ADMIN_TOKEN to enable it.")
+    if not admin_authorized(x_admin_token):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token header.")
+    if name not in model_registry.handles:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}. Use one of {list(model_registry.handles)}.")
+    result = await run_in_threadpool(model_registry.reload, name)
+    if not result["reloaded"]:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version {result['version']}: {result['last_error']}")
+    return result
+
 # Single attrition prediction endpoint
 @app.post("/predict_attrition")
 async def predict_attrition(employee: EmployeeData) -> Dict[str, float]:
     try:
         logger.info("Received request for attrition prediction.")
-        logger.info(f"Input data: {employee.model_dump()}")
+        debug_sample(logger, lambda: f"Input data: {employee.model_dump()}")
 
         # Input validation
-        if employee.JobSatisfaction < 1 or employee.JobSatisfaction > 5:
-            raise HTTPException(status_code=400, detail="JobSatisfaction must be between 1 and 5.")
-        if employee.WorkLifeBalance < 1 or employee.WorkLifeBalance > 5:
-            raise HTTPException(status_code=400, detail="WorkLifeBalance must be between 1 and 5.")
-        if employee.JobInvolvement < 1 or employee.JobInvolvement > 5:
-            raise HTTPException(status_code=400, detail="JobInvolvement must be between 1 and 5.")
-        if employee.EnvironmentSatisfaction < 1 or employee.EnvironmentSatisfaction > 5:
-            raise HTTPException(status_code=400, detail="EnvironmentSatisfaction must be between 1 and 5.")
-        if employee.RelationshipSatisfaction < 1 or employee.RelationshipSatisfaction > 5:
-            raise HTTPException(status_code=400, detail="RelationshipSatisfaction must be between 1 and 5.")
-        if employee.OverTime not in ["Yes", "No"]:
-            raise HTTPException(status_code=400, detail="OverTime must be 'Yes' or 'No'.")
-        if employee.Age < 18 or employee.Age > 100:
-            raise HTTPException(status_code=400, detail="Age must be between 18 and 100.")
-        if employee.MonthlyIncome <= 0:
-            raise HTTPException(status_code=400, detail="MonthlyIncome must be greater than 0.")
-        if employee.YearsAtCompany < 0:
-            raise HTTPException(status_code=400, detail="YearsAtCompany cannot be negative.")
-        if employee.TotalWorkingYears < 0:
-            raise HTTPException(status_code=400, detail="TotalWorkingYears cannot be negative.")
-        if employee.TrainingTimesLastYear < 0:
-            raise HTTPException(status_code=400, detail="TrainingTimesLastYear cannot be negative.")
-        if employee.Gender not in ["Male", "Female"]:
-            raise HTTPException(status_code=400, detail="Gender must be 'Male' or 'Female'.")
-
-        # Convert to DataFrame and preprocess
-        data = pd.DataFrame([employee.model_dump()])
-        categorical_columns = ["OverTime"]
-        data = preprocess_data(data, categorical_columns)
+        with STAGE_SECONDS.time("predict_attrition", "validate"):
+            errors = validate_record(employee.model_dump(), ATTRITION_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
 
-        # Select features
-        attrition_features = ["JobSatisfaction", "WorkLifeBalance", "OverTime"]
-        prediction, probs = preprocess_and_predict(data, attrition_model, attrition_features)
+        # Featurize and predict off the event loop
+        with STAGE_SECONDS.time("predict_attrition", "predict"):
+            if attrition_batcher is not None:
+                prediction, probs = await attrition_batcher.submit(employee.model_dump())
+            else:
+                prediction, probs = await single_executor.run(predict_attrition_records, [employee.model_dump()])
         probability = float(probs[0][1]) if probs is not None else 0.0
 
         # Log prediction
-        prediction_log = {
-            "endpoint": "predict_attrition",
-            "input": employee.model_dump(),
-            "prediction": {"AttritionRisk": float(prediction[0]), "AttritionRiskProbability": probability}
-        }
-        prediction_logger.info(json.dumps(prediction_log))
+        with STAGE_SECONDS.time("predict_attrition", "log"):
+            prediction_sink.write(
+                "predict_attrition",
+                [employee.model_dump()],
+                [{"AttritionRisk": float(prediction[0]), "AttritionRiskProbability": probability}]
+            )
+        REQUEST_ROWS.observe(1, "predict_attrition")
 
         return {
             "AttritionRisk": float(prediction[0]),
             "AttritionRiskProbability": probability
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error predicting attrition: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting attrition: {str(e)}")
 
+def score_attrition_frame(data: pd.DataFrame, endpoint: str = "predict_attrition_bulk") -> pd.DataFrame:
+    """Validate, predict and log attrition for a frame of employees, one result column per output."""
+    missing_columns = [col for col in EMPLOYEE_COLUMNS if col not in data.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+
+    # Input validation
+    with STAGE_SECONDS.time(endpoint, "validate"):
+        report = validate_frame(data, ATTRITION_RULES)
+    if not report.ok:
+        logger.info(f"Validation failed with {report.total_violations} violations: {report.counts}")
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    # Predict; OverTime is mapped inside the model call, and the rows are logged as uploaded
+    with STAGE_SECONDS.time(endpoint, "predict"):
+        predictions, probs = predict_attrition_frame(data)
+
+    # Prepare response
+    with STAGE_SECONDS.time(endpoint, "build_results"):
+        results = pd.DataFrame({
+            "EmployeeIndex": data.index.to_numpy(dtype=np.int64),
+            "AttritionRisk": np.asarray(predictions, dtype=np.float64),
+            "AttritionRiskProbability": probs[:, 1].astype(np.float64) if probs is not None else 0.0,
+        })
+
+    # Rows are converted to log records in the sink's writer thread
+    with STAGE_SECONDS.time(endpoint, "log"):
+        prediction_sink.write(endpoint, data, results)
+
+    with STAGE_SECONDS.time(endpoint, "rollup"):
+        record_scores(data, results)
+
+    return results
+
+def score_attrition_upload(source: UploadSource, output_format: str = "json", input_format: str = "csv") -> tuple:
+    """Parse an uploaded CSV, Parquet or Arrow file, score it and encode the results; runs on the bulk executor."""
+    with STAGE_SECONDS.time("predict_attrition_bulk", f"parse_{input_format}"):
+        data = read_upload(source, input_format, UPLOAD_COLUMNS)
+    logger.info(f"{input_format.upper()} data loaded with {len(data)} rows.")
+    results = score_attrition_frame(data)
+    with STAGE_SECONDS.time("predict_attrition_bulk", "serialize"):
+        return len(results), encode_results(results, output_format)
+
 # Bulk attrition prediction endpoint
 @app.post("/predict_attrition_bulk")
-async def predict_attrition_bulk(file: UploadFile = File(...)) -> Dict[str, List]:
+async def predict_attrition_bulk(file: UploadFile = File(...), stream: Optional[str] = None, accept: Optional[str] = Header(None)) -> Dict[str, List]:
+    # JSON rows by default; columnar JSON, Arrow IPC or CSV when the Accept header asks for them
+    output_format = negotiate_format(accept)
     try:
         logger.info("Received request for bulk attrition prediction.")
-        
-        contents = await file.read()
-        data = pd.read_csv(io.BytesIO(contents))
-        logger.info(f"CSV data loaded with {len(data)} rows.")
-
-        required_columns = [
-            "Age", "Gender", "Department", "JobRole", "MonthlyIncome", "YearsAtCompany",
-            "OverTime", "JobSatisfaction", "WorkLifeBalance", "TotalWorkingYears",
-            "TrainingTimesLastYear", "JobInvolvement", "EnvironmentSatisfaction",
-            "RelationshipSatisfaction"
-        ]
-        missing_columns = [col for col in required_columns if col not in data.columns]
-        if missing_columns:
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
 
-        # Input validation
-        validation_errors = []
-        for idx, row in data.iterrows():
-            if not pd.isna(row["JobSatisfaction"]) and (row["JobSatisfaction"] < 1 or row["JobSatisfaction"] > 5):
-                validation_errors.append(f"Row {idx}: JobSatisfaction must be between 1 and 5.")
-            if not pd.isna(row["WorkLifeBalance"]) and (row["WorkLifeBalance"] < 1 or row["WorkLifeBalance"] > 5):
-                validation_errors.append(f"Row {idx}: WorkLifeBalance must be between 1 and 5.")
-            if not pd.isna(row["JobInvolvement"]) and (row["JobInvolvement"] < 1 or row["JobInvolvement"] > 5):
-                validation_errors.append(f"Row {idx}: JobInvolvement must be between 1 and 5.")
-            if not pd.isna(row["EnvironmentSatisfaction"]) and (row["EnvironmentSatisfaction"] < 1 or row["EnvironmentSatisfaction"] > 5):
-                validation_errors.append(f"Row {idx}: EnvironmentSatisfaction must be between 1 and 5.")
-            if not pd.isna(row["RelationshipSatisfaction"]) and (row["RelationshipSatisfaction"] < 1 or row["RelationshipSatisfaction"] > 5):
-                validation_errors.append(f"Row {idx}: RelationshipSatisfaction must be between 1 and 5.")
-            if row["OverTime"] not in ["Yes", "No"]:
-                validation_errors.append(f"Row {idx}: OverTime must be 'Yes' or 'No'.")
-            if not pd.isna(row["Age"]) and (row["Age"] < 18 or row["Age"] > 100):
-                validation_errors.append(f"Row {idx}: Age must be between 18 and 100.")
-            if not pd.isna(row["MonthlyIncome"]) and row["MonthlyIncome"] <= 0:
-                validation_errors.append(f"Row {idx}: MonthlyIncome must be greater than 0.")
-            if not pd.isna(row["YearsAtCompany"]) and row["YearsAtCompany"] < 0:
-                validation_errors.append(f"Row {idx}: YearsAtCompany cannot be negative.")
-            if not pd.isna(row["TotalWorkingYears"]) and row["TotalWorkingYears"] < 0:
-                validation_errors.append(f"Row {idx}: TotalWorkingYears cannot be negative.")
-            if not pd.isna(row["TrainingTimesLastYear"]) and row["TrainingTimesLastYear"] < 0:
-                validation_errors.append(f"Row {idx}: TrainingTimesLastYear cannot be negative.")
-            if row["Gender"] not in ["Male", "Female"]:
-                validation_errors.append(f"Row {idx}: Gender must be 'Male' or 'Female'.")
-        if validation_errors:
-            raise HTTPException(status_code=400, detail=validation_errors[:10])
-
-        # Preprocess
-        categorical_columns = ["OverTime"]
-        data = preprocess_data(data, categorical_columns)
+        input_format = await detect_upload_format(file)
+
+        # Streaming mode: score the upload chunk by chunk and stream NDJSON or CSV back
+        if stream:
+            chunks = iter_upload_chunks(file, input_format=input_format, columns=UPLOAD_COLUMNS)
+            return await stream_predictions(chunks, score_attrition_frame, stream, bulk_executor, endpoint="predict_attrition_bulk", input_format=input_format)
 
-        # Predict
-        attrition_features = ["JobSatisfaction", "WorkLifeBalance", "OverTime"]
-        predictions, probs = preprocess_and_predict(data, attrition_model, attrition_features)
-
-        # Prepare response
-        results = [
-            {
-                "EmployeeIndex": int(idx),
-                "AttritionRisk": float(pred),
-                "AttritionRiskProbability": float(prob[1]) if probs is not None else 0.0
-            }
-            for idx, (pred, prob) in enumerate(zip(predictions, probs if probs is not None else [None] * len(predictions)))
-        ]
-
-        for result, row in zip(results, data.to_dict("records")):
-            prediction_log = {
-                "endpoint": "predict_attrition_bulk",
-                "input": row,
-                "prediction": result
-            }
-            prediction_logger.info(json.dumps(prediction_log))
-
-        return {"predictions": results}
+        with STAGE_SECONDS.time("predict_attrition_bulk", "read_upload"):
+            source = await upload_source(file, bulk_executor)
+        async with bulk_memory.reserve_upload(source, input_format, "predict_attrition_bulk"):
+            rows, body = await bulk_executor.run(score_attrition_upload, source, output_format, input_format)
+        REQUEST_ROWS.observe(rows, "predict_attrition_bulk")
+        return results_response(body, output_format)
+    except HTTPException:
+        raise
+    except MemoryBudgetExceeded as e:
+        logger.warning(f"Rejected bulk attrition prediction: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as ve:
         logger.error(f"ValueError in bulk attrition prediction: {str(ve)}")
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(ve)}")
@@ -227,6 +338,8 @@ async def predict_attrition_bulk(file: UploadFile = File(...)) -> Dict[str, List
         logger.error(f"Error predicting bulk attrition: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting bulk attrition: {str(e)}")
 
+startup = startup_report("Attrition API", [attrition])
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
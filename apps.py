@@ -1,24 +1,45 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, UploadFile, File
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
+from functools import partial
 import logging
-import json
-import io
-import joblib
 import numpy as np
 from sklearn.pipeline import Pipeline
 
+from batching import MICROBATCH_ENABLED, MicroBatcher
+from executor import BULK_WORKERS, SINGLE_WORKERS, InferenceExecutor
+from explain import EXPLAIN_METHODS, EXPLAIN_TOP_K, ContributionExplainer, top_contributions
+from featurizer import CompiledFeaturizer
+from lookup import LOOKUP_TABLES_ENABLED, LookupTable
+from memory_budget import MemoryBudgetExceeded, get_memory_budget
+from metrics import CONTENT_TYPE, MODEL_SECONDS, REQUEST_ROWS, STAGE_SECONDS, MetricsMiddleware, render_metrics
+from model_registry import MODEL_ADMIN_TOKEN, ModelRegistry, admin_authorized, warmup_frame
+from model_store import ModelHandle, process_memory, startup_report
+from prediction_sink import debug_sample, get_prediction_sink
+from rollups import record_scores
+from responses import GZIP_LEVEL, GZIP_MIN_BYTES, encode_results, negotiate_format, results_response
+from streaming import iter_upload_chunks, stream_predictions
+from uploads import UploadSource, detect_upload_format, read_upload, upload_source
+from tree_ensemble import TreePredictor
+from validation import (
+    EMPLOYEE_COLUMNS, PERFORMANCE_RULES, RATING_RULES, RETENTION_INPUT_RULES, RETENTION_RULES, UPLOAD_COLUMNS,
+    validate_frame, validate_record
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-prediction_logger = logging.getLogger("predictions")
-prediction_handler = logging.FileHandler("predictions.log")
-prediction_handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
-prediction_logger.addHandler(prediction_handler)
-prediction_logger.setLevel(logging.INFO)
+# Prediction records go through a queue-backed background writer
+prediction_sink = get_prediction_sink()
+
+# Whole-file uploads are admitted against the process's bulk memory budget
+bulk_memory = get_memory_budget()
 
 app = FastAPI(
     title="HR Analytics API (Performance & Retention)",
@@ -34,30 +55,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large bulk responses for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+# Per-route latency, status and in-flight gauges for /metrics
+app.add_middleware(MetricsMiddleware)
+
 PERFORMANCE_MODEL_PATH = "performance_model.pkl"
 RETENTION_MODEL_PATH = "retention_model.pkl"
 
-try:
-    logger.info("Loading performance model...")
-    performance_model = joblib.load(PERFORMANCE_MODEL_PATH)
-    logger.info(f"Performance model loaded. Expects {performance_model.n_features_in_} features.")
-    if hasattr(performance_model, "feature_names_in_"):
-        logger.info(f"Performance model expected features: {list(performance_model.feature_names_in_)}")
-    if isinstance(performance_model, Pipeline):
-        logger.info(f"Pipeline steps: {performance_model.steps}")
-except Exception as e:
-    logger.error(f"Error loading performance model: {str(e)}")
-    raise Exception(f"Error loading performance model: {str(e)}")
-
-try:
-    logger.info("Loading retention model...")
-    retention_model = joblib.load(RETENTION_MODEL_PATH)
-    logger.info(f"Retention model loaded. Expects {retention_model.n_features_in_} features.")
-    if hasattr(retention_model, "feature_names_in_"):
-        logger.info(f"Retention model expected features: {list(retention_model.feature_names_in_)}")
-except Exception as e:
-    logger.error(f"Error loading retention model: {str(e)}")
-    raise Exception(f"Error loading retention model: {str(e)}")
+# Separate pools keep single-record latency low while bulk uploads are being scored
+single_executor = InferenceExecutor("single", SINGLE_WORKERS, preload=[__name__])
+bulk_executor = InferenceExecutor("bulk", BULK_WORKERS, preload=[__name__])
 
 class EmployeeDataPerformance(BaseModel):
     Age: Union[float, int]
@@ -88,15 +97,18 @@ async def root():
     return {"message": "Welcome to the HR Analytics API (Performance & Retention)."}
 
 def preprocess_data(data: pd.DataFrame) -> pd.DataFrame:
-    logger.info(f"Raw input passed to model: {data.to_dict(orient='records')}")
+    debug_sample(logger, lambda: f"Raw input passed to model: {data.to_dict(orient='records')}")
     return data
 
-def preprocess_and_predict(data: pd.DataFrame, model, expected_features: List[str]) -> tuple:
+def preprocess_and_predict(data: pd.DataFrame, model, expected_features: List[str], name: str = "performance") -> tuple:
     try:
-        X = data.reindex(columns=expected_features)
-        logger.info(f"Data for prediction: {X.to_dict(orient='records')}")
-        predictions = model.predict(X)
-        probabilities = model.predict_proba(X) if hasattr(model, "predict_proba") else None
+        with MODEL_SECONDS.time(name, "reindex"):
+            X = data.reindex(columns=expected_features)
+        debug_sample(logger, lambda: f"Data for prediction: {X.to_dict(orient='records')}")
+        with MODEL_SECONDS.time(name, "predict"):
+            predictions = model.predict(X)
+        with MODEL_SECONDS.time(name, "predict_proba"):
+            probabilities = model.predict_proba(X) if hasattr(model, "predict_proba") else None
         return predictions, probabilities
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
@@ -108,127 +120,466 @@ def preprocess_and_predict(data: pd.DataFrame, model, expected_features: List[st
             probabilities = final_estimator.predict_proba(X_array) if hasattr(final_estimator, "predict_proba") else None
             return predictions, probabilities
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+class PerformanceModel:
+    """The performance pipeline with its compiled featurizer and flattened booster."""
+
+    def __init__(self, model, flat_trees=None):
+        self.model = model
+        self.features = list(model.feature_names_in_)
+        self.featurizer, self.estimator = CompiledFeaturizer.from_pipeline(model)
+        self.trees = TreePredictor(self.estimator, flat=flat_trees)
+        self.explainer = ContributionExplainer(self.featurizer, self.estimator)
+
+    def predict_records(self, records: List[Dict]) -> tuple:
+        """Return (raw performance class, class probabilities) for request dicts."""
+        with MODEL_SECONDS.time("performance", "featurize"):
+            X = self.featurizer.transform_records(records)
+        with MODEL_SECONDS.time("performance", "predict_proba"):
+            probabilities = self.trees.predict_proba(X)
+        # XGBClassifier.predict is the arg-max of the same probabilities
+        return np.argmax(probabilities, axis=1), probabilities
+
+    def explain(self, X: np.ndarray, method: str = "exact") -> tuple:
+        """Return (raw performance class, base values, per-field contributions) for a featurized matrix."""
+        with MODEL_SECONDS.time("performance", "predict_proba"):
+            classes = np.argmax(self.trees.predict_proba(X), axis=1)
+        with MODEL_SECONDS.time("performance", "contributions"):
+            base, contributions = self.explainer.explain(X, classes, method)
+        return classes, base, contributions
+
+class RetentionModel:
+    """The retention pipeline with its compiled featurizer and lookup table.
+
+    The model only reads Likert scores and Yes/No, Male/Female inputs, so its probabilities
+    come from a lookup table over those values when one can be built.
+    """
+
+    def __init__(self, model, flat_trees=None):
+        self.model = model
+        self.features = list(model.feature_names_in_)
+        self.featurizer, self.estimator = CompiledFeaturizer.from_pipeline(model)
+        self.lookup = LookupTable.build(self.features, RETENTION_RULES, self.predict_model_records) if LOOKUP_TABLES_ENABLED else None
+
+    def predict_model_records(self, records: List[Dict]) -> tuple:
+        with MODEL_SECONDS.time("retention", "featurize"):
+            X = self.featurizer.transform_records(records)
+        with MODEL_SECONDS.time("retention", "predict_proba"):
+            return (self.estimator.predict_proba(X),)
+
+    def predict_proba_records(self, records: List[Dict]) -> np.ndarray:
+        if self.lookup is not None:
+            with MODEL_SECONDS.time("retention", "lookup"):
+                return self.lookup.predict_records(records, self.predict_model_records)[0]
+        return self.predict_model_records(records)[0]
+
+    def predict_proba_frame(self, X: pd.DataFrame) -> np.ndarray:
+        if self.lookup is not None:
+            with MODEL_SECONDS.time("retention", "lookup"):
+                return self.lookup.predict_frame(X, lambda rows: (self.model.predict_proba(rows),))[0]
+        with MODEL_SECONDS.time("retention", "predict_proba"):
+            return self.model.predict_proba(X)
+
+class RetentionGraph:
+    """Performance -> retention inference compiled into a single pass.
+
+    The raw input is reindexed once to the columns both stages need, the predicted
+    PerformanceRating is handed to the retention stage in memory, and retention risk is
+    taken from the arg-max of one predict_proba call instead of a second predict pass.
+    `run_records` does the same for request dicts with the compiled featurizers.
+    """
+
+    def __init__(self, performance: ModelHandle, retention: ModelHandle):
+        self.performance = performance
+        self.retention = retention
+
+    def run_records(self, records: List[Dict]) -> tuple:
+        performance, retention = self.performance.get(), self.retention.get()
+        ratings = performance.predict_records(records)[0].astype(np.float64) + 1
+        if "PerformanceRating" in retention.features:
+            records = [dict(record, PerformanceRating=rating) for record, rating in zip(records, ratings)]
+        probabilities = retention.predict_proba_records(records)
+        risks = retention.model.classes_[probabilities.argmax(axis=1)]
+        return ratings, risks, probabilities
+
+    def run(self, data: pd.DataFrame) -> tuple:
+        """Return (PerformanceRating on the 1–5 scale, RetentionRisk, retention probabilities)."""
+        performance, retention = self.performance.get(), self.retention.get()
+        input_features = performance.features + [
+            f for f in retention.features if f not in performance.features and f != "PerformanceRating"
+        ]
+        with MODEL_SECONDS.time("performance", "reindex"):
+            X = preprocess_data(data).reindex(columns=input_features)
+            X_performance = X if input_features == performance.features else X[performance.features]
+        with MODEL_SECONDS.time("performance", "predict"):
+            ratings = performance.model.predict(X_performance).astype(np.float64) + 1
+        X["PerformanceRating"] = ratings
+        probabilities = retention.predict_proba_frame(X[retention.features])
+        risks = retention.model.classes_[probabilities.argmax(axis=1)]
+        return ratings, risks, probabilities
+
+def warm_up_performance(model: PerformanceModel) -> None:
+    """Run sample rows through the record and frame paths before the model takes traffic."""
+    sample = warmup_frame(model.features)
+    if sample is None:
+        return
+    records = sample.to_dict("records")
+    model.predict_records(records[:1])
+    model.predict_records(records)
+    model.model.predict(sample)
+
+def warm_up_retention(model: RetentionModel) -> None:
+    """Run sample rows through the record and frame paths before the model takes traffic."""
+    sample = warmup_frame(model.features)
+    if sample is None:
+        return
+    model.predict_model_records(sample.to_dict("records"))
+    model.predict_proba_frame(sample)
+
+try:
+    logger.info("Loading performance model...")
+    performance = ModelHandle("performance", PERFORMANCE_MODEL_PATH, build=PerformanceModel, warmup=warm_up_performance)
+    if performance.loaded:
+        logger.info(f"Performance model loaded. Expects {performance.get().model.n_features_in_} features.")
+        logger.info(f"Performance model expected features: {performance.get().features}")
+        if isinstance(performance.get().model, Pipeline):
+            logger.info(f"Pipeline steps: {performance.get().model.steps}")
+except Exception as e:
+    logger.error(f"Error loading performance model: {str(e)}")
+    raise Exception(f"Error loading performance model: {str(e)}")
+
+try:
+    logger.info("Loading retention model...")
+    retention = ModelHandle("retention", RETENTION_MODEL_PATH, build=RetentionModel, warmup=warm_up_retention)
+    if retention.loaded:
+        logger.info(f"Retention model loaded. Expects {retention.get().model.n_features_in_} features.")
+        logger.info(f"Retention model expected features: {retention.get().features}")
+except Exception as e:
+    logger.error(f"Error loading retention model: {str(e)}")
+    raise Exception(f"Error loading retention model: {str(e)}")
+
+retention_graph = RetentionGraph(performance, retention)
+
+# Replaced artifacts are reloaded, warmed up and swapped in without a restart
+model_registry = ModelRegistry([performance, retention])
+model_registry.start()
+
+def predict_performance_frame(data: pd.DataFrame) -> np.ndarray:
+    """Raw performance classes (rating - 1) for validated, preprocessed employee rows."""
+    model = performance.get()
+    ratings, _ = preprocess_and_predict(data, model.model, model.features)
+    return ratings
+
+def predict_retention_records(records: List[Dict]) -> tuple:
+    return retention_graph.run_records(records)
+
+def predict_performance_records(records: List[Dict]) -> tuple:
+    return performance.get().predict_records(records)
+
+performance_batcher = MicroBatcher("performance", predict_performance_records, single_executor) if MICROBATCH_ENABLED else None
+retention_batcher = MicroBatcher("retention", predict_retention_records, single_executor) if MICROBATCH_ENABLED else None
+
+@app.get("/executor_stats")
+async def executor_stats():
+    return {
+        "executors": [single_executor.stats(), bulk_executor.stats()],
+        "memory_budget": bulk_memory.stats(),
+        "batchers": [batcher.stats() for batcher in (performance_batcher, retention_batcher) if batcher is not None],
+        "lookup_tables": [retention.get().lookup.stats()] if retention.loaded and retention.get().lookup is not None else []
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/model_stats")
+async def model_stats():
+    return {"startup": startup, "registry": model_registry.stats(), "memory": process_memory()}
+
+@app.post("/models/{name}/reload")
+async def reload_model(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Reload a model from its configured artifact and swap it in, in this worker process only.
+
+    Requires the HR_ADMIN_TOKEN value in the X-Admin-Token header. To roll out a model,
+    replace its artifact in place: every worker's watcher reloads it within
+    HR_MODEL_RELOAD_POLL_SECONDS, and this endpoint only skips the wait for the worker
+    that answers it.
+    """
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model reload over HTTP is disabled; set HR_ADMIN_TOKEN to enable it.")
+    if not admin_authorized(x_admin_token):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token header.")
+    if name not in model_registry.handles:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}. Use one of {list(model_registry.handles)}.")
+    result = await run_in_threadpool(model_registry.reload, name)
+    if not result["reloaded"]:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version {result['version']}: {result['last_error']}")
+    return result
+
 @app.post("/predict_performance")
 async def predict_performance(employee: EmployeeDataPerformance) -> Dict[str, float]:
     try:
         logger.info("Received request for performance prediction.")
-        logger.info(f"Input data: {employee.model_dump()}")
-
-        for field in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "EnvironmentSatisfaction", "RelationshipSatisfaction"]:
-            value = getattr(employee, field)
-            if value < 1 or value > 5:
-                raise HTTPException(status_code=400, detail=f"{field} must be between 1 and 5.")
-        for field in ["Age", "YearsAtCompany", "TotalWorkingYears", "TrainingTimesLastYear"]:
-            value = getattr(employee, field)
-            if value < 0:
-                raise HTTPException(status_code=400, detail=f"{field} cannot be negative.")
-        if employee.MonthlyIncome <= 0:
-            raise HTTPException(status_code=400, detail="MonthlyIncome must be greater than 0.")
-
-        data = pd.DataFrame([employee.model_dump()])
-        data = preprocess_data(data)
-        features = list(performance_model.feature_names_in_)
-        rating, _ = preprocess_and_predict(data, performance_model, features)
+        debug_sample(logger, lambda: f"Input data: {employee.model_dump()}")
+
+        with STAGE_SECONDS.time("predict_performance", "validate"):
+            errors = validate_record(employee.model_dump(), PERFORMANCE_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
+
+        with STAGE_SECONDS.time("predict_performance", "predict"):
+            if performance_batcher is not None:
+                rating, _ = await performance_batcher.submit(employee.model_dump())
+            else:
+                rating, _ = await single_executor.run(predict_performance_records, [employee.model_dump()])
         rating = float(rating[0] + 1)
 
-        prediction_logger.info(json.dumps({
-            "endpoint": "predict_performance",
-            "input": employee.model_dump(),
-            "prediction": {"PerformanceRating": rating}
-        }))
+        with STAGE_SECONDS.time("predict_performance", "log"):
+            prediction_sink.write("predict_performance", [employee.model_dump()], [{"PerformanceRating": rating}])
+        REQUEST_ROWS.observe(1, "predict_performance")
 
         return {"PerformanceRating": rating}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error predicting performance: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting performance: {str(e)}")
 
+@app.post("/explain_performance")
+async def explain_performance(employee: EmployeeDataPerformance, top_k: int = EXPLAIN_TOP_K, method: str = "exact") -> Dict[str, Any]:
+    """Why the model gave this PerformanceRating: the fields that moved the predicted class's score most.
+
+    Contributions are TreeSHAP values in log-odds; BaseValue + all contributions is the
+    predicted class's raw score. `top_k=0` returns every field.
+    """
+    check_explain_params(top_k, method)
+    try:
+        logger.info("Received request for performance explanation.")
+        record = employee.model_dump()
+        with STAGE_SECONDS.time("explain_performance", "validate"):
+            errors = validate_record(record, PERFORMANCE_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
+
+        with STAGE_SECONDS.time("explain_performance", "explain"):
+            result = await single_executor.run(explain_performance_records, [record], top_k, method)
+        REQUEST_ROWS.observe(1, "explain_performance")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error explaining performance: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error explaining performance: {str(e)}")
+
 @app.post("/predict_retention")
 async def predict_retention(employee: dict) -> Dict[str, float]:
     try:
         logger.info("Received request for retention prediction.")
-        validated_data = {k: employee[k] for k in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "OverTime", "Gender"]}
-        performance_response = await predict_performance(EmployeeDataPerformance(**employee))
-        validated_data["PerformanceRating"] = performance_response["PerformanceRating"]
-        employee_data = EmployeeDataRetention(**validated_data)
-
-        for field in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "PerformanceRating"]:
-            value = getattr(employee_data, field)
-            if value < 1 or value > 5:
-                raise HTTPException(status_code=400, detail=f"{field} must be between 1 and 5.")
+        with STAGE_SECONDS.time("predict_retention", "validate"):
+            performance_input = EmployeeDataPerformance(**employee)
+            errors = validate_record(performance_input.model_dump(), PERFORMANCE_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
+
+        # Performance and retention run as one graph over the same input row
+        with STAGE_SECONDS.time("predict_retention", "predict"):
+            if retention_batcher is not None:
+                rating, risk, probs = await retention_batcher.submit(performance_input.model_dump())
+            else:
+                rating, risk, probs = await single_executor.run(predict_retention_records, [performance_input.model_dump()])
+
+        with STAGE_SECONDS.time("predict_retention", "validate_rating"):
+            validated_data = {k: employee[k] for k in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "OverTime", "Gender"]}
+            validated_data["PerformanceRating"] = float(rating[0])
+            employee_data = EmployeeDataRetention(**validated_data)
+            errors = validate_record(employee_data.model_dump(), RETENTION_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
 
-        data = pd.DataFrame([employee_data.model_dump()])
-        data = preprocess_data(data)
-        features = list(retention_model.feature_names_in_)
-        risk, probs = preprocess_and_predict(data, retention_model, features)
         probability = float(probs[0][int(risk[0])]) if probs is not None else 0.0
 
-        prediction_logger.info(json.dumps({
-            "endpoint": "predict_retention",
-            "input": employee_data.model_dump(),
-            "prediction": {"RetentionRisk": float(risk[0]), "RetentionRiskProbability": probability}
-        }))
+        with STAGE_SECONDS.time("predict_retention", "log"):
+            prediction_sink.write("predict_retention", [performance_input.model_dump()], [{
+                "PerformanceRating": float(rating[0]),
+                "RetentionRisk": float(risk[0]),
+                "RetentionRiskProbability": probability
+            }])
+        REQUEST_ROWS.observe(1, "predict_retention")
 
         return {
             "RetentionRisk": float(risk[0]),
             "RetentionRiskProbability": probability
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error predicting retention: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting retention: {str(e)}")
 
+def score_performance_frame(data: pd.DataFrame, endpoint: str = "predict_performance_bulk") -> pd.DataFrame:
+    missing_columns = [col for col in EMPLOYEE_COLUMNS if col not in data.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+
+    with STAGE_SECONDS.time(endpoint, "validate"):
+        report = validate_frame(data, PERFORMANCE_RULES)
+    if not report.ok:
+        logger.info(f"Validation failed with {report.total_violations} violations: {report.counts}")
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    with STAGE_SECONDS.time(endpoint, "preprocess"):
+        data = preprocess_data(data)
+    with STAGE_SECONDS.time(endpoint, "predict"):
+        ratings = predict_performance_frame(data)
+    with STAGE_SECONDS.time(endpoint, "build_results"):
+        results = pd.DataFrame({
+            "EmployeeIndex": data.index.to_numpy(dtype=np.int64),
+            "PerformanceRating": np.asarray(ratings, dtype=np.float64) + 1,
+        })
+
+    with STAGE_SECONDS.time(endpoint, "log"):
+        prediction_sink.write(endpoint, data, results)
+
+    return results
+
+def explain_performance_records(records: List[Dict], top_k: int, method: str) -> Dict[str, Any]:
+    """Rating, base value and top-k field contributions for one employee."""
+    model = performance.get()
+    with MODEL_SECONDS.time("performance", "featurize"):
+        X = model.featurizer.transform_records(records)
+    classes, base, contributions = model.explain(X, method)
+    order, values, other = top_contributions(contributions, top_k)
+    return {
+        "PerformanceRating": float(classes[0] + 1),
+        "BaseValue": float(base[0]),
+        "Contributions": {model.explainer.fields[i]: float(value) for i, value in zip(order[0], values[0])},
+        "OtherContribution": float(other[0]),
+    }
+
+def explain_performance_frame(
+    data: pd.DataFrame, top_k: int = EXPLAIN_TOP_K, method: str = "exact", endpoint: str = "explain_performance_bulk"
+) -> pd.DataFrame:
+    """One row per employee: rating, base value, then FeatureN / ContributionN by descending |contribution|."""
+    missing_columns = [col for col in EMPLOYEE_COLUMNS if col not in data.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+
+    with STAGE_SECONDS.time(endpoint, "validate"):
+        report = validate_frame(data, PERFORMANCE_RULES)
+    if not report.ok:
+        logger.info(f"Validation failed with {report.total_violations} violations: {report.counts}")
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    model = performance.get()
+    with STAGE_SECONDS.time(endpoint, "featurize"):
+        X = model.featurizer.transform_frame(data)
+    with STAGE_SECONDS.time(endpoint, "explain"):
+        classes, base, contributions = model.explain(X, method)
+
+    with STAGE_SECONDS.time(endpoint, "build_results"):
+        order, values, other = top_contributions(contributions, top_k)
+        fields = np.asarray(model.explainer.fields, dtype=object)
+        columns = {
+            "EmployeeIndex": data.index.to_numpy(dtype=np.int64),
+            "PerformanceRating": classes.astype(np.float64) + 1,
+            "BaseValue": base,
+        }
+        for rank in range(order.shape[1]):
+            columns[f"Feature{rank + 1}"] = fields[order[:, rank]]
+            columns[f"Contribution{rank + 1}"] = values[:, rank]
+        columns["OtherContribution"] = other
+        return pd.DataFrame(columns)
+
+def explain_performance_upload(source: UploadSource, output_format: str, input_format: str, top_k: int, method: str) -> tuple:
+    with STAGE_SECONDS.time("explain_performance_bulk", f"parse_{input_format}"):
+        data = read_upload(source, input_format, EMPLOYEE_COLUMNS)
+    logger.info(f"{input_format.upper()} data loaded with {len(data)} rows.")
+    results = explain_performance_frame(data, top_k, method)
+    with STAGE_SECONDS.time("explain_performance_bulk", "serialize"):
+        return len(results), encode_results(results, output_format)
+
+def check_explain_params(top_k: int, method: str) -> None:
+    if top_k < 0:
+        raise HTTPException(status_code=400, detail="top_k must be 0 (every field) or more.")
+    if method not in EXPLAIN_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown explanation method: {method}. Use one of {list(EXPLAIN_METHODS)}.")
+
+def score_retention_frame(original_data: pd.DataFrame, endpoint: str = "predict_retention_bulk") -> pd.DataFrame:
+    missing_perf_columns = [col for col in EMPLOYEE_COLUMNS if col not in original_data.columns]
+    if missing_perf_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns for performance prediction: {missing_perf_columns}")
+
+    # Validate the retention inputs before running either model
+    with STAGE_SECONDS.time(endpoint, "validate"):
+        report = validate_frame(original_data, RETENTION_INPUT_RULES)
+    if not report.ok:
+        logger.info(f"Validation failed with {report.total_violations} violations: {report.counts}")
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    # Performance feeds retention in memory; PerformanceRating is kept on the frame for the log
+    with STAGE_SECONDS.time(endpoint, "predict"):
+        ratings, risks, probs = retention_graph.run(original_data)
+    original_data["PerformanceRating"] = ratings
+
+    with STAGE_SECONDS.time(endpoint, "validate_rating"):
+        report = validate_frame(original_data, RATING_RULES)
+    if not report.ok:
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    with STAGE_SECONDS.time(endpoint, "build_results"):
+        risks = np.asarray(risks, dtype=np.float64)
+        results = pd.DataFrame({
+            "EmployeeIndex": original_data.index.to_numpy(dtype=np.int64),
+            "RetentionRisk": risks,
+            "RetentionRiskProbability": probs[np.arange(len(risks)), risks.astype(np.intp)] if probs is not None else 0.0,
+            "PerformanceRating": np.asarray(ratings, dtype=np.float64),
+        })
+
+    with STAGE_SECONDS.time(endpoint, "log"):
+        prediction_sink.write(endpoint, original_data, results)
+
+    with STAGE_SECONDS.time(endpoint, "rollup"):
+        record_scores(original_data, results)
+
+    return results
+
+def score_performance_upload(source: UploadSource, output_format: str = "json", input_format: str = "csv") -> tuple:
+    with STAGE_SECONDS.time("predict_performance_bulk", f"parse_{input_format}"):
+        data = read_upload(source, input_format, EMPLOYEE_COLUMNS)
+    logger.info(f"{input_format.upper()} data loaded with {len(data)} rows.")
+    results = score_performance_frame(data)
+    with STAGE_SECONDS.time("predict_performance_bulk", "serialize"):
+        return len(results), encode_results(results, output_format)
+
+def score_retention_upload(source: UploadSource, output_format: str = "json", input_format: str = "csv") -> tuple:
+    with STAGE_SECONDS.time("predict_retention_bulk", f"parse_{input_format}"):
+        original_data = read_upload(source, input_format, UPLOAD_COLUMNS)
+    logger.info(f"{input_format.upper()} data loaded with {len(original_data)} rows.")
+    results = score_retention_frame(original_data)
+    with STAGE_SECONDS.time("predict_retention_bulk", "serialize"):
+        return len(results), encode_results(results, output_format)
+
 @app.post("/predict_performance_bulk")
-async def predict_performance_bulk(file: UploadFile = File(...)) -> Dict[str, List]:
+async def predict_performance_bulk(file: UploadFile = File(...), stream: Optional[str] = None, accept: Optional[str] = Header(None)) -> Dict[str, List]:
+    output_format = negotiate_format(accept)
     try:
         logger.info("Received request for bulk performance prediction.")
-        contents = await file.read()
-        data = pd.read_csv(io.BytesIO(contents))
-        logger.info(f"CSV data loaded with {len(data)} rows.")
-
-        required_columns = [
-            "Age", "Gender", "Department", "JobRole", "MonthlyIncome", "YearsAtCompany",
-            "OverTime", "JobSatisfaction", "WorkLifeBalance", "TotalWorkingYears",
-            "TrainingTimesLastYear", "JobInvolvement", "EnvironmentSatisfaction",
-            "RelationshipSatisfaction"
-        ]
-        missing_columns = [col for col in required_columns if col not in data.columns]
-        if missing_columns:
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
-
-        validation_errors = []
-        for idx, row in data.iterrows():
-            for field in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "EnvironmentSatisfaction", "RelationshipSatisfaction"]:
-                if not pd.isna(row[field]) and (row[field] < 1 or row[field] > 5):
-                    validation_errors.append(f"Row {idx}: {field} must be between 1 and 5.")
-            if not pd.isna(row["MonthlyIncome"]) and row["MonthlyIncome"] <= 0:
-                validation_errors.append(f"Row {idx}: MonthlyIncome must be greater than 0.")
-            if not pd.isna(row["Age"]) and row["Age"] < 0:
-                validation_errors.append(f"Row {idx}: Age cannot be negative.")
-            if not pd.isna(row["YearsAtCompany"]) and row["YearsAtCompany"] < 0:
-                validation_errors.append(f"Row {idx}: YearsAtCompany cannot be negative.")
-            if not pd.isna(row["TotalWorkingYears"]) and row["TotalWorkingYears"] < 0:
-                validation_errors.append(f"Row {idx}: TotalWorkingYears cannot be negative.")
-            if not pd.isna(row["TrainingTimesLastYear"]) and row["TrainingTimesLastYear"] < 0:
-                validation_errors.append(f"Row {idx}: TrainingTimesLastYear cannot be negative.")
-            if row["OverTime"] not in ["Yes", "No"]:
-                validation_errors.append(f"Row {idx}: OverTime must be 'Yes' or 'No'.")
-            if row["Gender"] not in ["Male", "Female"]:
-                validation_errors.append(f"Row {idx}: Gender must be 'Male' or 'Female'.")
-        if validation_errors:
-            raise HTTPException(status_code=400, detail=validation_errors[:10])
-
-        data = preprocess_data(data)
-        features = list(performance_model.feature_names_in_)
-        ratings, _ = preprocess_and_predict(data, performance_model, features)
-        results = [{"EmployeeIndex": int(idx), "PerformanceRating": float(rating + 1)} for idx, rating in enumerate(ratings)]
-
-        for result, row in zip(results, data.to_dict("records")):
-            prediction_logger.info(json.dumps({
-                "endpoint": "predict_performance_bulk",
-                "input": row,
-                "prediction": result
-            }))
-
-        return {"predictions": results}
+        input_format = await detect_upload_format(file)
+        if stream:
+            chunks = iter_upload_chunks(file, input_format=input_format, columns=EMPLOYEE_COLUMNS)
+            return await stream_predictions(chunks, score_performance_frame, stream, bulk_executor, endpoint="predict_performance_bulk", input_format=input_format)
+
+        with STAGE_SECONDS.time("predict_performance_bulk", "read_upload"):
+            source = await upload_source(file, bulk_executor)
+        async with bulk_memory.reserve_upload(source, input_format, "predict_performance_bulk"):
+            rows, body = await bulk_executor.run(score_performance_upload, source, output_format, input_format)
+        REQUEST_ROWS.observe(rows, "predict_performance_bulk")
+        return results_response(body, output_format)
+    except HTTPException:
+        raise
+    except MemoryBudgetExceeded as e:
+        logger.warning(f"Rejected bulk performance prediction: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as ve:
         logger.error(f"ValueError in bulk performance prediction: {str(ve)}")
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(ve)}")
@@ -236,77 +587,60 @@ async def predict_performance_bulk(file: UploadFile = File(...)) -> Dict[str, Li
         logger.error(f"Error predicting bulk performance: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting bulk performance: {str(e)}")
 
+@app.post("/explain_performance_bulk")
+async def explain_performance_bulk(
+    file: UploadFile = File(...), top_k: int = EXPLAIN_TOP_K, method: str = "exact", stream: Optional[str] = None, accept: Optional[str] = Header(None)
+) -> Dict[str, List]:
+    """Top-k field contributions for every employee in a file, one native TreeSHAP call per batch."""
+    output_format = negotiate_format(accept)
+    check_explain_params(top_k, method)
+    try:
+        logger.info("Received request for bulk performance explanation.")
+        input_format = await detect_upload_format(file)
+        if stream:
+            chunks = iter_upload_chunks(file, input_format=input_format, columns=EMPLOYEE_COLUMNS)
+            explain_chunk = partial(explain_performance_frame, top_k=top_k, method=method)
+            return await stream_predictions(chunks, explain_chunk, stream, bulk_executor, endpoint="explain_performance_bulk", input_format=input_format)
+
+        with STAGE_SECONDS.time("explain_performance_bulk", "read_upload"):
+            source = await upload_source(file, bulk_executor)
+        async with bulk_memory.reserve_upload(source, input_format, "explain_performance_bulk"):
+            rows, body = await bulk_executor.run(explain_performance_upload, source, output_format, input_format, top_k, method)
+        REQUEST_ROWS.observe(rows, "explain_performance_bulk")
+        return results_response(body, output_format)
+    except HTTPException:
+        raise
+    except MemoryBudgetExceeded as e:
+        logger.warning(f"Rejected bulk performance explanation: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as ve:
+        logger.error(f"ValueError in bulk performance explanation: {str(ve)}")
+        raise HTTPException(status_code=400, detail=f"Invalid data format: {str(ve)}")
+    except Exception as e:
+        logger.error(f"Error explaining bulk performance: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error explaining bulk performance: {str(e)}")
+
 @app.post("/predict_retention_bulk")
-async def predict_retention_bulk(file: UploadFile = File(...)) -> Dict[str, List]:
+async def predict_retention_bulk(file: UploadFile = File(...), stream: Optional[str] = None, accept: Optional[str] = Header(None)) -> Dict[str, List]:
+    output_format = negotiate_format(accept)
     try:
         logger.info("Received request for bulk retention prediction.")
-
-        contents = await file.read()
-        original_data = pd.read_csv(io.BytesIO(contents))
-        logger.info(f"CSV data loaded with {len(original_data)} rows.")
-
-        # Step 1: Run performance prediction on raw data
-        perf_required_columns = [
-            "Age", "Gender", "Department", "JobRole", "MonthlyIncome", "YearsAtCompany",
-            "OverTime", "JobSatisfaction", "WorkLifeBalance", "TotalWorkingYears",
-            "TrainingTimesLastYear", "JobInvolvement", "EnvironmentSatisfaction",
-            "RelationshipSatisfaction"
-        ]
-        missing_perf_columns = [col for col in perf_required_columns if col not in original_data.columns]
-        if missing_perf_columns:
-            raise HTTPException(status_code=400, detail=f"Missing required columns for performance prediction: {missing_perf_columns}")
-
-        perf_data = preprocess_data(original_data.copy())
-        perf_features = list(performance_model.feature_names_in_)
-        ratings, _ = preprocess_and_predict(perf_data, performance_model, perf_features)
-
-        # Append performance ratings (shifted to 1–5 scale)
-        original_data["PerformanceRating"] = [float(r + 1) for r in ratings]
-
-        # Step 2: Proceed with retention prediction
-        retention_required_columns = [
-            "JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "OverTime", 
-            "Gender", "PerformanceRating"
-        ]
-        missing_retention_columns = [col for col in retention_required_columns if col not in original_data.columns]
-        if missing_retention_columns:
-            raise HTTPException(status_code=400, detail=f"Missing required columns for retention prediction: {missing_retention_columns}")
-
-        # Validation
-        validation_errors = []
-        for idx, row in original_data.iterrows():
-            for field in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "PerformanceRating"]:
-                if not pd.isna(row[field]) and (row[field] < 1 or row[field] > 5):
-                    validation_errors.append(f"Row {idx}: {field} must be between 1 and 5.")
-            if row["OverTime"] not in ["Yes", "No"]:
-                validation_errors.append(f"Row {idx}: OverTime must be 'Yes' or 'No'.")
-            if row["Gender"] not in ["Male", "Female"]:
-                validation_errors.append(f"Row {idx}: Gender must be 'Male' or 'Female'.")
-        if validation_errors:
-            raise HTTPException(status_code=400, detail=validation_errors[:10])
-
-        data = preprocess_data(original_data)
-        retention_features = list(retention_model.feature_names_in_)
-        risks, probs = preprocess_and_predict(data, retention_model, retention_features)
-
-        results = [
-            {
-                "EmployeeIndex": int(idx),
-                "RetentionRisk": float(risk),
-                "RetentionRiskProbability": float(prob[int(risk)]) if probs is not None else 0.0,
-                "PerformanceRating": float(original_data.iloc[idx]["PerformanceRating"])
-            } 
-            for idx, (risk, prob) in enumerate(zip(risks, probs if probs is not None else [None] * len(risks)))
-        ]
-
-        for result, row in zip(results, original_data.to_dict("records")):
-            prediction_logger.info(json.dumps({
-                "endpoint": "predict_retention_bulk",
-                "input": row,
-                "prediction": result
-            }))
-
-        return {"predictions": results}
+        input_format = await detect_upload_format(file)
+        if stream:
+            chunks = iter_upload_chunks(file, input_format=input_format, columns=UPLOAD_COLUMNS)
+            return await stream_predictions(chunks, score_retention_frame, stream, bulk_executor, endpoint="predict_retention_bulk", input_format=input_format)
+
+        with STAGE_SECONDS.time("predict_retention_bulk", "read_upload"):
+            source = await upload_source(file, bulk_executor)
+        async with bulk_memory.reserve_upload(source, input_format, "predict_retention_bulk"):
+            rows, body = await bulk_executor.run(score_retention_upload, source, output_format, input_format)
+        REQUEST_ROWS.observe(rows, "predict_retention_bulk")
+        return results_response(body, output_format)
+    except HTTPException:
+        raise
+    except MemoryBudgetExceeded as e:
+        logger.warning(f"Rejected bulk retention prediction: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as ve:
         logger.error(f"ValueError in bulk retention prediction: {str(ve)}")
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(ve)}")
@@ -314,21 +648,9 @@ async def predict_retention_bulk(file: UploadFile = File(...)) -> Dict[str, List
         logger.error(f"Error predicting bulk retention: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting bulk retention: {str(e)}")
 
+startup = startup_report("Performance & Retention API", [performance, retention])
 
 if __name__ == "__main__":
     import uvicorn
-    test_data = pd.DataFrame([{
-        "Age": 35, "Gender": "Male", "Department": "Sales", "JobRole": "Manager",
-        "MonthlyIncome": 10000, "YearsAtCompany": 10, "OverTime": "No",
-        "JobSatisfaction": 5, "WorkLifeBalance": 5, "TotalWorkingYears": 15,
-        "TrainingTimesLastYear": 5, "JobInvolvement": 5,
-        "EnvironmentSatisfaction": 5, "RelationshipSatisfaction": 5
-    }])
-    try:
-        logger.info("Running startup model test...")
-        performance_model.predict(test_data)
-        logger.info("Startup prediction test passed.")
-    except Exception as e:
-        logger.error(f"Manual test failed: {str(e)}")
     logger.info("Starting server with updated code...")
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,332 @@
+"""Offline batch scoring for whole-workforce files.
+
+Scores a CSV, Parquet or Arrow file of employees with the same models, lookup tables and
+preprocessing the services use (app.py for attrition, apps.py for performance and
+retention), without going through HTTP. The input is read in chunks and scored by a pool
+of worker processes, with at most a few chunks in flight, so memory stays bounded
+however large the file is. Results are written in input order:
+
+- a .csv output is a single file, appended chunk by chunk;
+- any other output is a Parquet dataset directory with one part file per chunk, which
+  `pd.read_parquet(path)` reads back as one table.
+
+After each written chunk a checkpoint (`<output>.checkpoint.json`) records how many rows
+are done. `--resume` continues an interrupted run from there; the checkpoint is removed
+once the whole file has been scored.
+
+Rows are keyed by EmployeeNumber when the input has it, otherwise by EmployeeIndex (the
+row position in the file). Rows failing the services' validation rules stop the run,
+or are dropped and counted with `--skip-invalid`.
+
+    python batch_score.py workforce.parquet scores.parquet [--workers 8] [--chunk-rows 50000]
+        [--models attrition performance retention] [--skip-invalid] [--resume]
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from uploads import compact_frame, csv_options, detect_format, iter_table_chunks
+from validation import ATTRITION_RULES, EMPLOYEE_COLUMNS, KEY_COLUMN, PERFORMANCE_RULES, RETENTION_INPUT_RULES, Rule, merge_rules
+
+logger = logging.getLogger(__name__)
+
+MODELS = ("attrition", "performance", "retention")
+
+# Rows scored per task and tasks kept in flight per worker process
+BATCH_CHUNK_ROWS = int(os.getenv("HR_BATCH_CHUNK_ROWS", "50000"))
+BATCH_CHUNKS_PER_WORKER = 2
+
+
+def input_rules(models: List[str]) -> List[Rule]:
+    """Every validation rule the services apply to the raw input for `models`."""
+    tables: List[List[Rule]] = []
+    if "attrition" in models:
+        tables.append(ATTRITION_RULES)
+    if "performance" in models or "retention" in models:
+        tables.append(PERFORMANCE_RULES)
+    if "retention" in models:
+        tables.append(RETENTION_INPUT_RULES)
+    return merge_rules(*tables)
+
+
+def output_columns(models: List[str]) -> List[str]:
+    """Result columns `score_chunk` adds for `models`, in the order it adds them."""
+    columns = []
+    if "attrition" in models:
+        columns += ["AttritionRisk", "AttritionRiskProbability"]
+    if "performance" in models:
+        columns.append("PerformanceRating")
+    if "retention" in models:
+        columns += ["RetentionRisk", "RetentionRiskProbability"]
+    return columns
+
+
+def invalid_rows(data: pd.DataFrame, rules: List[Rule]) -> Tuple[np.ndarray, List[str]]:
+    """Mask of rows breaking any rule, with up to 10 example messages."""
+    mask = np.zeros(len(data), dtype=bool)
+    messages = []
+    for rule in rules:
+        violations = rule.violations(data[rule.field].to_numpy())
+        if violations.any():
+            mask |= violations
+            if len(messages) < 10:
+                messages.append(f"Row {int(data.index[np.flatnonzero(violations)[0]])}: {rule.message()}")
+    return mask, messages
+
+
+_services: Dict[str, object] = {}
+
+
+def load_services(models: List[str]) -> Dict[str, object]:
+    """Import the service modules that serve `models`; returns them keyed "app" and "apps"."""
+    # The service modules load their models at import; in forked workers this is already done
+    if "attrition" in models and "app" not in _services:
+        import app
+        _services["app"] = app
+    if ("performance" in models or "retention" in models) and "apps" not in _services:
+        import apps
+        _services["apps"] = apps
+    return _services
+
+
+def score_chunk(data: pd.DataFrame, models: List[str], skip_invalid: bool) -> Tuple[pd.DataFrame, int]:
+    """Score one chunk; returns (results, rows dropped as invalid)."""
+    load_services(models)
+    missing = [column for column in EMPLOYEE_COLUMNS if column not in data.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    mask, messages = invalid_rows(data, input_rules(models))
+    dropped = int(mask.sum())
+    if dropped:
+        if not skip_invalid:
+            raise ValueError(f"{dropped} rows fail validation: {messages}")
+        data = data[~mask]
+
+    if KEY_COLUMN in data.columns:
+        key = data[KEY_COLUMN]
+        # Each chunk is downcast to what its own values need; output parts keep one key dtype
+        results = pd.DataFrame({KEY_COLUMN: key.to_numpy(dtype=np.int64) if pd.api.types.is_integer_dtype(key.dtype) else key.to_numpy()})
+    else:
+        results = pd.DataFrame({"EmployeeIndex": data.index.to_numpy(dtype=np.int64)})
+    if data.empty:
+        # Every row was invalid; the models reject empty input, so return the columns alone
+        for column in output_columns(models):
+            results[column] = np.empty(0, dtype=np.float64)
+        return results, dropped
+    if "attrition" in models:
+        app = _services["app"]
+        predictions, probs = app.predict_attrition_frame(data)
+        results["AttritionRisk"] = np.asarray(predictions, dtype=np.float64)
+        results["AttritionRiskProbability"] = probs[:, 1] if probs is not None else 0.0
+    if "retention" in models:
+        # Retention runs on the predicted rating, so the graph yields both outputs in one pass
+        ratings, risks, probs = _services["apps"].retention_graph.run(data)
+        risks = np.asarray(risks, dtype=np.float64)
+        if "performance" in models:
+            results["PerformanceRating"] = ratings
+        results["RetentionRisk"] = risks
+        results["RetentionRiskProbability"] = probs[np.arange(len(risks)), risks.astype(np.intp)] if probs is not None else 0.0
+    elif "performance" in models:
+        apps = _services["apps"]
+        results["PerformanceRating"] = np.asarray(apps.predict_performance_frame(apps.preprocess_data(data)), dtype=np.float64) + 1
+    return results, dropped
+
+
+class Checkpoint:
+    """Rows completed so far for one input/output pair, rewritten atomically after each chunk."""
+
+    def __init__(self, output: str, source: str, models: List[str]):
+        self.path = f"{output.rstrip(os.sep)}.checkpoint.json"
+        stat = os.stat(source)
+        self.identity = {
+            "input": os.path.abspath(source),
+            "input_size": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns,
+            "models": models,
+        }
+        self.rows = 0
+        self.dropped = 0
+        self.output_bytes = 0
+        self.parts = 0
+
+    def load(self) -> bool:
+        """Adopt a saved checkpoint for the same input and models; False if there is none."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            saved = json.load(f)
+        if {key: saved.get(key) for key in self.identity} != self.identity:
+            raise ValueError(f"{self.path} was written for a different input file or model set; remove it to start over.")
+        self.rows, self.dropped, self.output_bytes, self.parts = saved["rows"], saved["dropped"], saved["output_bytes"], saved["parts"]
+        return True
+
+    def save(self) -> None:
+        state = dict(self.identity, rows=self.rows, dropped=self.dropped, output_bytes=self.output_bytes, parts=self.parts)
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ResultWriter:
+    """Appends result chunks to a CSV file or a Parquet dataset directory."""
+
+    def __init__(self, output: str, checkpoint: Checkpoint):
+        self.output = output
+        self.csv = output.endswith(".csv")
+        self.checkpoint = checkpoint
+        if self.csv:
+            # Drop anything written after the last checkpoint
+            with open(output, "ab") as f:
+                f.truncate(checkpoint.output_bytes)
+        else:
+            os.makedirs(output, exist_ok=True)
+            for name in os.listdir(output):
+                if name.startswith("part-") and int(name[5:11]) >= checkpoint.parts:
+                    os.remove(os.path.join(output, name))
+
+    def write(self, results: pd.DataFrame) -> None:
+        if self.csv:
+            with open(self.output, "ab") as f:
+                f.write(results.to_csv(index=False, header=self.checkpoint.output_bytes == 0).encode())
+                f.flush()
+                os.fsync(f.fileno())
+                self.checkpoint.output_bytes = f.tell()
+        else:
+            part = os.path.join(self.output, f"part-{self.checkpoint.parts:06d}.parquet")
+            results.to_parquet(f"{part}.tmp", index=False)
+            os.replace(f"{part}.tmp", part)
+            self.checkpoint.parts += 1
+
+
+def iter_input(source: str, chunk_rows: int, skip_rows: int) -> Tuple[Iterator[pd.DataFrame], Optional[int]]:
+    """Chunks of the input after `skip_rows` rows, and the total row count when it is cheap to know."""
+    with open(source, "rb") as f:
+        fmt = detect_format(f.read(8))
+    columns = EMPLOYEE_COLUMNS + [KEY_COLUMN]
+    if fmt == "csv":
+        def chunks() -> Iterator[pd.DataFrame]:
+            reader = pd.read_csv(source, chunksize=chunk_rows, skiprows=range(1, skip_rows + 1), **csv_options(columns))
+            with reader:
+                start = skip_rows
+                for chunk in reader:
+                    chunk.index = pd.RangeIndex(start, start + len(chunk))
+                    start += len(chunk)
+                    yield compact_frame(chunk)
+        return chunks(), None
+    total = None
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        total = pq.ParquetFile(source).metadata.num_rows
+    return iter_table_chunks(source, fmt, chunk_rows, columns, skip_rows=skip_rows), total
+
+
+def report_progress(rows: int, total: Optional[int], started: float, resumed_rows: int) -> None:
+    elapsed = time.perf_counter() - started
+    rate = (rows - resumed_rows) / elapsed if elapsed > 0 else 0.0
+    done = f"{rows:,}/{total:,} rows ({100.0 * rows / total:.1f}%)" if total else f"{rows:,} rows"
+    end = "" if sys.stderr.isatty() else "\n"
+    print(f"\r{done}  {rate:,.0f} rows/s  {elapsed:.0f}s elapsed", end=end, file=sys.stderr, flush=True)
+
+
+def run(
+    source: str,
+    output: str,
+    models: List[str],
+    workers: int,
+    chunk_rows: int,
+    skip_invalid: bool = False,
+    resume: bool = False,
+) -> Dict[str, float]:
+    checkpoint = Checkpoint(output, source, models)
+    if resume and checkpoint.load():
+        logger.info(f"Resuming after {checkpoint.rows:,} rows.")
+    elif os.path.exists(output):
+        raise FileExistsError(f"{output} already exists; pass --resume to continue it or remove it first.")
+    elif os.path.exists(checkpoint.path):
+        checkpoint.remove()
+    writer = ResultWriter(output, checkpoint)
+    resumed_rows = checkpoint.rows
+    chunks, total = iter_input(source, chunk_rows, checkpoint.rows)
+
+    # Load the models once here; forked workers share them copy-on-write
+    load_services(models)
+    logging.getLogger().setLevel(logging.WARNING)
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    started = time.perf_counter()
+    pending: List[Tuple[int, Future]] = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        def drain(limit: int) -> None:
+            # Results are written strictly in input order, so the checkpoint is a row count
+            while len(pending) > limit:
+                rows, future = pending.pop(0)
+                results, dropped = future.result()
+                writer.write(results)
+                checkpoint.rows += rows
+                checkpoint.dropped += dropped
+                checkpoint.save()
+                report_progress(checkpoint.rows, total, started, resumed_rows)
+
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(score_chunk, chunk, models, skip_invalid)))
+            drain(workers * BATCH_CHUNKS_PER_WORKER)
+        drain(0)
+
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    summary = {
+        "rows": checkpoint.rows,
+        "scored": checkpoint.rows - checkpoint.dropped,
+        "dropped_invalid": checkpoint.dropped,
+        "seconds": elapsed,
+        "rows_per_second": (checkpoint.rows - resumed_rows) / elapsed if elapsed > 0 else 0.0,
+    }
+    checkpoint.remove()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV, Parquet or Arrow file of employees")
+    parser.add_argument("output", help="a .csv file, or a directory for a Parquet dataset")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_CHUNK_ROWS)
+    parser.add_argument("--skip-invalid", action="store_true", help="drop rows failing validation instead of stopping")
+    parser.add_argument("--resume", action="store_true", help="continue from the output's checkpoint")
+    parser.add_argument("--overwrite", action="store_true", help="replace an existing output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.overwrite and not args.resume and os.path.exists(args.output):
+        shutil.rmtree(args.output) if os.path.isdir(args.output) else os.remove(args.output)
+    try:
+        summary = run(args.input, args.output, args.models, args.workers, args.chunk_rows, args.skip_invalid, args.resume)
+    except (FileExistsError, ValueError) as e:
+        sys.exit(f"Batch scoring stopped: {str(e)}")
+    print(
+        f"Scored {summary['scored']:,} rows ({summary['dropped_invalid']:,} invalid dropped) into {args.output} "
+        f"in {summary['seconds']:.1f}s, {summary['rows_per_second']:,.0f} rows/s."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: collect concurrent single-record requests and score them with one predict call
+MICROBATCH_ENABLED = os.getenv("HR_MICROBATCH", "0") == "1"
+MICROBATCH_MAX_SIZE = int(os.getenv("HR_MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("HR_MICROBATCH_MAX_WAIT_MS", "5"))
+
+
+class MicroBatcher:
+    """Groups concurrent single-record predictions into one vectorized call.
+
+    A batch is flushed when it reaches `max_batch_size` rows or when its oldest request
+    has waited `max_wait_ms`, whichever comes first. `predict_batch` receives the list of
+    request records and returns a tuple of per-row arrays, such as `(predictions,
+    probabilities)`; each caller gets back the same tuple sliced to its own row.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        predict_batch: Callable[[List[Dict[str, Any]]], tuple],
+        executor: InferenceExecutor,
+        max_batch_size: int = MICROBATCH_MAX_SIZE,
+        max_wait_ms: float = MICROBATCH_MAX_WAIT_MS,
+    ):
+        self.name = name
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self._batches = 0
+        self._rows = 0
+        self._max_size = 0
+        self._last_size = 0
+        self._size_counts: Dict[int, int] = {}
+
+    async def submit(self, record: Dict[str, Any]) -> tuple:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Keep a reference so the task is not garbage collected while it runs
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        size = len(batch)
+        self._batches += 1
+        self._rows += size
+        self._last_size = size
+        self._max_size = max(self._max_size, size)
+        self._size_counts[size] = self._size_counts.get(size, 0) + 1
+        try:
+            outputs = await self.executor.run(self.predict_batch, [record for record, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(tuple(output[i:i + 1] if output is not None else None for output in outputs))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "rows": self._rows,
+            "mean_batch_size": self._rows / self._batches if self._batches else 0.0,
+            "max_batch_size_seen": self._max_size,
+            "last_batch_size": self._last_size,
+            "batch_size_counts": dict(sorted(self._size_counts.items())),
+        }
@@ -0,0 +1 @@
+"""Offline latency benchmarks for the HR Analytics models and services."""
@@ -0,0 +1,260 @@
+"""Load driver for the Attrition, Performance & Retention and unified services.
+
+Every prediction, explanation and scenario endpoint in app.py, apps.py and service.py is driven
+in-process through httpx's ASGI transport, so results measure the service (validation,
+executors, batching, models, serialization) without network noise. Single-record endpoints run at each concurrency
+level; bulk uploads, plain and streamed, run at each batch size and concurrency level.
+Each scenario reports p50/p95/p99 request latency, requests/sec and rows/sec.
+
+The services read their HR_* settings at import, so compare configurations by running
+the driver under different environments. Results are saved as JSON together with the
+commit and settings they were measured with, and `--baseline` compares a run against an
+earlier file, exiting non-zero if any scenario regressed by more than `--tolerance`.
+
+Run from the repository root:
+
+    python -m benchmarks.load [--batch-sizes 1 100 1000] [--concurrency 1 8 32]
+        [--requests 200] [--output results.json] [--baseline old.json]
+    python -m benchmarks.load --compare old.json new.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.workforce import generate
+from validation import EMPLOYEE_COLUMNS
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    service: str
+    path: str
+    bulk: bool
+    stream: Optional[str] = None
+    # Scenario sweeps send SCENARIO_AXES along with each employee or cohort
+    scenarios: bool = False
+
+    @property
+    def url(self) -> str:
+        return f"{self.path}?stream={self.stream}" if self.stream else self.path
+
+
+ENDPOINTS = [
+    Endpoint("app", "/predict_attrition", bulk=False),
+    Endpoint("app", "/predict_attrition_bulk", bulk=True),
+    Endpoint("app", "/predict_attrition_bulk", bulk=True, stream="ndjson"),
+    Endpoint("apps", "/predict_performance", bulk=False),
+    Endpoint("apps", "/predict_retention", bulk=False),
+    Endpoint("apps", "/predict_performance_bulk", bulk=True),
+    Endpoint("apps", "/predict_performance_bulk", bulk=True, stream="ndjson"),
+    Endpoint("apps", "/predict_retention_bulk", bulk=True),
+    Endpoint("apps", "/predict_retention_bulk", bulk=True, stream="ndjson"),
+    Endpoint("apps", "/explain_performance", bulk=False),
+    Endpoint("apps", "/explain_performance_bulk", bulk=True),
+    Endpoint("apps", "/explain_performance_bulk", bulk=True, stream="ndjson"),
+    Endpoint("service", "/predict_all", bulk=False),
+    Endpoint("service", "/predict_all_bulk", bulk=True),
+    Endpoint("service", "/predict_all_bulk", bulk=True, stream="ndjson"),
+    Endpoint("service", "/scenarios", bulk=False, scenarios=True),
+    Endpoint("service", "/scenarios_bulk", bulk=True, scenarios=True),
+]
+
+# A four-scenario grid; rows/sec for the sweeps counts employees, not scenario rows
+SCENARIO_AXES = [
+    {"field": "OverTime", "values": ["Yes", "No"]},
+    {"field": "MonthlyIncome", "op": "scale", "values": [1.05, 1.1]},
+]
+
+# Distinct payloads cycled through per scenario, so lookups and caches see varied input
+PAYLOAD_VARIANTS = 8
+
+
+def percentile(latencies: List[float], q: float) -> float:
+    return float(np.percentile(latencies, q)) * 1000.0 if latencies else float("nan")
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    endpoint: Endpoint,
+    payloads: List[Any],
+    rows_per_request: int,
+    concurrency: int,
+    n_requests: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    """Send `n_requests` with `concurrency` in flight and summarize their latencies."""
+
+    async def send(i: int) -> httpx.Response:
+        payload = payloads[i % len(payloads)]
+        if endpoint.bulk:
+            form = {"axes": json.dumps(SCENARIO_AXES)} if endpoint.scenarios else None
+            return await client.post(endpoint.url, files={"file": ("employees.csv", payload, "text/csv")}, data=form)
+        if endpoint.scenarios:
+            return await client.post(endpoint.url, json={"employee": payload, "axes": SCENARIO_AXES})
+        return await client.post(endpoint.url, json=payload)
+
+    for i in range(warmup):
+        await send(i)
+
+    latencies: List[float] = []
+    errors: Dict[int, int] = {}
+    next_request = iter(range(n_requests))
+
+    async def worker() -> None:
+        for i in next_request:
+            started = time.perf_counter()
+            response = await send(i)
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            else:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        "service": endpoint.service,
+        "endpoint": endpoint.url,
+        "batch_size": rows_per_request,
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "seconds": wall,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": float(np.mean(latencies)) * 1000.0 if latencies else float("nan"),
+        "requests_per_second": len(latencies) / wall,
+        "rows_per_second": len(latencies) * rows_per_request / wall,
+    }
+
+
+def scenario_key(result: Dict[str, Any]) -> tuple:
+    return result["service"], result["endpoint"], result["batch_size"], result["concurrency"]
+
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in sorted(os.environ.items()) if key.startswith("HR_")},
+        "arguments": {key: value for key, value in vars(args).items() if key not in ("compare", "baseline", "output")},
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Print p95 latency and rows/sec change per scenario; return the scenarios that regressed."""
+    previous = {scenario_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"{'scenario':<62}{'p95 ms':>18}{'rows/s':>24}")
+    for result in current["results"]:
+        old = previous.get(scenario_key(result))
+        if old is None:
+            continue
+        p95_change = result["p95_ms"] / old["p95_ms"] - 1.0
+        throughput_change = result["rows_per_second"] / old["rows_per_second"] - 1.0
+        regressed = p95_change > tolerance or throughput_change < -tolerance
+        if regressed:
+            regressions.append(result)
+        name = f"{result['endpoint']} b={result['batch_size']} c={result['concurrency']}"
+        print(
+            f"{name:<62}{old['p95_ms']:>8.2f}->{result['p95_ms']:<8.2f}"
+            f"{old['rows_per_second']:>11.0f}->{result['rows_per_second']:<11.0f}{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workforce = generate(PAYLOAD_VARIANTS * max(args.batch_sizes), seed=args.seed)[EMPLOYEE_COLUMNS]
+    records = workforce.head(max(PAYLOAD_VARIANTS, args.requests)).to_dict("records")
+    uploads = {
+        size: [workforce.iloc[i * size:(i + 1) * size].to_csv(index=False).encode() for i in range(PAYLOAD_VARIANTS)]
+        for size in args.batch_sizes
+    }
+
+    results = []
+    for service in args.services:
+        module = importlib.import_module(service)
+        # Per-request INFO logs would dominate the measurement
+        logging.getLogger().setLevel(args.log_level)
+        transport = httpx.ASGITransport(app=module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for endpoint in ENDPOINTS:
+                if endpoint.service != service:
+                    continue
+                for size in args.batch_sizes if endpoint.bulk else [1]:
+                    payloads = uploads[size] if endpoint.bulk else records
+                    for concurrency in args.concurrency:
+                        # Keep large batches to a bounded number of rows per scenario
+                        n_requests = max(concurrency, min(args.requests, args.max_rows // size))
+                        result = await run_scenario(client, endpoint, payloads, size, concurrency, n_requests, args.warmup)
+                        results.append(result)
+                        print(
+                            f"{endpoint.url:<42}{size:>7}{concurrency:>5}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                            f"{result['p99_ms']:>10.2f}{result['rows_per_second']:>12.0f}"
+                            f"{'  errors ' + str(result['errors']) if result['errors'] else ''}",
+                            flush=True,
+                        )
+    return {"meta": run_metadata(args), "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", nargs="+", default=["app", "apps"], choices=["app", "apps", "service"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--max-rows", type=int, default=100_000, help="cap on rows sent per bulk scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare this run against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative p95 or rows/sec change counted as a regression")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files without running")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        print(f"{'endpoint':<42}{'batch':>7}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rows/s':>12}")
+        current = asyncio.run(run(args))
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=1)
+        print(f"Saved {len(current['results'])} scenarios to {args.output}.")
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = compare(baseline, current, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} scenario(s) regressed by more than {args.tolerance:.0%}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Peak memory of the bulk upload paths, per scored row.
+
+Each bulk scoring function (the work a `/predict_*_bulk` request does once its upload
+has arrived) runs in a fresh interpreter, after `--warmup` unmeasured runs on the same
+file, so model loading and first-use costs such as lazy imports and allocator arenas do
+not count. Before the call the process's peak RSS is reset (`/proc/self/clear_refs`, Linux);
+after it, the prediction log is flushed and the new peak is read. The difference is the
+request's peak working memory: parsed frame, model inputs, results, log records and the
+encoded response. With `--source bytes` the upload is read into memory first, as the
+process executor receives it; `file` passes the spooled file object, as the thread
+executor does.
+
+Run from the repository root:
+
+    python -m benchmarks.memory --input workforce.parquet [--endpoints attrition all]
+        [--source bytes file] [--warmup 1] [--output memory.json]
+"""
+import argparse
+import gc
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Endpoint -> (service module, upload scoring function)
+UPLOAD_FUNCTIONS = {
+    "attrition": ("app", "score_attrition_upload"),
+    "performance": ("apps", "score_performance_upload"),
+    "retention": ("apps", "score_retention_upload"),
+    "all": ("service", "score_all_upload"),
+}
+
+
+def input_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    return {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}.get(extension, "csv")
+
+
+def _status_kib(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak() -> bool:
+    """Restart the peak-RSS high-water mark at the current RSS; False where the kernel does not support it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kib() -> int:
+    peak = _status_kib("VmHWM")
+    if peak is None:
+        import resource
+        # Lifetime peak; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak //= 1024 if os.uname().sysname == "Darwin" else 1
+    return peak
+
+
+def measure(endpoint: str, path: str, source: str, warmup: int) -> Dict[str, Any]:
+    """Child process: score `path` through `endpoint` and report the peak memory of the last run."""
+    module_name, function_name = UPLOAD_FUNCTIONS[endpoint]
+    module = importlib.import_module(module_name)
+    score_upload = getattr(module, function_name)
+    fmt = input_format(path)
+
+    for _ in range(warmup):
+        with open(path, "rb") as f:
+            score_upload(f.read() if source == "bytes" else f, "json", fmt)
+        module.prediction_sink.flush()
+    gc.collect()
+    exact = reset_peak()
+    before = _status_kib("VmRSS") or peak_rss_kib()
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        rows, body = score_upload(f.read() if source == "bytes" else f, "json", fmt)
+    module.prediction_sink.flush()
+    seconds = time.perf_counter() - started
+    peak = peak_rss_kib()
+    return {
+        "endpoint": endpoint,
+        "input": os.path.basename(path),
+        "format": fmt,
+        "source": source,
+        "rows": rows,
+        "upload_mib": os.path.getsize(path) / 2**20,
+        "response_mib": len(body) / 2**20,
+        "rss_before_mib": before / 1024,
+        "peak_rss_mib": peak / 1024,
+        "peak_increase_mib": (peak - before) / 1024,
+        "bytes_per_row": (peak - before) * 1024 / rows if rows else float("nan"),
+        "exact_peak": exact,
+        "seconds": seconds,
+    }
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        # Keep the prediction log and rollups of the runs out of the working tree
+        env = dict(
+            os.environ,
+            HR_PREDICTION_LOG=os.path.join(scratch, "predictions.log"),
+            HR_ROLLUP_DB=os.path.join(scratch, "rollups.db"),
+            PYTHONWARNINGS="ignore",
+        )
+        for path in args.input:
+            for endpoint in args.endpoints:
+                for source in args.source:
+                    completed = subprocess.run(
+                        [sys.executable, "-m", "benchmarks.memory", "--child", endpoint, path, source, str(args.warmup)],
+                        capture_output=True, text=True, env=env,
+                    )
+                    if completed.returncode != 0:
+                        print(f"{endpoint} {path} ({source}) failed:\n{completed.stderr[-2000:]}", file=sys.stderr)
+                        continue
+                    result = json.loads(completed.stdout.strip().splitlines()[-1])
+                    results.append(result)
+                    print(
+                        f"{endpoint:<13}{result['input']:<24}{source:<7}{result['rows']:>9}{result['peak_increase_mib']:>12.1f}"
+                        f"{result['bytes_per_row']:>12.0f}{result['seconds']:>9.2f}{'' if result['exact_peak'] else '  (lifetime peak)'}",
+                        flush=True,
+                    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", nargs="+", help="CSV, Parquet or Arrow files of employees")
+    parser.add_argument("--endpoints", nargs="+", default=list(UPLOAD_FUNCTIONS), choices=list(UPLOAD_FUNCTIONS))
+    parser.add_argument("--source", nargs="+", default=["bytes", "file"], choices=["bytes", "file"])
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs before the measured one")
+    parser.add_argument("--output", default="memory_results.json")
+    parser.add_argument("--child", nargs=4, metavar=("ENDPOINT", "INPUT", "SOURCE", "WARMUP"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        endpoint, path, source, warmup = args.child
+        print(json.dumps(measure(endpoint, path, source, int(warmup))))
+        return
+    if not args.input:
+        parser.error("--input is required")
+
+    print(f"{'endpoint':<13}{'input':<24}{'source':<7}{'rows':>9}{'peak MiB':>12}{'bytes/row':>12}{'seconds':>9}")
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump({"settings": {key: value for key, value in sorted(os.environ.items()) if key.startswith("HR_")}, "results": results}, f, indent=1)
+    print(f"Saved {len(results)} measurements to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
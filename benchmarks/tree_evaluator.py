@@ -0,0 +1,64 @@
+"""Flattened tree evaluator vs. native predict_proba at several batch sizes.
+
+"served" is TreePredictor, which the services use: flattened up to the per-model row limit,
+native above it.
+
+Run from the repository root:
+
+    python -m benchmarks.tree_evaluator [--sizes 1 100 100000] [--repeat 20]
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from featurizer import CompiledFeaturizer
+from tree_ensemble import FlatTreeEnsemble, TreePredictor
+
+
+def time_call(func, X, repeat: int) -> float:
+    """Median wall time of `func(X)` in milliseconds."""
+    func(X)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = pd.read_csv("Attrition.csv", encoding="utf-8-sig")
+    rng = np.random.default_rng(args.seed)
+
+    forest = joblib.load("attrition_model.pkl")
+    attrition = CompiledFeaturizer.from_value_maps(["JobSatisfaction", "WorkLifeBalance", "OverTime"], {"OverTime": {"Yes": 1, "No": 0}}, fill_value=0)
+    performance, booster = CompiledFeaturizer.from_pipeline(joblib.load("performance_model.pkl"))
+    models = [
+        ("attrition (random forest)", forest, FlatTreeEnsemble.from_sklearn_forest(forest), attrition),
+        ("performance (xgboost)", booster, FlatTreeEnsemble.from_xgboost(booster), performance),
+    ]
+
+    print(f"{'model':<28}{'rows':>8}{'native ms':>12}{'flat ms':>12}{'speedup':>10}{'served ms':>12}")
+    for name, model, flat, featurizer in models:
+        for size in args.sizes:
+            sample = data.iloc[rng.integers(0, len(data), size)].reset_index(drop=True)
+            X = featurizer.transform_frame(sample)
+            # Large batches are slow enough that a few repeats give a stable median
+            repeat = max(1, min(args.repeat, 2_000_000 // (size * flat.n_trees) or 1))
+            native_ms = time_call(model.predict_proba, X, repeat)
+            flat_ms = time_call(flat.predict_proba, X, repeat)
+            served_ms = time_call(TreePredictor(model).predict_proba, X, repeat)
+            print(f"{name:<28}{size:>8}{native_ms:>12.3f}{flat_ms:>12.3f}{native_ms / flat_ms:>9.1f}x{served_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
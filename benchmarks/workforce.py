@@ -0,0 +1,150 @@
+"""Synthetic workforce generator: Attrition.csv scaled to any number of employees.
+
+Rows are drawn with replacement from the source file, so categorical columns, Likert
+scores and the Department/JobRole pairing keep their source frequencies. Age, income and
+the pay-rate columns get a small jitter so large files are not just repeated rows; the
+jitter is clipped to the source range and keeps Age - TotalWorkingYears at least as large
+as anywhere in the source, so every row still passes the services' validation rules.
+Each synthetic employee gets a unique EmployeeNumber.
+
+Run from the repository root:
+
+    python -m benchmarks.workforce --rows 1000000 --output workforce.csv [--check]
+
+Files ending in .parquet are written with pyarrow; anything else is CSV.
+"""
+import argparse
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from validation import ATTRITION_RULES, PERFORMANCE_RULES, RETENTION_RULES, validate_frame
+
+SOURCE_PATH = "Attrition.csv"
+
+# Multiplicative noise on income and pay rates, additive noise on age (years)
+INCOME_JITTER = 0.05
+RATE_JITTER = 0.05
+AGE_JITTER = 2
+
+RATE_COLUMNS = ["DailyRate", "HourlyRate", "MonthlyRate"]
+
+
+def load_source(path: str = SOURCE_PATH) -> pd.DataFrame:
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+def synthesize(source: pd.DataFrame, n_rows: int, rng: np.random.Generator, first_employee_number: int = 1) -> pd.DataFrame:
+    """Draw `n_rows` synthetic employees from `source`."""
+    data = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+
+    if "MonthlyIncome" in data.columns:
+        income = data["MonthlyIncome"].to_numpy(dtype=np.float64) * rng.lognormal(0.0, INCOME_JITTER, n_rows)
+        low, high = source["MonthlyIncome"].min(), source["MonthlyIncome"].max()
+        data["MonthlyIncome"] = np.clip(np.rint(income), max(low, 1), high).astype(source["MonthlyIncome"].dtype)
+
+    for column in RATE_COLUMNS:
+        if column in data.columns:
+            rate = data[column].to_numpy(dtype=np.float64) * rng.lognormal(0.0, RATE_JITTER, n_rows)
+            data[column] = np.clip(np.rint(rate), source[column].min(), source[column].max()).astype(source[column].dtype)
+
+    if "Age" in data.columns:
+        age = data["Age"].to_numpy() + rng.integers(-AGE_JITTER, AGE_JITTER + 1, n_rows)
+        low = np.full(n_rows, source["Age"].min())
+        if "TotalWorkingYears" in data.columns:
+            min_gap = int((source["Age"] - source["TotalWorkingYears"]).min())
+            low = np.maximum(low, data["TotalWorkingYears"].to_numpy() + min_gap)
+        data["Age"] = np.clip(age, low, source["Age"].max()).astype(source["Age"].dtype)
+
+    if "EmployeeNumber" in data.columns:
+        data["EmployeeNumber"] = np.arange(first_employee_number, first_employee_number + n_rows, dtype=np.int64)
+    return data
+
+
+def iter_synthetic(
+    n_rows: int,
+    chunk_rows: int = 100_000,
+    seed: int = 0,
+    source: Optional[pd.DataFrame] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield `n_rows` synthetic employees in chunks, so millions of rows never sit in memory at once."""
+    source = load_source() if source is None else source
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, chunk_rows):
+        yield synthesize(source, min(chunk_rows, n_rows - start), rng, first_employee_number=start + 1)
+
+
+def generate(n_rows: int, seed: int = 0, source: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """A synthetic workforce of `n_rows` employees as one frame."""
+    return pd.concat(iter_synthetic(n_rows, max(n_rows, 1), seed, source), ignore_index=True)
+
+
+def compare_marginals(source: pd.DataFrame, synthetic: pd.DataFrame, max_levels: int = 50) -> pd.DataFrame:
+    """Per-column distance between source and synthetic marginals.
+
+    Columns with at most `max_levels` distinct values report the total variation distance
+    between their frequency tables; other numeric columns report the largest relative
+    difference among the mean and the 5th, 50th and 95th percentiles.
+    """
+    rows = []
+    for column in source.columns:
+        if column == "EmployeeNumber" or column not in synthetic.columns:
+            continue
+        if source[column].nunique() <= max_levels:
+            expected = source[column].value_counts(normalize=True)
+            observed = synthetic[column].value_counts(normalize=True)
+            levels = expected.index.union(observed.index)
+            distance = 0.5 * float((expected.reindex(levels, fill_value=0) - observed.reindex(levels, fill_value=0)).abs().sum())
+            rows.append({"column": column, "statistic": "total_variation", "distance": distance})
+        else:
+            quantiles = [0.05, 0.5, 0.95]
+            expected = np.append(source[column].quantile(quantiles).to_numpy(), source[column].mean())
+            observed = np.append(synthetic[column].quantile(quantiles).to_numpy(), synthetic[column].mean())
+            distance = float(np.max(np.abs(observed - expected) / np.abs(expected)))
+            rows.append({"column": column, "statistic": "relative_quantile", "distance": distance})
+    return pd.DataFrame(rows)
+
+
+def count_violations(data: pd.DataFrame) -> int:
+    """Rows breaking any of the attrition, performance or retention validation rules."""
+    return sum(validate_frame(data, rules).total_violations for rules in (ATTRITION_RULES, PERFORMANCE_RULES, RETENTION_RULES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--output", default="workforce.csv")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="compare marginals with the source and validate the first chunk")
+    args = parser.parse_args()
+
+    source = load_source()
+    started = time.perf_counter()
+    writer = None
+    written = 0
+    for i, chunk in enumerate(iter_synthetic(args.rows, args.chunk_rows, args.seed, source)):
+        if args.check and i == 0:
+            print(compare_marginals(source, chunk).sort_values("distance", ascending=False).head(10).to_string(index=False))
+            print(f"rule violations in first chunk: {count_violations(chunk)}")
+        if args.output.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(args.output, table.schema)
+            writer.write_table(table)
+        else:
+            chunk.to_csv(args.output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        written += len(chunk)
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {written} synthetic employees to {args.output} in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 import streamlit as st
 import requests
 import pandas as pd
-import json
 from streamlit_lottie import st_lottie
 import plotly.express as px
 import plotly.graph_objects as go
 
+from dashboard_client import load_json_asset, predict_legacy
+
 # Custom CSS for styling
 st.markdown("""
 <style>
@@ -19,16 +20,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Function to load Lottie animation (you can replace the URL with a local file or another animation)
-def load_lottie_url(url: str):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except:
-        return None
-
 # Initialize session state for navigation
 if 'page' not in st.session_state:
     st.session_state.page = "home"
@@ -50,7 +41,8 @@ if st.session_state.page == "home":
 
     # Lottie animation
     lottie_url = "https://lottie.host/1b1b1b1b-1b1b-1b1b-1b1b-1b1b1b1b1b1b.json"  # Replace with a real Lottie animation URL
-    lottie_json = load_lottie_url(lottie_url)
+    # Fetched once per hour with a timeout, not on every rerun
+    lottie_json = load_json_asset(lottie_url)
     if lottie_json:
         st_lottie(lottie_json, height=200)
     else:
@@ -102,13 +94,7 @@ elif st.session_state.page == "individual":
                 "OverTime_Yes": 1 if overtime == "Yes" else 0
             }]
             try:
-                response = requests.post(
-                    "http://127.0.0.1:5000/predict",
-                    headers={"Content-Type": "application/json"},
-                    data=json.dumps(input_data)
-                )
-                response.raise_for_status()
-                result = response.json()
+                result = predict_legacy(input_data)
                 predictions = result.get("predictions", [])
                 message = result.get("message", "No message")
 
@@ -179,7 +165,7 @@ elif st.session_state.page == "multiple":
             "department": "Engineering",
             "satisfaction": 3
         })
-        st.experimental_rerun()
+        st.rerun()
 
     # Predict button for all employees
     if st.session_state.employees and st.button("Predict for All Employees"):
@@ -189,13 +175,7 @@ elif st.session_state.page == "multiple":
             "OverTime_Yes": 1 if emp["overtime"] == "Yes" else 0
         } for emp in st.session_state.employees]
         try:
-            response = requests.post(
-                "http://127.0.0.1:5000/predict",
-                headers={"Content-Type": "application/json"},
-                data=json.dumps(input_data)
-            )
-            response.raise_for_status()
-            result = response.json()
+            result = predict_legacy(input_data)
             predictions = result.get("predictions", [])
             message = result.get("message", "No message")
 
@@ -239,13 +219,7 @@ elif st.session_state.page == "csv":
         if all(col in df.columns for col in required_columns):
             input_data = df[required_columns].to_dict(orient="records")
             try:
-                response = requests.post(
-                    "http://127.0.0.1:5000/predict",
-                    headers={"Content-Type": "application/json"},
-                    data=json.dumps(input_data)
-                )
-                response.raise_for_status()
-                result = response.json()
+                result = predict_legacy(input_data)
                 predictions = result.get("predictions", [])
                 message = result.get("message", "No message")
 
@@ -0,0 +1,110 @@
+"""Shared HTTP client for the Streamlit dashboards.
+
+Streamlit reruns a page script from the top on every interaction, for every user. The
+client is created once per dashboard process (`st.cache_resource`) and shared by all
+sessions: one keep-alive connection pool, connect and read timeouts on every call, and
+retries only for connections that failed before the request was sent. Predictions for an
+identical employee record and static assets are cached with `st.cache_data`, so reruns
+and repeated lookups do not go back to the API at all.
+
+Against the unified service (service.py) an employee is scored with one `/predict_all`
+call; against apps.py, which has no such endpoint, the performance and retention calls
+are sent concurrently instead.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import logging
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Performance & Retention API (apps.py) or the unified service (service.py)
+API_URL = os.getenv("HR_API_URL", "http://localhost:8001")
+# Attrition API the home dashboard (dashboard.py) was written against
+LEGACY_API_URL = os.getenv("HR_LEGACY_API_URL", "http://127.0.0.1:5000")
+
+CONNECT_TIMEOUT = float(os.getenv("HR_CLIENT_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HR_CLIENT_READ_TIMEOUT", "30"))
+# Connections kept open per host, shared by every dashboard session in the process
+POOL_SIZE = int(os.getenv("HR_CLIENT_POOL_SIZE", "32"))
+
+# Identical inputs within the TTL are answered from the cache
+PREDICTION_CACHE_TTL = int(os.getenv("HR_CLIENT_CACHE_TTL", "300"))
+PREDICTION_CACHE_ENTRIES = 10000
+ASSET_CACHE_TTL = 3600
+
+
+class ApiClient:
+    """A pooled session with timeouts, and a small thread pool for concurrent calls."""
+
+    def __init__(self, pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT):
+        # Predictions are not retried once sent; a connection that never opened is safe to retry
+        retry = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.1, allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="dashboard-api")
+        # Base URLs found to have no /predict_all endpoint
+        self._per_model_only: set = set()
+
+    def get_json(self, url: str) -> Any:
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def post_json(self, url: str, payload: Any) -> Any:
+        response = self.session.post(url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def predict_employee(self, employee: Dict[str, Any], base_url: str = API_URL) -> Dict[str, float]:
+        """Performance and retention (and attrition, from the unified service) for one employee."""
+        if base_url not in self._per_model_only:
+            try:
+                return self.post_json(f"{base_url}/predict_all", employee)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                logger.info(f"{base_url} has no /predict_all; using the per-model endpoints.")
+                self._per_model_only.add(base_url)
+        performance, retention = self.executor.map(
+            lambda path: self.post_json(f"{base_url}{path}", employee), ["/predict_performance", "/predict_retention"]
+        )
+        return {**performance, **retention}
+
+
+@st.cache_resource
+def get_client() -> ApiClient:
+    return ApiClient()
+
+
+@st.cache_data(ttl=PREDICTION_CACHE_TTL, max_entries=PREDICTION_CACHE_ENTRIES, show_spinner=False)
+def predict_employee(employee: Dict[str, Any], base_url: str = API_URL) -> Dict[str, float]:
+    return get_client().predict_employee(employee, base_url)
+
+
+@st.cache_data(ttl=PREDICTION_CACHE_TTL, max_entries=PREDICTION_CACHE_ENTRIES, show_spinner=False)
+def predict_legacy(records: List[Dict[str, Any]], base_url: str = LEGACY_API_URL) -> Dict[str, Any]:
+    """Every record in one `/predict` call to the legacy attrition API."""
+    return get_client().post_json(f"{base_url}/predict", records)
+
+
+@st.cache_data(ttl=ASSET_CACHE_TTL, show_spinner=False)
+def load_json_asset(url: str) -> Optional[Any]:
+    """A static JSON asset (e.g. a Lottie animation), or None if it cannot be fetched.
+
+    Failures are cached too, so an unreachable asset costs one timeout per hour rather
+    than one per rerun.
+    """
+    try:
+        return get_client().get_json(url)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Could not load {url}: {e}")
+        return None
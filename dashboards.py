@@ -2,6 +2,8 @@ import streamlit as st
 import requests
 import pandas as pd
 
+from dashboard_client import API_URL, predict_employee
+
 # Streamlit app
 st.title("HR Analytics Dashboard (Performance & Retention)")
 st.write("Enter employee details to predict performance and retention risk.")
@@ -44,21 +46,16 @@ if submitted:
         "RelationshipSatisfaction": float(relationship_satisfaction)
     }
 
-    # Call the API endpoints
+    # One pooled, cached call for both predictions (see dashboard_client.py; HR_API_URL sets the service)
     try:
-        # Ensure the API is running on port 8001
-        api_url = "http://localhost:8001"  # Update if using a different port
-        
+        result = predict_employee(employee_data, API_URL)
+
         # Performance prediction
-        response_performance = requests.post(f"{api_url}/predict_performance", json=employee_data)
-        performance_result = response_performance.json()
-        st.write(f"**Predicted Performance Rating**: {performance_result['PerformanceRating']}")
+        st.write(f"**Predicted Performance Rating**: {result['PerformanceRating']}")
         st.write("**Note**: PerformanceRating of 1 indicates a high performer (original rating 4). A rating of 0 indicates a lower performer (original rating 3). Use with caution due to low model reliability (F1-score: 0.2670).")
 
         # Retention prediction
-        response_retention = requests.post(f"{api_url}/predict_retention", json=employee_data)
-        retention_result = response_retention.json()
-        st.write(f"**Retention Risk**: {'High' if retention_result['RetentionRisk'] == 1 else 'Low'}")
-        st.write(f"**Retention Risk Probability**: {retention_result['RetentionRiskProbability']:.2%}")
-    except Exception as e:
-        st.error(f"Error getting predictions: {str(e)}")
\ No newline at end of file
+        st.write(f"**Retention Risk**: {'High' if result['RetentionRisk'] == 1 else 'Low'}")
+        st.write(f"**Retention Risk Probability**: {result['RetentionRiskProbability']:.2%}")
+    except (requests.exceptions.RequestException, KeyError) as e:
+        st.error(f"Error getting predictions: {str(e)}")
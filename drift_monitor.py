@@ -0,0 +1,399 @@
+"""Drift monitor over the prediction log, in memory that does not grow with the log.
+
+The monitor tails predictions.log (the JSON-lines format written by app.py, apps.py and
+service.py) from the byte offset it last reached, a bounded block at a time. Offsets are
+kept per file, so rotated backups are finished before the live file, and a trailing line
+that is still being written is left for the next poll. Every input field and model
+output is summarized by a fixed-size sketch:
+
+- numeric fields: a histogram over the reference profile's decile edges, running count,
+  mean, min and max, and a uniform reservoir sample for quantiles;
+- discrete fields (text, Likert scales, predicted classes): category frequencies, capped
+  at MAX_CATEGORIES distinct values with the rest counted as "__other__".
+
+The reference profile is the same set of sketches built from Attrition.csv and the
+models' predictions for it, saved to drift_reference.json on first use. Drift is the
+population stability index (PSI) of each field's current distribution against the
+reference; above 0.1 is worth a look and above 0.25 is a significant shift.
+
+    python drift_monitor.py reference [--data Attrition.csv] [--output drift_reference.json]
+    python drift_monitor.py report [--log predictions.log]
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from prediction_sink import PREDICTION_LOG_FORMAT, PREDICTION_LOG_PATH
+from validation import EMPLOYEE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_DATA_PATH = os.getenv("HR_DRIFT_REFERENCE_DATA", "Attrition.csv")
+REFERENCE_PATH = os.getenv("HR_DRIFT_REFERENCE", "drift_reference.json")
+# Log bytes parsed per step; bounds the monitor's working memory together with the sketches
+READ_BYTES = int(os.getenv("HR_DRIFT_READ_BYTES", str(4 * 1024 * 1024)))
+RESERVOIR_SIZE = int(os.getenv("HR_DRIFT_RESERVOIR_SIZE", "2048"))
+MAX_CATEGORIES = 64
+# Fields with at most this many distinct reference values are tracked as categories
+DISCRETE_MAX_VALUES = 12
+HISTOGRAM_BINS = 10
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# Fewer observations than this give a PSI too noisy to act on
+MIN_OBSERVATIONS = 100
+
+OUTPUT_FIELDS = ["AttritionRisk", "AttritionRiskProbability", "PerformanceRating", "RetentionRisk", "RetentionRiskProbability"]
+PROBABILITY_FIELDS = ["AttritionRiskProbability", "RetentionRiskProbability"]
+OTHER = "__other__"
+
+
+def psi(expected: np.ndarray, actual: np.ndarray, epsilon: float = 1e-4) -> float:
+    """Population stability index between two proportion vectors over the same bins."""
+    expected = np.clip(expected, epsilon, None)
+    actual = np.clip(actual, epsilon, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _category_labels(values: pd.Series) -> pd.Series:
+    # 3 from JSON, 3.0 from a float column and "3" from CSV all become "3.0"
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.notna().all():
+        return numbers.astype(np.float64).astype(str)
+    return values.astype(str)
+
+
+class NumericSketch:
+    """Histogram over fixed edges, running moments and a reservoir sample."""
+
+    kind = "numeric"
+
+    def __init__(self, edges: List[float], reservoir_size: int = RESERVOIR_SIZE, seed: int = 0):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.reservoir = np.empty(reservoir_size, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: pd.Series) -> None:
+        values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, values, side="right"), minlength=len(self.counts))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        # Algorithm R, vectorized: the n-th value replaces a random slot with probability size / (n + 1);
+        # duplicate slots resolve to the later value, as they would one at a time
+        size = len(self.reservoir)
+        seen = self.count + np.arange(len(values))
+        filling = seen < size
+        self.reservoir[seen[filling]] = values[filling]
+        slots = self._rng.integers(0, seen[~filling] + 1) if (~filling).any() else np.empty(0, dtype=np.int64)
+        kept = slots < size
+        self.reservoir[slots[kept]] = values[~filling][kept]
+
+        self.count += len(values)
+        self.total += float(values.sum())
+
+    def proportions(self) -> np.ndarray:
+        return self.counts / max(self.count, 1)
+
+    def quantiles(self) -> Dict[str, float]:
+        sample = self.reservoir[:min(self.count, len(self.reservoir))]
+        if not len(sample):
+            return {}
+        return {f"p{int(q * 100):02d}": float(value) for q, value in zip(QUANTILES, np.quantile(sample, QUANTILES))}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "quantiles": self.quantiles(),
+        }
+
+    def drift(self, reference: "NumericSketch") -> float:
+        return psi(reference.proportions(), self.proportions())
+
+
+class CategorySketch:
+    """Frequencies of at most `max_categories` distinct values; later newcomers count as OTHER."""
+
+    kind = "categorical"
+
+    def __init__(self, max_categories: int = MAX_CATEGORIES):
+        self.max_categories = max_categories
+        self.counts: Dict[str, int] = {}
+        self.count = 0
+
+    def update(self, values: pd.Series) -> None:
+        values = values.dropna()
+        if values.empty:
+            return
+        for label, n in _category_labels(values).value_counts().items():
+            if label not in self.counts and len(self.counts) >= self.max_categories:
+                label = OTHER
+            self.counts[label] = self.counts.get(label, 0) + int(n)
+        self.count += len(values)
+
+    def proportions(self, labels: List[str]) -> np.ndarray:
+        counts = np.array([self.counts.get(label, 0) for label in labels], dtype=np.float64)
+        return counts / max(self.count, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "frequencies": {label: n / self.count for label, n in sorted(self.counts.items(), key=lambda item: -item[1])} if self.count else {},
+        }
+
+    def drift(self, reference: "CategorySketch") -> float:
+        # Values the reference never saw are pooled into one extra bin
+        labels = list(reference.counts)
+        current = self.proportions(labels)
+        return psi(np.append(reference.proportions(labels), 0.0), np.append(current, max(1.0 - current.sum(), 0.0)))
+
+
+def _new_sketch(spec: Dict[str, Any]):
+    return NumericSketch(spec["edges"]) if spec["kind"] == "numeric" else CategorySketch()
+
+
+def build_reference(data_path: str = REFERENCE_DATA_PATH) -> Dict[str, Any]:
+    """Sketch specs and summaries of the training data and the models' predictions on it."""
+    from batch_score import MODELS, input_rules, invalid_rows, score_chunk
+
+    data = pd.read_csv(data_path, usecols=lambda column: column in EMPLOYEE_COLUMNS)
+    mask, _ = invalid_rows(data, input_rules(list(MODELS)))
+    data = data[~mask].reset_index(drop=True)
+    results, _ = score_chunk(data, list(MODELS), skip_invalid=False)
+    frame = pd.concat([data, results[OUTPUT_FIELDS]], axis=1)
+
+    fields: Dict[str, Any] = {}
+    for field in EMPLOYEE_COLUMNS + OUTPUT_FIELDS:
+        values = frame[field]
+        if field in PROBABILITY_FIELDS:
+            spec: Dict[str, Any] = {"kind": "numeric", "edges": np.linspace(0, 1, HISTOGRAM_BINS + 1)[1:-1].tolist()}
+        elif values.dtype == object or values.nunique() <= DISCRETE_MAX_VALUES:
+            spec = {"kind": "categorical"}
+        else:
+            deciles = np.quantile(values.to_numpy(dtype=np.float64), np.linspace(0, 1, HISTOGRAM_BINS + 1)[1:-1])
+            spec = {"kind": "numeric", "edges": np.unique(deciles).tolist()}
+        sketch = _new_sketch(spec)
+        sketch.update(values)
+        if spec["kind"] == "numeric":
+            spec["counts"] = sketch.counts.tolist()
+        else:
+            spec["counts"] = sketch.counts
+        spec["summary"] = sketch.summary()
+        fields[field] = spec
+    return {"source": os.path.abspath(data_path), "rows": len(frame), "fields": fields}
+
+
+def load_reference(path: str = REFERENCE_PATH, data_path: str = REFERENCE_DATA_PATH) -> Dict[str, Any]:
+    """The saved reference profile, built from `data_path` and saved the first time."""
+    if os.path.isfile(path):
+        with open(path) as f:
+            return json.load(f)
+    reference = build_reference(data_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(reference, f, indent=1)
+    os.replace(tmp_path, path)
+    logger.info(f"Drift reference profile built from {data_path} ({reference['rows']} rows) and saved to {path}.")
+    return reference
+
+
+def _reference_sketch(spec: Dict[str, Any]):
+    sketch = _new_sketch(spec)
+    if spec["kind"] == "numeric":
+        sketch.counts = np.asarray(spec["counts"], dtype=np.int64)
+    else:
+        sketch.counts = dict(spec["counts"])
+    sketch.count = spec["summary"]["count"]
+    return sketch
+
+
+class DriftMonitor:
+    """Incremental reader of the prediction log and the current sketch of every field."""
+
+    def __init__(self, reference: Dict[str, Any], log_path: str = PREDICTION_LOG_PATH, read_bytes: int = READ_BYTES):
+        self.reference = reference
+        self.log_path = log_path
+        self.read_bytes = read_bytes
+        self.baseline = {field: _reference_sketch(spec) for field, spec in reference["fields"].items()}
+        self.sketches = {field: _new_sketch(spec) for field, spec in reference["fields"].items()}
+        self.inputs = [field for field in EMPLOYEE_COLUMNS if field in self.sketches]
+        self.outputs = [field for field in OUTPUT_FIELDS if field in self.sketches]
+        self.records = 0
+        self.skipped_lines = 0
+        self.endpoints: Counter = Counter()
+        # Bytes consumed per log file, by inode
+        self._offsets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _log_files(self) -> List[str]:
+        """Rotated backups oldest first, then the live file."""
+        directory = os.path.dirname(os.path.abspath(self.log_path))
+        prefix = os.path.basename(self.log_path) + "."
+        backups = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(prefix) and os.path.isfile(os.path.join(directory, name))
+        )
+        return backups + [self.log_path]
+
+    def poll(self) -> int:
+        """Read everything appended since the last poll; returns the number of records read.
+
+        Offsets are kept per file identity (inode), so records written just before a
+        rotation are read from the renamed backup and nothing is read twice. Only the
+        capped set of backups the sink keeps is tracked.
+        """
+        with self._lock:
+            read = 0
+            offsets: Dict[int, int] = {}
+            for path in self._log_files():
+                try:
+                    with open(path, "rb") as f:
+                        stat = os.fstat(f.fileno())
+                        offset = self._offsets.get(stat.st_ino, 0)
+                        if stat.st_size < offset:
+                            # Truncated in place, or a new file reusing the inode
+                            offset = 0
+                        while True:
+                            f.seek(offset)
+                            block = f.read(self.read_bytes)
+                            # A trailing line without its newline is still being written
+                            end = block.rfind(b"\n") + 1
+                            if not end and len(block) >= self.read_bytes:
+                                # A line longer than a whole block cannot be a prediction record
+                                self.skipped_lines += 1
+                                end = len(block)
+                            if not end:
+                                break
+                            read += self._ingest(block[:end])
+                            offset += end
+                except FileNotFoundError:
+                    # Rotated or removed since it was listed; its inode is picked up next poll
+                    continue
+                offsets[stat.st_ino] = offset
+            self._offsets = offsets
+            return read
+
+    def _ingest(self, block: bytes) -> int:
+        inputs, predictions = [], []
+        for line in block.splitlines():
+            # "<asctime> - {json}"
+            _, separator, payload = line.partition(b" - ")
+            try:
+                record = orjson.loads(payload) if separator else None
+            except orjson.JSONDecodeError:
+                record = None
+            if not isinstance(record, dict) or not isinstance(record.get("input"), dict):
+                self.skipped_lines += 1
+                continue
+            inputs.append(record["input"])
+            predictions.append(record.get("prediction") or {})
+            self.endpoints[record.get("endpoint", "unknown")] += 1
+        if not inputs:
+            return 0
+
+        for rows, fields in ((inputs, self.inputs), (predictions, self.outputs)):
+            frame = pd.DataFrame.from_records(rows)
+            for field in fields:
+                if field in frame.columns:
+                    self.sketches[field].update(frame[field])
+        self.records += len(inputs)
+        return len(inputs)
+
+    def report(self) -> Dict[str, Any]:
+        """PSI and current summary of every field, worst drift first."""
+        with self._lock:
+            fields = {}
+            for field, sketch in self.sketches.items():
+                baseline = self.baseline[field]
+                score = sketch.drift(baseline) if sketch.count else None
+                if sketch.count < MIN_OBSERVATIONS:
+                    status = "insufficient_data"
+                else:
+                    status = "alert" if score >= PSI_ALERT else "warn" if score >= PSI_WARN else "ok"
+                fields[field] = {
+                    "kind": sketch.kind,
+                    "psi": score,
+                    "status": status,
+                    "current": sketch.summary(),
+                    "reference": self.reference["fields"][field]["summary"],
+                }
+            ordered = dict(sorted(fields.items(), key=lambda item: -(item[1]["psi"] or 0.0)))
+            return {
+                "log": self.log_path,
+                "bytes_read": sum(self._offsets.values()),
+                "records": self.records,
+                "skipped_lines": self.skipped_lines,
+                "endpoints": dict(self.endpoints),
+                "reference": {"source": self.reference["source"], "rows": self.reference["rows"]},
+                "thresholds": {"warn": PSI_WARN, "alert": PSI_ALERT, "min_observations": MIN_OBSERVATIONS},
+                "fields": ordered,
+            }
+
+
+_monitor: Optional[DriftMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_drift_monitor() -> DriftMonitor:
+    """Process-wide monitor of the prediction log, created (and the reference loaded) on first use."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            if PREDICTION_LOG_FORMAT != "jsonl":
+                raise ValueError(f"The drift monitor reads the jsonl prediction log, not {PREDICTION_LOG_FORMAT}.")
+            _monitor = DriftMonitor(load_reference())
+        return _monitor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    reference = commands.add_parser("reference", help="build the reference profile from training data")
+    reference.add_argument("--data", default=REFERENCE_DATA_PATH)
+    reference.add_argument("--output", default=REFERENCE_PATH)
+    report = commands.add_parser("report", help="read the prediction log and print drift per field")
+    report.add_argument("--log", default=PREDICTION_LOG_PATH)
+    report.add_argument("--reference", default=REFERENCE_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.command == "reference":
+        if os.path.exists(args.output):
+            os.remove(args.output)
+        profile = load_reference(args.output, args.data)
+        print(f"Reference profile of {profile['rows']:,} rows saved to {args.output}.")
+        return
+
+    monitor = DriftMonitor(load_reference(args.reference), args.log)
+    if not os.path.isfile(args.log):
+        sys.exit(f"No prediction log at {args.log}.")
+    monitor.poll()
+    result = monitor.report()
+    print(f"{result['records']:,} records read from {args.log} ({result['skipped_lines']} lines skipped).")
+    for field, drift in result["fields"].items():
+        score = f"{drift['psi']:.4f}" if drift["psi"] is not None else "-"
+        print(f"{field:<26} {drift['kind']:<12} psi {score:>8}  {drift['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from fastapi import HTTPException
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "thread" keeps models shared in-process (sklearn and xgboost release the GIL while predicting);
+# "process" runs each call in a worker process that has the service module, and so its models, loaded
+EXECUTOR_KIND = os.getenv("HR_EXECUTOR", "thread")
+SINGLE_WORKERS = int(os.getenv("HR_SINGLE_WORKERS", "4"))
+BULK_WORKERS = int(os.getenv("HR_BULK_WORKERS", "2"))
+
+
+def _preload_modules(module_names: List[str]) -> None:
+    """Process pool initializer: import the service modules so models load once per worker."""
+    for module_name in module_names:
+        if module_name != "__main__":
+            importlib.import_module(module_name)
+
+
+def _timed_call(submitted_at: float, func: Callable, args: tuple) -> tuple:
+    """Run `func` in a worker, returning its queue wait and outcome.
+
+    HTTPException cannot be pickled, so it is returned as data and re-raised by the caller.
+    """
+    queue_wait = time.time() - submitted_at
+    try:
+        return queue_wait, func(*args), None
+    except HTTPException as e:
+        return queue_wait, None, (e.status_code, e.detail)
+
+
+class InferenceExecutor:
+    """A named worker pool that runs blocking parsing and inference off the event loop."""
+
+    def __init__(self, name: str, max_workers: int, kind: str = EXECUTOR_KIND, preload: Optional[List[str]] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}. Use 'thread' or 'process'.")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self._preload = preload or []
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+
+    @property
+    def pool(self) -> Executor:
+        # Created on first use so that worker processes are forked after the models are loaded
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.kind == "process":
+                        start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context(start_method),
+                            initializer=_preload_modules,
+                            initargs=(self._preload,),
+                        )
+                    else:
+                        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-inference")
+                    logger.info(f"Started {self.kind} executor '{self.name}' with {self.max_workers} workers.")
+        return self._pool
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run `func(*args)` on the pool and await its result.
+
+        With a process pool, `func` must be a module-level function and its arguments picklable.
+        """
+        with self._lock:
+            self._submitted += 1
+        loop = asyncio.get_running_loop()
+        try:
+            queue_wait, result, http_error = await loop.run_in_executor(self.pool, _timed_call, time.time(), func, args)
+        finally:
+            with self._lock:
+                self._completed += 1
+        with self._lock:
+            self._total_wait += queue_wait
+            self._max_wait = max(self._max_wait, queue_wait)
+            self._last_wait = queue_wait
+        if http_error is not None:
+            raise HTTPException(status_code=http_error[0], detail=http_error[1])
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "name": self.name,
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "submitted": self._submitted,
+                "completed": completed,
+                "in_flight": self._submitted - completed,
+                "queue_wait_seconds": {
+                    "mean": self._total_wait / completed if completed else 0.0,
+                    "max": self._max_wait,
+                    "last": self._last_wait,
+                },
+            }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledFeaturizer:
+    """Turns raw employee records into the model's float64 feature matrix without pandas.
+
+    Supports the transforms the shipped models use: standard scaling of numeric columns,
+    `drop="first"` / `handle_unknown="ignore"` one-hot encoding, and fixed value maps such
+    as app.py's OverTime mapping. All parameters are copied out of the fitted objects into
+    NumPy arrays and dicts, and the arithmetic is the same as sklearn's, so the output
+    matches `ColumnTransformer.transform` bit for bit.
+    """
+
+    def __init__(
+        self,
+        input_features: Sequence[str],
+        n_outputs: int,
+        numeric: Sequence[Tuple[str, int, float, float]] = (),
+        mapped: Sequence[Tuple[str, int, Dict[Any, float]]] = (),
+        onehot: Sequence[Tuple[str, Dict[Any, int]]] = (),
+        fill_value: float = np.nan,
+        output_names: Optional[Sequence[str]] = None,
+    ):
+        self.input_features = list(input_features)
+        self.n_outputs = n_outputs
+        self.fill_value = fill_value
+        self.output_names = list(output_names) if output_names is not None else None
+        # Numeric columns: (input name, output column, mean, scale) -> (x - mean) / scale
+        self.numeric_names = [name for name, _, _, _ in numeric]
+        self.numeric_columns = np.array([col for _, col, _, _ in numeric], dtype=np.intp)
+        self.numeric_means = np.array([mean for _, _, mean, _ in numeric], dtype=np.float64)
+        self.numeric_scales = np.array([scale for _, _, _, scale in numeric], dtype=np.float64)
+        # Mapped columns: (input name, output column, {raw value: number}); unmapped values become NaN
+        self.mapped = list(mapped)
+        # One-hot columns: (input name, {category: output column}); dropped and unknown categories set nothing
+        self.onehot = list(onehot)
+
+    @classmethod
+    def from_column_transformer(cls, transformer) -> "CompiledFeaturizer":
+        """Compile a fitted ColumnTransformer of StandardScaler / OneHotEncoder blocks."""
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        if transformer.sparse_output_:
+            raise ValueError("Only ColumnTransformers with dense output can be compiled.")
+        numeric, onehot = [], []
+        for name, step, columns in transformer.transformers_:
+            if isinstance(step, str) and step == "drop" or len(columns) == 0:
+                continue
+            if isinstance(step, str):
+                raise ValueError(f"Block '{name}' ({step}) cannot be compiled.")
+            block = transformer.output_indices_[name]
+            if isinstance(step, StandardScaler):
+                means = step.mean_ if step.with_mean else np.zeros(len(columns))
+                scales = step.scale_ if step.with_std else np.ones(len(columns))
+                numeric.extend(
+                    (column, block.start + i, float(means[i]), float(scales[i]))
+                    for i, column in enumerate(columns)
+                )
+            elif isinstance(step, OneHotEncoder):
+                if step.handle_unknown != "ignore" or getattr(step, "_infrequent_enabled", False):
+                    raise ValueError(f"OneHotEncoder '{name}' must use handle_unknown='ignore' without infrequent categories.")
+                offset = block.start
+                drop_idx = step.drop_idx_ if step.drop_idx_ is not None else [None] * len(columns)
+                for column, categories, dropped in zip(columns, step.categories_, drop_idx):
+                    positions = {}
+                    for i, category in enumerate(categories):
+                        if dropped is not None and i == dropped:
+                            continue
+                        positions[category] = offset
+                        offset += 1
+                    onehot.append((column, positions))
+            else:
+                raise ValueError(f"Unsupported transformer in block '{name}': {type(step).__name__}")
+        return cls(
+            input_features=list(transformer.feature_names_in_),
+            n_outputs=sum(s.stop - s.start for s in transformer.output_indices_.values()),
+            numeric=numeric,
+            onehot=onehot,
+            output_names=list(transformer.get_feature_names_out()),
+        )
+
+    @classmethod
+    def from_value_maps(cls, features: Sequence[str], value_maps: Dict[str, Dict[Any, float]], fill_value: float = np.nan) -> "CompiledFeaturizer":
+        """Pass numeric features through and map the others, in `features` order."""
+        return cls(
+            input_features=features,
+            n_outputs=len(features),
+            numeric=[(name, i, 0.0, 1.0) for i, name in enumerate(features) if name not in value_maps],
+            mapped=[(name, i, value_maps[name]) for i, name in enumerate(features) if name in value_maps],
+            fill_value=fill_value,
+            output_names=features,
+        )
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> Tuple["CompiledFeaturizer", Any]:
+        """Compile the preprocessor of a fitted pipeline and return it with the final estimator.
+
+        Resampling steps such as SMOTE only act during fit and are skipped, as in `Pipeline.predict`.
+        """
+        transformer = pipeline.steps[0][1]
+        for _, step in pipeline.steps[1:-1]:
+            if not hasattr(step, "fit_resample"):
+                raise ValueError(f"Pipeline step {type(step).__name__} cannot be compiled.")
+        return cls.from_column_transformer(transformer), pipeline.steps[-1][1]
+
+    def output_sources(self) -> np.ndarray:
+        """Index into `input_features` of the raw field each output column is derived from."""
+        positions = {name: i for i, name in enumerate(self.input_features)}
+        sources = np.full(self.n_outputs, -1, dtype=np.intp)
+        sources[self.numeric_columns] = [positions[name] for name in self.numeric_names]
+        for name, column, _ in self.mapped:
+            sources[column] = positions[name]
+        for name, columns in self.onehot:
+            sources[list(columns.values())] = positions[name]
+        return sources
+
+    def transform_records(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Featurize a list of plain dicts (e.g. `model_dump()` output) into a C-contiguous array."""
+        n = len(records)
+        X = np.zeros((n, self.n_outputs), dtype=np.float64)
+        fill = self.fill_value
+        if self.numeric_names:
+            raw = np.array([[record.get(name, fill) for name in self.numeric_names] for record in records], dtype=np.float64)
+            X[:, self.numeric_columns] = (raw - self.numeric_means) / self.numeric_scales
+        for name, column, mapping in self.mapped:
+            X[:, column] = [mapping.get(record[name], np.nan) if name in record else fill for record in records]
+        for name, positions in self.onehot:
+            for row, record in enumerate(records):
+                column = positions.get(record.get(name))
+                if column is not None:
+                    X[row, column] = 1.0
+        return X
+
+    def transform_frame(self, data: pd.DataFrame) -> np.ndarray:
+        """Featurize a DataFrame of raw columns, vectorized per column."""
+        n = len(data)
+        X = np.zeros((n, self.n_outputs), dtype=np.float64)
+        fill = self.fill_value
+
+        def column_values(name):
+            return data[name].to_numpy() if name in data.columns else np.full(n, fill, dtype=object)
+
+        if self.numeric_names:
+            raw = np.column_stack([column_values(name).astype(np.float64) for name in self.numeric_names]) if n else np.zeros((0, len(self.numeric_names)))
+            X[:, self.numeric_columns] = (raw - self.numeric_means) / self.numeric_scales
+        for name, column, mapping in self.mapped:
+            if name in data.columns:
+                X[:, column] = data[name].map(mapping).to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                X[:, column] = fill
+        for name, positions in self.onehot:
+            categories = list(positions)
+            codes = pd.Categorical(column_values(name), categories=categories).codes
+            hit = codes >= 0
+            targets = np.array([positions[category] for category in categories], dtype=np.intp)
+            X[np.flatnonzero(hit), targets[codes[hit]]] = 1.0
+        return X
@@ -0,0 +1,28 @@
+"""Gunicorn settings for running app:app, apps:app or service:app with several uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app:app
+    gunicorn -c gunicorn.conf.py apps:app --bind 0.0.0.0:8001
+    gunicorn -c gunicorn.conf.py service:app --bind 0.0.0.0:8002
+
+With preload (the default) the service module, and so every eager model, is imported once
+in the master; workers are forked from it and share those pages copy-on-write, on top of
+the memory-mapped model bundles they already share through the page cache.
+"""
+import os
+
+bind = os.getenv("HR_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("HR_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("HR_PRELOAD", "1") == "1"
+timeout = int(os.getenv("HR_WORKER_TIMEOUT", "120"))
+
+
+def post_worker_init(worker):
+    # Per-worker footprint once the worker is ready; PSS counts shared pages once across workers
+    from model_store import process_memory
+
+    memory = process_memory()
+    worker.log.info(
+        f"Worker {worker.pid} ready: "
+        + ", ".join(f"{key.replace('_mib', '')} {value:.1f} MiB" for key, value in memory.items())
+    )
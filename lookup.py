@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import itertools
+import logging
+import os
+
+from validation import AllowedValuesRule, RangeRule, Rule
+
+logger = logging.getLogger(__name__)
+
+# Precompute every prediction for models whose validated inputs take only a few values
+LOOKUP_TABLES_ENABLED = os.getenv("HR_LOOKUP_TABLES", "1") == "1"
+LOOKUP_MAX_CELLS = int(os.getenv("HR_LOOKUP_MAX_CELLS", "100000"))
+
+
+def finite_domains(features: Sequence[str], rules: Sequence[Rule]) -> Optional[Dict[str, List[Any]]]:
+    """Derive each feature's finite set of valid values from a service's validation rules.
+
+    Categorical features take their allowed values; bounded integer ranges such as the 1-5
+    Likert scales take every integer in range. Returns None if any feature is unbounded.
+    """
+    domains = {}
+    for feature in features:
+        for rule in rules:
+            if rule.field != feature:
+                continue
+            if isinstance(rule, AllowedValuesRule):
+                domains[feature] = list(rule.allowed)
+            elif isinstance(rule, RangeRule) and float(rule.low).is_integer() and float(rule.high).is_integer():
+                domains[feature] = list(range(int(rule.low), int(rule.high) + 1))
+        if feature not in domains:
+            return None
+    return domains
+
+
+class LookupTable:
+    """Every output of a model over a finite input domain, gathered by mixed-radix index.
+
+    `outputs` is the tuple a predict function returns, e.g. `(predictions, probabilities)`,
+    with one row per cell of the cartesian product of `domains` (first feature slowest).
+    Rows with a value outside the domain, including non-integer scores and missing values,
+    are answered by the `fallback` predict function instead.
+    """
+
+    def __init__(self, features: Sequence[str], domains: Dict[str, Sequence[Any]], outputs: tuple):
+        self.features = list(features)
+        self.domains = {feature: list(domains[feature]) for feature in self.features}
+        self.outputs = outputs
+        sizes = [len(self.domains[feature]) for feature in self.features]
+        self.n_cells = int(np.prod(sizes))
+        self.strides = [int(np.prod(sizes[i + 1:])) for i in range(len(sizes))]
+        self.codes = [{value: code for code, value in enumerate(self.domains[feature])} for feature in self.features]
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def build(
+        cls,
+        features: Sequence[str],
+        rules: Sequence[Rule],
+        predict_records: Callable[[List[Dict[str, Any]]], tuple],
+        max_cells: int = LOOKUP_MAX_CELLS,
+    ) -> Optional["LookupTable"]:
+        """Enumerate the domain implied by `rules` and score it once; None if it is not small and finite."""
+        domains = finite_domains(features, rules)
+        if domains is None:
+            logger.info(f"No lookup table for {list(features)}: input domain is not finite.")
+            return None
+        n_cells = int(np.prod([len(values) for values in domains.values()]))
+        if n_cells > max_cells:
+            logger.info(f"No lookup table for {list(features)}: {n_cells} cells exceeds the limit of {max_cells}.")
+            return None
+        records = [dict(zip(features, values)) for values in itertools.product(*(domains[feature] for feature in features))]
+        table = cls(features, domains, predict_records(records))
+        logger.info(f"Built lookup table for {list(features)} with {n_cells} cells.")
+        return table
+
+    def index_records(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Cell index for each record, or -1 when a value is outside the domain."""
+        index = np.zeros(len(records), dtype=np.intp)
+        for row, record in enumerate(records):
+            cell = 0
+            for feature, codes, stride in zip(self.features, self.codes, self.strides):
+                code = codes.get(record.get(feature))
+                if code is None:
+                    cell = -1
+                    break
+                cell += code * stride
+            index[row] = cell
+        return index
+
+    def index_frame(self, data: pd.DataFrame) -> np.ndarray:
+        index = np.zeros(len(data), dtype=np.float64)
+        for feature, codes, stride in zip(self.features, self.codes, self.strides):
+            if feature not in data.columns:
+                return np.full(len(data), -1, dtype=np.intp)
+            # Unmatched values map to NaN and poison the row's index
+            index += data[feature].map(codes).to_numpy(dtype=np.float64, na_value=np.nan) * stride
+        return np.where(np.isnan(index), -1, index).astype(np.intp)
+
+    def _gather(self, index: np.ndarray, fallback: Callable[[np.ndarray], tuple]) -> tuple:
+        miss = index < 0
+        n_miss = int(miss.sum())
+        self.hits += len(index) - n_miss
+        self.misses += n_miss
+        results = tuple(output[np.where(miss, 0, index)] if output is not None else None for output in self.outputs)
+        if n_miss:
+            rows = np.flatnonzero(miss)
+            for result, computed in zip(results, fallback(rows)):
+                if result is not None:
+                    result[rows] = computed
+        return results
+
+    def predict_records(self, records: List[Dict[str, Any]], fallback: Callable[[List[Dict[str, Any]]], tuple]) -> tuple:
+        return self._gather(self.index_records(records), lambda rows: fallback([records[row] for row in rows]))
+
+    def predict_frame(self, data: pd.DataFrame, fallback: Callable[[pd.DataFrame], tuple]) -> tuple:
+        return self._gather(self.index_frame(data), lambda rows: fallback(data.iloc[rows]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "features": self.features,
+            "cells": self.n_cells,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,138 @@
+"""Admission of whole-file bulk uploads by estimated working memory.
+
+A bulk request scored in one piece holds its parsed frame, model inputs, results, log
+records and encoded response at once, so its peak memory grows with its row count. With
+HR_BULK_MEMORY_BUDGET_MB set, each upload's peak is estimated before it is parsed: its
+rows (CSV line breaks, the Parquet footer or the Arrow batch headers) times
+HR_BULK_BYTES_PER_ROW, plus the upload itself when it is held as bytes. An upload whose
+estimate is over the whole budget is rejected with 413 and pointed at streaming mode,
+which holds one chunk at a time; one that fits, but not next to the uploads already
+being scored, waits until enough of them finish. Streamed requests are not counted.
+
+The budget is per process, so every gunicorn worker admits up to its own budget. The
+default bytes per row is the worst endpoint's peak RSS increase per row measured by
+`python -m benchmarks.memory`; rerun it to calibrate for other data or settings.
+"""
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import os
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import STAGE_SECONDS
+from uploads import UploadSource, count_upload_rows
+
+# 0 admits every upload without estimating it
+BULK_MEMORY_BUDGET_MB = float(os.getenv("HR_BULK_MEMORY_BUDGET_MB", "0"))
+BULK_BYTES_PER_ROW = int(os.getenv("HR_BULK_BYTES_PER_ROW", "1000"))
+
+
+class MemoryBudgetExceeded(Exception):
+    """An upload's estimated working memory is larger than the whole budget."""
+
+
+class MemoryBudget:
+    """Estimated bytes held by the bulk requests running in this process, up to a limit."""
+
+    def __init__(self, limit_mb: float = BULK_MEMORY_BUDGET_MB, bytes_per_row: int = BULK_BYTES_PER_ROW):
+        self.limit = int(limit_mb * 2**20)
+        self.bytes_per_row = bytes_per_row
+        self.in_use = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.deferred = 0
+        self.rejected = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def estimate(self, rows: int, upload_bytes: int = 0) -> int:
+        return rows * self.bytes_per_row + upload_bytes
+
+    def _wakeup(self) -> asyncio.Condition:
+        # Conditions belong to one event loop; a new loop (e.g. a test client) gets its own
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition, self._loop = asyncio.Condition(), loop
+        return self._condition
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int, endpoint: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold `nbytes` of the budget for the duration of the block, waiting for it if needed."""
+        if not self.enabled:
+            yield
+            return
+        if nbytes > self.limit:
+            self.rejected += 1
+            raise MemoryBudgetExceeded(
+                f"Scoring this upload in one piece needs an estimated {nbytes / 2**20:.0f} MiB, more than the "
+                f"{self.limit / 2**20:.0f} MiB bulk memory budget. Send it in smaller files, "
+                "or in streaming mode (?stream=ndjson) where the endpoint offers it."
+            )
+        condition = self._wakeup()
+        started = time.perf_counter()
+        async with condition:
+            if self.in_use + nbytes > self.limit:
+                self.deferred += 1
+                self.waiting += 1
+                try:
+                    await condition.wait_for(lambda: self.in_use + nbytes <= self.limit)
+                finally:
+                    self.waiting -= 1
+            self.in_use += nbytes
+            self.admitted += 1
+        if endpoint is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - started, endpoint, "memory_wait")
+        try:
+            yield
+        finally:
+            async with condition:
+                self.in_use -= nbytes
+                condition.notify_all()
+
+    @asynccontextmanager
+    async def reserve_upload(
+        self, source: UploadSource, fmt: str, endpoint: Optional[str] = None, rows_per_employee: int = 1
+    ) -> AsyncIterator[None]:
+        """Hold the estimated working memory of scoring `source` in one piece.
+
+        `rows_per_employee` scales the estimate for endpoints that score several rows per
+        uploaded employee, such as scenario sweeps.
+        """
+        if not self.enabled:
+            yield
+            return
+        rows = await run_in_threadpool(count_upload_rows, source, fmt)
+        upload_bytes = len(source) if isinstance(source, bytes) else 0
+        async with self.reserve(self.estimate(rows * rows_per_employee, upload_bytes), endpoint):
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit_mib": self.limit / 2**20,
+            "bytes_per_row": self.bytes_per_row,
+            "in_use_mib": self.in_use / 2**20,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "deferred": self.deferred,
+            "rejected": self.rejected,
+        }
+
+
+_budget: Optional[MemoryBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_memory_budget() -> MemoryBudget:
+    """Process-wide budget shared by every service module loaded in this process."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = MemoryBudget()
+        return _budget
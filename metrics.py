@@ -0,0 +1,187 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+import time
+
+# Request, stage and model timings; cheap enough to leave on, but can be switched off
+METRICS_ENABLED = os.getenv("HR_METRICS", "1") == "1"
+
+# Histogram upper bounds, in seconds and in rows
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric family with one series per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; `observe` is a bisect and three additions under a lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per series: [count per bucket (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels: str) -> "Timer":
+        """Context manager observing the wall time of its block."""
+        return Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = []
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+# Shared by both services; each process exposes its own series
+REQUEST_SECONDS = Histogram("hr_request_duration_seconds", "Request latency from first byte received to last byte sent.", ["endpoint"])
+REQUESTS = Counter("hr_requests_total", "Completed requests by response status.", ["endpoint", "status"])
+IN_FLIGHT = Gauge("hr_requests_in_flight", "Requests currently being handled.", ["endpoint"])
+REQUEST_ROWS = Histogram("hr_request_rows", "Employee rows scored per request.", ["endpoint"], ROWS_BUCKETS)
+STAGE_SECONDS = Histogram("hr_stage_duration_seconds", "Time spent in each handler stage.", ["endpoint", "stage"])
+MODEL_SECONDS = Histogram("hr_model_duration_seconds", "Time spent in each model stage.", ["model", "stage"])
+
+METRICS: List[Metric] = [REQUEST_SECONDS, REQUESTS, IN_FLIGHT, REQUEST_ROWS, STAGE_SECONDS, MODEL_SECONDS]
+
+
+def render_metrics(metrics: Optional[List[Metric]] = None) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in (METRICS if metrics is None else metrics)) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests per route.
+
+    Requests are labelled with the route template (e.g. `/models/{name}/reload`), so path
+    parameters do not create new series; unmatched paths share the label `other`. Latency
+    runs until the last body chunk is sent, which covers the whole of a streamed response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._static_paths: Optional[set] = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        if self._static_paths is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._static_paths = {route.path for route in routes if hasattr(route, "path") and "{" not in route.path}
+        in_flight_label = scope["path"] if scope["path"] in self._static_paths else "other"
+        status = [500]
+        started = time.perf_counter()
+
+        async def send_and_record(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(in_flight_label)
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            IN_FLIGHT.dec(in_flight_label)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or in_flight_label
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+            REQUESTS.inc(endpoint, str(status[0]))
@@ -0,0 +1,127 @@
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence
+import hmac
+import logging
+import os
+import threading
+
+from model_store import ModelHandle
+
+logger = logging.getLogger(__name__)
+
+# How often model artifacts are checked for replacement; 0 turns the watcher off
+MODEL_RELOAD_POLL_SECONDS = float(os.getenv("HR_MODEL_RELOAD_POLL_SECONDS", "10"))
+
+# Shared secret for POST /models/{name}/reload (X-Admin-Token header); unset disables the endpoint
+MODEL_ADMIN_TOKEN = os.getenv("HR_ADMIN_TOKEN", "")
+
+# Rows every new model version is run on before it takes traffic
+WARMUP_DATA_PATH = os.getenv("HR_WARMUP_DATA", "Attrition.csv")
+WARMUP_ROWS = int(os.getenv("HR_WARMUP_ROWS", "64"))
+
+_warmup_data: Optional[pd.DataFrame] = None
+_warmup_lock = threading.Lock()
+
+
+def warmup_frame(columns: Sequence[str], path: str = WARMUP_DATA_PATH, rows: int = WARMUP_ROWS) -> Optional[pd.DataFrame]:
+    """A fixed sample of real rows for warm-up, or None if the data file is unavailable."""
+    global _warmup_data
+    with _warmup_lock:
+        if _warmup_data is None:
+            try:
+                data = pd.read_csv(path, encoding="utf-8-sig")
+                _warmup_data = data.sample(n=min(rows, len(data)), random_state=0).reset_index(drop=True)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping model warm-up, could not read {path}: {str(e)}")
+                return None
+    missing = [column for column in columns if column not in _warmup_data.columns]
+    if missing:
+        logger.warning(f"Skipping model warm-up, {path} lacks columns {missing}.")
+        return None
+    return _warmup_data[list(columns)].copy()
+
+
+def admin_authorized(token: Optional[str], expected: str = MODEL_ADMIN_TOKEN) -> bool:
+    """True when admin endpoints are enabled and `token` matches, compared in constant time."""
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
+
+
+class ModelRegistry:
+    """Hot reload for a service's model handles.
+
+    A daemon thread polls each loaded handle's artifact and reloads it when the file is
+    replaced; `reload` does the same on demand, optionally from a new path (in-process
+    callers only; the HTTP endpoints never take a path). Loading,
+    building and warm-up happen on the reloading thread while requests keep using the
+    current version, and the handle then swaps its reference in one assignment.
+
+    Threads do not survive fork, so the watcher restarts itself in forked children
+    (gunicorn workers started with --preload, process-pool executors), and every process
+    picks up a new artifact on its own. Replacing the artifact in place is therefore the
+    way to roll out a model to all workers; a reload request reaches one process only.
+    """
+
+    def __init__(self, handles: List[ModelHandle], poll_seconds: float = MODEL_RELOAD_POLL_SECONDS):
+        self.handles = {handle.name: handle for handle in handles}
+        self.poll_seconds = poll_seconds
+        self.reloads = 0
+        self.failed_reloads = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fork_hook_registered = False
+
+    def reload(self, name: str, path: Optional[str] = None) -> Dict[str, Any]:
+        handle = self.handles[name]
+        reloaded = handle.reload(path)
+        if reloaded:
+            self.reloads += 1
+        else:
+            self.failed_reloads += 1
+        return dict(handle.stats(), reloaded=reloaded)
+
+    def check(self) -> None:
+        """Reload every loaded model whose artifact changed on disk."""
+        for name, handle in self.handles.items():
+            if handle.loaded and handle.changed_on_disk():
+                logger.info(f"Detected a new {name} model artifact at {handle.path}.")
+                self.reload(name)
+
+    def start(self) -> None:
+        if self.poll_seconds <= 0:
+            return
+        if not self._fork_hook_registered and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+            self._fork_hook_registered = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _after_fork(self) -> None:
+        # Locks held by the parent's watcher at fork time would never be released here
+        for handle in self.handles.values():
+            handle.reset_locks()
+        self._stop = threading.Event()
+        if self._thread is not None:
+            self.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Model watcher check failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "poll_seconds": self.poll_seconds,
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "models": [handle.stats() for handle in self.handles.values()],
+        }
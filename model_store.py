@@ -0,0 +1,320 @@
+import joblib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from tree_ensemble import FlatTreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+# Pickled models are exported once to bundle directories: an uncompressed joblib dump that
+# can be opened with mmap_mode, plus the flattened tree buffers as plain .npy files. Pages
+# mapped from the same files are shared by every worker through the OS page cache.
+MODEL_BUNDLES_ENABLED = os.getenv("HR_MODEL_BUNDLES", "1") == "1"
+MODEL_BUNDLE_DIR = os.getenv("HR_MODEL_BUNDLE_DIR", "model_bundles")
+MODEL_MMAP = os.getenv("HR_MODEL_MMAP", "1") == "1"
+
+# Comma-separated model names loaded on first use instead of at import, e.g. "retention"
+LAZY_MODELS = {name.strip() for name in os.getenv("HR_LAZY_MODELS", "").split(",") if name.strip()}
+
+BUNDLE_FORMAT_VERSION = 1
+
+
+def _process_started_at() -> float:
+    """Wall-clock start of this process, so cold start includes interpreter and library imports."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) follows the parenthesised command name, which may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+PROCESS_STARTED_AT = _process_started_at()
+
+
+def process_memory() -> Dict[str, float]:
+    """Resident memory of this process in MiB.
+
+    `pss` splits shared pages between the processes mapping them, so summing it across
+    workers gives the real footprint; `shared` is what this worker shares with others.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.split()[-1:] == ["kB"]}
+        return {
+            "rss_mib": fields.get("Rss", 0) / 1024,
+            "pss_mib": fields.get("Pss", 0) / 1024,
+            "shared_mib": (fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024,
+            "private_mib": (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024,
+        }
+    except OSError:
+        import resource
+        # Peak RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_mib": peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024)}
+
+
+def final_estimator(model) -> Any:
+    return model.steps[-1][1] if hasattr(model, "steps") else model
+
+
+class ModelBundle:
+    """On-disk bundle for one pickled model, kept in step with its source file.
+
+    Layout: `manifest.json` (source size and mtime), `model.joblib` (uncompressed) and,
+    for tree ensembles, `trees/` with the flattened buffers from `FlatTreeEnsemble.save`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def for_source(cls, source: str, bundle_dir: str = MODEL_BUNDLE_DIR) -> "ModelBundle":
+        return cls(os.path.join(bundle_dir, os.path.splitext(os.path.basename(source))[0]))
+
+    def manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path, "manifest.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_current(self, source: str) -> bool:
+        manifest = self.manifest()
+        stat = os.stat(source)
+        return (
+            manifest is not None
+            and manifest.get("format_version") == BUNDLE_FORMAT_VERSION
+            and manifest.get("source_size") == stat.st_size
+            and manifest.get("source_mtime_ns") == stat.st_mtime_ns
+        )
+
+    def export(self, source: str, model: Any = None) -> None:
+        """Write the bundle next to a temporary name and move it into place."""
+        stat = os.stat(source)
+        model = joblib.load(source) if model is None else model
+        staging = f"{self.path}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        joblib.dump(model, os.path.join(staging, "model.joblib"), compress=0)
+        try:
+            FlatTreeEnsemble.from_model(final_estimator(model)).save(os.path.join(staging, "trees"))
+        except ValueError:
+            pass
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump({
+                "format_version": BUNDLE_FORMAT_VERSION,
+                "source": os.path.abspath(source),
+                "source_size": stat.st_size,
+                "source_mtime_ns": stat.st_mtime_ns,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }, f, indent=2)
+        previous = f"{self.path}.old-{os.getpid()}"
+        if os.path.exists(self.path):
+            os.replace(self.path, previous)
+        os.replace(staging, self.path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    def load(self, mmap: bool = MODEL_MMAP) -> Tuple[Any, Optional[FlatTreeEnsemble]]:
+        mmap_mode = "r" if mmap else None
+        model = joblib.load(os.path.join(self.path, "model.joblib"), mmap_mode=mmap_mode)
+        trees_path = os.path.join(self.path, "trees")
+        flat = FlatTreeEnsemble.load(trees_path, mmap_mode=mmap_mode) if os.path.isdir(trees_path) else None
+        return model, flat
+
+
+def load_model(
+    source: str,
+    use_bundle: bool = MODEL_BUNDLES_ENABLED,
+    bundle_dir: str = MODEL_BUNDLE_DIR,
+    mmap: bool = MODEL_MMAP,
+) -> Tuple[Any, Optional[FlatTreeEnsemble], str]:
+    """Load a model through its bundle, exporting it first if missing or stale.
+
+    Returns `(model, flattened trees or None, origin)`. Falls back to the pickle itself
+    when the bundle directory cannot be written, e.g. on a read-only image.
+    """
+    if use_bundle:
+        bundle = ModelBundle.for_source(source, bundle_dir)
+        if not bundle.is_current(source):
+            try:
+                logger.info(f"Exporting {source} to bundle {bundle.path}...")
+                bundle.export(source)
+            except OSError as e:
+                logger.warning(f"Could not export bundle for {source}, loading the pickle: {str(e)}")
+                return joblib.load(source), None, "pickle"
+        model, flat = bundle.load(mmap=mmap)
+        return model, flat, "bundle (mmap)" if mmap else "bundle"
+    return joblib.load(source), None, "pickle"
+
+
+class ModelHandle:
+    """A model artifact and the serving object built from it, loaded at import or on first use.
+
+    `build(model, flat_trees)` turns the loaded estimator into what the endpoints call; it
+    defaults to the model itself. `warmup(value)` runs a few predictions on a freshly built
+    value before it serves traffic. Eager handles load in the constructor, so a server
+    started with `--preload` loads every model once in the parent and forked workers share it.
+
+    `reload` builds and warms a new version off to the side and then swaps the reference.
+    Callers take `get()` once per request, so in-flight requests finish on the version
+    they started with.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        build: Optional[Callable[[Any, Optional[FlatTreeEnsemble]], Any]] = None,
+        lazy: Optional[bool] = None,
+        warmup: Optional[Callable[[Any], None]] = None,
+    ):
+        self.name = name
+        self.path = path
+        self.build = build
+        self.warmup = warmup
+        self.lazy = name in LAZY_MODELS if lazy is None else lazy
+        self.version = 0
+        self.origin: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._value = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        if not self.lazy:
+            self.get()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> Any:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._swap(*self._load(self.path))
+        return self._value
+
+    def reset_locks(self) -> None:
+        """Fresh locks for a forked child; the parent's may have been held at fork time."""
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def changed_on_disk(self) -> bool:
+        """True when the loaded artifact has been replaced since it was read."""
+        if self._signature is None:
+            return False
+        try:
+            return _signature(self.path) != self._signature
+        except OSError:
+            # Mid-copy or briefly missing; look again on the next check
+            return False
+
+    def reload(self, path: Optional[str] = None) -> bool:
+        """Load, build and warm up `path` (default: the current artifact), then swap it in.
+
+        On any failure the serving version is kept and the error is recorded.
+        """
+        path = path or self.path
+        with self._reload_lock:
+            try:
+                loaded = self._load(path)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {str(e)}"
+                logger.error(f"Reload of {self.name} model from {path} failed; keeping version {self.version}: {self.last_error}")
+                return False
+            with self._lock:
+                self.path = path
+                self._swap(*loaded)
+            logger.info(f"Swapped in {self.name} model version {self.version} from {path}.")
+            return True
+
+    def _load(self, path: str) -> tuple:
+        signature = _signature(path)
+        started = time.perf_counter()
+        model, flat, origin = load_model(path)
+        loaded = time.perf_counter()
+        value = self.build(model, flat) if self.build is not None else model
+        built = time.perf_counter()
+        if self.warmup is not None:
+            self.warmup(value)
+        timings = (loaded - started, built - loaded, time.perf_counter() - built)
+        logger.info(
+            f"Loaded {self.name} model from {origin} in {timings[0]:.3f}s "
+            f"(+{timings[1]:.3f}s to build, +{timings[2]:.3f}s to warm up){' on first use' if self.lazy and not self.loaded else ''}."
+        )
+        return value, origin, signature, timings
+
+    def _swap(self, value: Any, origin: str, signature: Tuple[int, int], timings: tuple) -> None:
+        # A single reference assignment: readers see either the old or the new value
+        self._value = value
+        self.origin = origin
+        self._signature = signature
+        self.load_seconds, self.build_seconds, self.warmup_seconds = timings
+        self.loaded_at = time.time()
+        self.last_error = None
+        self.version += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "lazy": self.lazy,
+            "loaded": self.loaded,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)) if self.loaded_at else None,
+            "origin": self.origin,
+            "load_seconds": self.load_seconds,
+            "build_seconds": self.build_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "last_error": self.last_error,
+        }
+
+
+def _signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def startup_report(service: str, handles: List[ModelHandle]) -> Dict[str, Any]:
+    """Log and return cold-start time (since process start) and this worker's memory."""
+    report = {
+        "service": service,
+        "pid": os.getpid(),
+        "cold_start_seconds": time.time() - PROCESS_STARTED_AT,
+        "memory": process_memory(),
+        "models": [handle.stats() for handle in handles],
+    }
+    memory = report["memory"]
+    models = ", ".join(
+        f"{handle.name}={handle.load_seconds + handle.build_seconds + handle.warmup_seconds:.2f}s" if handle.loaded else f"{handle.name}=lazy"
+        for handle in handles
+    )
+    logger.info(
+        f"{service} ready in {report['cold_start_seconds']:.2f}s (pid {report['pid']}; models: {models}); "
+        + ", ".join(f"{key.replace('_mib', '')} {value:.1f} MiB" for key, value in memory.items())
+    )
+    return report
+
+
+if __name__ == "__main__":
+    # Build or refresh bundles ahead of a deploy, e.g. `python model_store.py *.pkl`
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    for source in sys.argv[1:] or ["attrition_model.pkl", "performance_model.pkl", "retention_model.pkl"]:
+        bundle = ModelBundle.for_source(source)
+        bundle.export(source)
+        logger.info(f"Exported {source} -> {bundle.path}")
@@ -0,0 +1,383 @@
+import pandas as pd
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no file locks, so only one process should write a jsonl log
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Where and how prediction records are written. "jsonl" keeps the original predictions.log
+# line format; "parquet" writes Arrow-backed segments per endpoint under <path>.parquet/
+PREDICTION_LOG_PATH = os.getenv("HR_PREDICTION_LOG", "predictions.log")
+PREDICTION_LOG_FORMAT = os.getenv("HR_PREDICTION_LOG_FORMAT", "jsonl")
+PREDICTION_LOG_MAX_BYTES = int(os.getenv("HR_PREDICTION_LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+PREDICTION_LOG_ROTATE_SECONDS = float(os.getenv("HR_PREDICTION_LOG_ROTATE_SECONDS", str(24 * 3600)))
+PREDICTION_LOG_BACKUPS = int(os.getenv("HR_PREDICTION_LOG_BACKUPS", "10"))
+PREDICTION_LOG_FLUSH_SECONDS = float(os.getenv("HR_PREDICTION_LOG_FLUSH_SECONDS", "1.0"))
+# Rows (not requests) waiting to be written; a bulk upload counts every row it logs
+PREDICTION_LOG_QUEUE_ROWS = int(os.getenv("HR_PREDICTION_LOG_QUEUE_ROWS", "200000"))
+# How long a bulk write waits for queue room before the rest of its rows are dropped
+PREDICTION_LOG_BLOCK_SECONDS = float(os.getenv("HR_PREDICTION_LOG_BLOCK_SECONDS", "30"))
+# Queued frames are turned into records and written this many rows at a time
+PREDICTION_LOG_WRITE_ROWS = int(os.getenv("HR_PREDICTION_LOG_WRITE_ROWS", "5000"))
+
+# Fraction of requests whose raw inputs are dumped to the diagnostic log at DEBUG level
+DIAGNOSTIC_SAMPLE_RATE = float(os.getenv("HR_DIAGNOSTIC_SAMPLE_RATE", "0.01"))
+
+
+def debug_sample(log: logging.Logger, build_message: Callable[[], str], rate: float = DIAGNOSTIC_SAMPLE_RATE) -> None:
+    """Log a diagnostic dump at DEBUG for a sample of calls; the message is only built when logged."""
+    if log.isEnabledFor(logging.DEBUG) and random.random() < rate:
+        log.debug(build_message())
+
+
+def _timestamp(now: float) -> str:
+    # Same layout as logging's default asctime, so existing predictions.log readers keep working
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)) + f",{int(now * 1000) % 1000:03d}"
+
+
+class _JsonLinesWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+        self.opened_at = time.time()
+
+    @property
+    def size(self) -> int:
+        return self.file.tell()
+
+    @property
+    def replaced(self) -> bool:
+        """True once another process has rotated the file this handle appends to."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self.file.write("".join(
+            f"{_timestamp(record['timestamp'])} - "
+            + json.dumps({"endpoint": record["endpoint"], "input": record["input"], "prediction": record["prediction"]})
+            + "\n"
+            for record in records
+        ))
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _ParquetWriter:
+    """One Parquet segment per endpoint; input and prediction are stored as struct columns."""
+
+    def __init__(self, path: str):
+        import pyarrow  # noqa: F401 - fail early if the columnar format is requested without pyarrow
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.writers: Dict[str, Any] = {}
+        self.opened_at = time.time()
+
+    @property
+    def size(self) -> int:
+        return sum(writer.file_handle.tell() for writer in self.writers.values() if writer.file_handle is not None)
+
+    @property
+    def replaced(self) -> bool:
+        # Every process writes its own segment files, so none is ever rotated by another
+        return False
+
+    @staticmethod
+    def _widen(schema):
+        import pyarrow as pa
+
+        # The API accepts ints or floats for numeric fields, so store every number as float64
+        def widen(data_type):
+            if pa.types.is_struct(data_type):
+                return pa.struct([pa.field(f.name, widen(f.type)) for f in data_type])
+            if pa.types.is_integer(data_type) or pa.types.is_null(data_type):
+                return pa.float64()
+            return data_type
+
+        return pa.schema([pa.field(f.name, widen(f.type)) for f in schema])
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_endpoint.setdefault(record["endpoint"], []).append(record)
+        for endpoint, rows in by_endpoint.items():
+            # The same instant as the jsonl log's local time, stored with its UTC zone
+            table = pa.Table.from_pylist([
+                {"timestamp": pd.Timestamp(row["timestamp"], unit="s", tz="UTC"), "input": row["input"], "prediction": row["prediction"]}
+                for row in rows
+            ])
+            writer = self.writers.get(endpoint)
+            if writer is not None:
+                try:
+                    table = table.cast(writer.schema)
+                except (pa.ArrowInvalid, ValueError):
+                    # Input fields changed shape; start a new file for this endpoint
+                    writer.close()
+                    writer = None
+            if writer is None:
+                schema = self._widen(table.schema)
+                table = table.cast(schema)
+                file_name = f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{len(self.writers)}.parquet"
+                writer = pq.ParquetWriter(os.path.join(self.path, file_name), schema)
+                self.writers[endpoint] = writer
+            writer.write_table(table)
+
+    def close(self) -> None:
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+class PredictionSink:
+    """Queue-backed prediction log written in batches by a background thread.
+
+    `write` only enqueues; records are serialized, written and rotated off the request path.
+    Bulk callers may pass the scored DataFrame and the results frame themselves, which are
+    converted to records in the writer thread, `write_rows` rows at a time, so a large upload
+    never exists as one list of dicts. The queue is bounded by rows rather than requests, since
+    one bulk request can hold a whole upload. Frames are queued as copies of `write_rows`-row
+    slices, each waiting up to `block_seconds` for room; bulk scoring runs in executor
+    workers, so this backpressure never blocks the event loop, and only what still does not
+    fit is dropped. Single records are written from request handlers and are dropped and
+    counted as soon as the queue is full.
+
+    Gunicorn and process-pool workers each run their own sink, and they may all append to
+    the same jsonl file. Each batch is written and the file rotated under an exclusive lock
+    on a hidden `.<name>.lock` file next to it, and a process whose file was rotated by
+    another reopens the path before writing, so no process renames or prunes a file that
+    another is still appending to. Parquet segments are named per process instead.
+    """
+
+    def __init__(
+        self,
+        path: str = PREDICTION_LOG_PATH,
+        fmt: str = PREDICTION_LOG_FORMAT,
+        max_bytes: int = PREDICTION_LOG_MAX_BYTES,
+        rotate_seconds: float = PREDICTION_LOG_ROTATE_SECONDS,
+        backups: int = PREDICTION_LOG_BACKUPS,
+        flush_seconds: float = PREDICTION_LOG_FLUSH_SECONDS,
+        queue_rows: int = PREDICTION_LOG_QUEUE_ROWS,
+        write_rows: int = PREDICTION_LOG_WRITE_ROWS,
+        block_seconds: float = PREDICTION_LOG_BLOCK_SECONDS,
+    ):
+        if fmt not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown prediction log format: {fmt}. Use 'jsonl' or 'parquet'.")
+        self.path = path if fmt == "jsonl" else f"{path}.parquet"
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self.queue_rows = queue_rows
+        self.write_rows = write_rows
+        self.block_seconds = block_seconds
+        self.written = 0
+        self.dropped = 0
+        self.queued_rows = 0
+        self._lock = threading.Lock()
+        # Notified whenever written rows leave the queue
+        self._room = threading.Condition(self._lock)
+        self._pid: Optional[int] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._writer = None
+        self._lock_file = None
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive fork, so process-pool workers start their own writer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self.queued_rows = 0
+                self._writer = None
+                # A flock is shared by every process holding the inherited descriptor, so open a new one
+                self._lock_file = None
+                self._thread = threading.Thread(target=self._run, name="prediction-sink", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def write(
+        self,
+        endpoint: str,
+        inputs: Union[pd.DataFrame, List[Dict[str, Any]]],
+        predictions: Union[pd.DataFrame, List[Dict[str, Any]]],
+    ) -> None:
+        self._ensure_started()
+        if not isinstance(predictions, pd.DataFrame):
+            self._enqueue(endpoint, inputs, predictions, deadline=None)
+            return
+        deadline = time.monotonic() + self.block_seconds
+        if len(predictions) <= self.write_rows:
+            self._enqueue(endpoint, inputs, predictions, deadline)
+            return
+        for start in range(0, len(predictions), self.write_rows):
+            stop = start + self.write_rows
+            # Copies, so a queued slice does not keep the whole request's frames alive
+            self._enqueue(endpoint, inputs.iloc[start:stop].copy(), predictions.iloc[start:stop].copy(), deadline)
+
+    def _enqueue(self, endpoint: str, inputs, predictions, deadline: Optional[float]) -> None:
+        """Queue one item, waiting until `deadline` (monotonic) for room; None drops it at once."""
+        rows = len(predictions)
+        with self._room:
+            while self.queued_rows + rows > self.queue_rows and deadline is not None and rows <= self.queue_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._room.wait(remaining)
+            full = self.queued_rows + rows > self.queue_rows
+            if full:
+                self.dropped += rows
+            else:
+                self.queued_rows += rows
+        if full:
+            if self.dropped == rows or self.dropped % 10000 < rows:
+                logger.warning(f"Prediction log queue is full; {self.dropped} records dropped so far.")
+            return
+        self._queue.put_nowait((time.time(), endpoint, inputs, predictions))
+
+    def _open_writer(self):
+        return _JsonLinesWriter(self.path) if self.fmt == "jsonl" else _ParquetWriter(self.path)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        # Serializes writing and rotating the shared jsonl file across processes
+        if self.fmt != "jsonl" or fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            directory, name = os.path.split(os.path.abspath(self.path))
+            self._lock_file = open(os.path.join(directory, f".{name}.lock"), "a")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _rotate(self) -> None:
+        self._writer.close()
+        self._writer = None
+        if self.fmt == "jsonl":
+            rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+            suffix = 1
+            while os.path.exists(rotated if suffix == 1 else f"{rotated}-{suffix}"):
+                suffix += 1
+            os.replace(self.path, rotated if suffix == 1 else f"{rotated}-{suffix}")
+            directory = os.path.dirname(os.path.abspath(self.path))
+            prefix = os.path.basename(self.path) + "."
+            backups = sorted(name for name in os.listdir(directory) if name.startswith(prefix))
+            for name in backups[:max(len(backups) - self.backups, 0)]:
+                os.remove(os.path.join(directory, name))
+
+    def _record_batches(self, items: List[tuple]) -> Iterator[List[Dict[str, Any]]]:
+        # Frames are sliced before conversion, so at most about `write_rows` records exist at once
+        records: List[Dict[str, Any]] = []
+        for timestamp, endpoint, inputs, predictions in items:
+            for start in range(0, len(predictions), self.write_rows):
+                stop = start + self.write_rows
+                rows = inputs.iloc[start:stop].to_dict("records") if isinstance(inputs, pd.DataFrame) else inputs[start:stop]
+                outputs = predictions.iloc[start:stop].to_dict("records") if isinstance(predictions, pd.DataFrame) else predictions[start:stop]
+                records.extend(
+                    {"timestamp": timestamp, "endpoint": endpoint, "input": row, "prediction": prediction}
+                    for row, prediction in zip(rows, outputs)
+                )
+                if len(records) >= self.write_rows:
+                    yield records
+                    records = []
+        if records:
+            yield records
+
+    def _flush(self, items: List[tuple]) -> None:
+        for records in self._record_batches(items):
+            with self._exclusive():
+                if self._writer is not None and self._writer.replaced:
+                    self._writer.close()
+                    self._writer = None
+                if self._writer is None:
+                    self._writer = self._open_writer()
+                self._writer.write(records)
+                self.written += len(records)
+                if self._writer.size >= self.max_bytes or time.time() - self._writer.opened_at >= self.rotate_seconds:
+                    self._rotate()
+
+    def _run(self) -> None:
+        while True:
+            items = []
+            try:
+                items.append(self._queue.get(timeout=self.flush_seconds))
+                # Drain whatever else is queued so it is written in one batch
+                while True:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            taken = len(items)
+            stop = any(item is None for item in items)
+            items = [item for item in items if item is not None]
+            try:
+                self._flush(items)
+            except Exception as e:
+                logger.error(f"Failed to write prediction log batch: {str(e)}")
+            with self._room:
+                self.queued_rows -= sum(len(item[3]) for item in items)
+                self._room.notify_all()
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+                return
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._pid = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "format": self.fmt,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "queued_rows": self.queued_rows,
+        }
+
+
+_sink: Optional[PredictionSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_prediction_sink() -> PredictionSink:
+    """Process-wide sink shared by every service module loaded in this process."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = PredictionSink()
+            atexit.register(_sink.close)
+        return _sink
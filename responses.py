@@ -0,0 +1,107 @@
+from fastapi import HTTPException
+from fastapi.responses import Response
+import numpy as np
+import orjson
+import pandas as pd
+from typing import List, Optional, Tuple
+import io
+import os
+
+# Bulk results are built as one column per output; the Accept header picks how they are encoded
+COLUMNAR_JSON = "application/vnd.hr-analytics.columnar+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+RESULT_FORMATS = {
+    "application/json": "json",
+    COLUMNAR_JSON: "columnar",
+    ARROW_STREAM: "arrow",
+    "text/csv": "csv",
+}
+MEDIA_TYPES = {fmt: media_type for media_type, fmt in RESULT_FORMATS.items()}
+
+# Responses at least this large are gzip-compressed for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv("HR_GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("HR_GZIP_LEVEL", "5"))
+
+# Row JSON is built from this many rows at a time instead of one dict per row of the whole response
+ENCODE_SLICE_ROWS = 10000
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    ranges = []
+    for part in accept.split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            ranges.append((media_type.lower(), quality))
+    # Stable sort keeps the client's order among equal preferences
+    return sorted(ranges, key=lambda item: -item[1])
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Result format for an Accept header: row JSON unless the client prefers another supported type."""
+    if not accept:
+        return "json"
+    for media_type, quality in _parse_accept(accept):
+        if quality <= 0:
+            continue
+        if media_type in RESULT_FORMATS:
+            return RESULT_FORMATS[media_type]
+        if media_type in ("*/*", "application/*"):
+            return "json"
+        if media_type == "text/*":
+            return "csv"
+    raise HTTPException(status_code=406, detail=f"Unsupported Accept header: {accept}. Use one of {list(RESULT_FORMATS)}.")
+
+
+def _columnar_values(column: pd.Series):
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf":
+        return np.ascontiguousarray(column.to_numpy())
+    return column.tolist()
+
+
+def encode_results(results: pd.DataFrame, fmt: str) -> bytes:
+    """Encode a frame of bulk results, one column per output field.
+
+    "json" keeps the original `{"predictions": [{...}, ...]}` shape, encoded slice by slice
+    and joined into the same bytes; "columnar" sends `{"predictions": {"EmployeeIndex": [...], ...}}`,
+    which orjson writes straight from the numeric NumPy columns without building a dict per
+    row. Text and categorical columns (explanation field names, scenario settings) go
+    through lists, since orjson cannot serialize object arrays.
+    """
+    if fmt == "json":
+        # Each slice encodes as "[...]"; the brackets are dropped and the rows joined by commas
+        slices = (
+            orjson.dumps(results.iloc[start:start + ENCODE_SLICE_ROWS].to_dict("records"))[1:-1]
+            for start in range(0, len(results), ENCODE_SLICE_ROWS)
+        )
+        return b'{"predictions":[' + b",".join(slices) + b"]}"
+    if fmt == "columnar":
+        columns = {column: _columnar_values(results[column]) for column in results.columns}
+        return orjson.dumps({"predictions": columns}, option=orjson.OPT_SERIALIZE_NUMPY)
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        batch = pa.RecordBatch.from_pandas(results, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue()
+    if fmt == "csv":
+        return results.to_csv(index=False).encode()
+    raise ValueError(f"Unknown result format: {fmt}")
+
+
+def encode_ndjson(results: pd.DataFrame) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in results.to_dict("records"))
+
+
+def results_response(body: bytes, fmt: str) -> Response:
+    """An already-encoded body; FastAPI's per-row JSON encoding is skipped entirely."""
+    return Response(content=body, media_type=MEDIA_TYPES[fmt])
@@ -0,0 +1,225 @@
+"""Running attrition and retention risk statistics per workforce segment.
+
+A segment is one (Department, JobRole, OverTime, TenureBand) combination, with tenure
+bands bucketing YearsAtCompany. A SQLite table keeps, per segment and model, how many
+employees were scored, the sum of their risk probabilities and how many are high risk.
+Every frame scored by a bulk endpoint (a whole upload or one streamed chunk) is grouped
+by segment and only those sums are added, in one transaction, so a rollup query reads
+the few hundred segment rows and never the employees; means are computed at query time.
+
+Rows that carry an EmployeeNumber replace that employee's earlier contribution: the last
+segment and probabilities per employee are kept in a members table and the update
+applies new minus old, so re-uploading a workforce does not count anyone twice. Rows
+without one are added as they arrive.
+
+The table lives in a file (HR_ROLLUP_DB) rather than in memory because bulk frames are
+scored in executor and gunicorn worker processes; SQLite serializes their updates.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from validation import KEY_COLUMN
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_ENABLED = os.getenv("HR_ROLLUPS", "1") == "1"
+ROLLUP_DB_PATH = os.getenv("HR_ROLLUP_DB", "rollups.db")
+# An employee counts as high risk at or above this probability
+HIGH_RISK_PROBABILITY = float(os.getenv("HR_HIGH_RISK_PROBABILITY", "0.5"))
+
+SEGMENT_COLUMNS = ["Department", "JobRole", "OverTime", "TenureBand"]
+# YearsAtCompany lower bounds and labels of each tenure band
+TENURE_BAND_STARTS = [0, 2, 5, 10, 20]
+TENURE_BANDS = ["0-1", "2-4", "5-9", "10-19", "20+"]
+RISK_MODELS = ["attrition", "retention"]
+STAT_COLUMNS = [f"{model}_{stat}" for model in RISK_MODELS for stat in ("scored", "probability_sum", "high_risk")]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS segments (
+    {", ".join(f"{column} TEXT NOT NULL" for column in SEGMENT_COLUMNS)},
+    {", ".join(f"{column} REAL NOT NULL DEFAULT 0" for column in STAT_COLUMNS)},
+    PRIMARY KEY ({", ".join(SEGMENT_COLUMNS)})
+);
+CREATE TABLE IF NOT EXISTS members (
+    {KEY_COLUMN} INTEGER PRIMARY KEY,
+    {", ".join(f"{column} TEXT NOT NULL" for column in SEGMENT_COLUMNS)},
+    attrition_probability REAL,
+    retention_probability REAL
+);
+"""
+
+
+def tenure_band(years: pd.Series) -> np.ndarray:
+    positions = np.searchsorted(TENURE_BAND_STARTS[1:], years.to_numpy(dtype=np.float64), side="right")
+    return np.asarray(TENURE_BANDS, dtype=object)[positions]
+
+
+def risk_members(data: pd.DataFrame, results: pd.DataFrame) -> pd.DataFrame:
+    """One row per scored employee: segment, key if known, and each model's risk probability.
+
+    Retention results carry the probability of the predicted class, so it is turned into
+    the probability of the at-risk class here. Models not in `results` are left NaN.
+    """
+    members = pd.DataFrame({column: data[column].astype(str).to_numpy() for column in SEGMENT_COLUMNS[:-1]})
+    members["TenureBand"] = tenure_band(data["YearsAtCompany"])
+    if KEY_COLUMN in data.columns:
+        members[KEY_COLUMN] = data[KEY_COLUMN].to_numpy(dtype=np.int64)
+    members["attrition_probability"] = (
+        results["AttritionRiskProbability"].to_numpy(dtype=np.float64) if "AttritionRiskProbability" in results.columns else np.nan
+    )
+    if "RetentionRiskProbability" in results.columns:
+        probability = results["RetentionRiskProbability"].to_numpy(dtype=np.float64)
+        members["retention_probability"] = np.where(results["RetentionRisk"].to_numpy() == 1, probability, 1.0 - probability)
+    else:
+        members["retention_probability"] = np.nan
+    return members
+
+
+def segment_stats(members: pd.DataFrame) -> pd.DataFrame:
+    """Per-segment sums of `members`, indexed by SEGMENT_COLUMNS."""
+    stats = members[SEGMENT_COLUMNS].copy()
+    for model in RISK_MODELS:
+        probability = members[f"{model}_probability"]
+        stats[f"{model}_scored"] = probability.notna().astype(np.int64)
+        stats[f"{model}_probability_sum"] = probability.fillna(0.0)
+        stats[f"{model}_high_risk"] = (probability >= HIGH_RISK_PROBABILITY).astype(np.int64)
+    return stats.groupby(SEGMENT_COLUMNS, sort=False).sum()
+
+
+class RiskRollup:
+    """Segment statistics and per-employee members in one SQLite file."""
+
+    def __init__(self, path: str = ROLLUP_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode; updates open their own BEGIN IMMEDIATE transaction
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def apply(self, members: pd.DataFrame) -> int:
+        """Add a batch of scored employees; returns the number of segments touched."""
+        if members.empty:
+            return 0
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if KEY_COLUMN in members.columns:
+                    delta = self._replace_members(members.drop_duplicates(KEY_COLUMN, keep="last"))
+                else:
+                    delta = segment_stats(members)
+                self._add(delta)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(delta)
+
+    def _replace_members(self, members: pd.DataFrame) -> pd.DataFrame:
+        # Earlier contributions of these employees, read inside the write transaction
+        self.conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS batch_keys ({KEY_COLUMN} INTEGER PRIMARY KEY)")
+        self.conn.execute("DELETE FROM batch_keys")
+        self.conn.executemany("INSERT INTO batch_keys VALUES (?)", ((key,) for key in members[KEY_COLUMN].tolist()))
+        old = pd.read_sql_query(f"SELECT members.* FROM members JOIN batch_keys USING ({KEY_COLUMN})", self.conn)
+
+        # A model missing from this batch keeps its previous probability
+        new = members.set_index(KEY_COLUMN)
+        for model in RISK_MODELS:
+            column = f"{model}_probability"
+            if new[column].isna().any() and not old.empty:
+                new[column] = new[column].fillna(old.set_index(KEY_COLUMN)[column])
+        new = new.reset_index()
+
+        columns = [KEY_COLUMN] + SEGMENT_COLUMNS + ["attrition_probability", "retention_probability"]
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO members ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            zip(*(new[column].astype(object).where(new[column].notna(), None).tolist() for column in columns)),
+        )
+        delta = segment_stats(new)
+        if not old.empty:
+            delta = delta.sub(segment_stats(old), fill_value=0)
+        return delta
+
+    def _add(self, delta: pd.DataFrame) -> None:
+        columns = SEGMENT_COLUMNS + STAT_COLUMNS
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in STAT_COLUMNS)
+        rows = delta.reset_index()
+        self.conn.executemany(
+            f"INSERT INTO segments ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT({', '.join(SEGMENT_COLUMNS)}) DO UPDATE SET {updates}",
+            zip(*(rows[column].tolist() for column in columns)),
+        )
+
+    def query(self, by: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Risk statistics grouped by any of SEGMENT_COLUMNS; no columns gives the overall totals."""
+        unknown = [column for column in by if column not in SEGMENT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot group by {unknown}. Use any of {SEGMENT_COLUMNS}.")
+        sums = ", ".join(f"SUM({column})" for column in STAT_COLUMNS)
+        group = f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}" if by else ""
+        select = ", ".join(list(by) + [sums])
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {select} FROM segments{group}").fetchall()
+
+        rollups = []
+        for row in rows:
+            stats = dict(zip(STAT_COLUMNS, (value or 0.0 for value in row[len(by):])))
+            if stats["attrition_scored"] < 0.5 and stats["retention_scored"] < 0.5:
+                continue
+            rollup: Dict[str, Any] = dict(zip(by, row[:len(by)]))
+            for model in RISK_MODELS:
+                scored = int(round(stats[f"{model}_scored"]))
+                rollup[f"{model}_scored"] = scored
+                rollup[f"{model}_mean_probability"] = stats[f"{model}_probability_sum"] / scored if scored else None
+                rollup[f"{model}_high_risk"] = int(round(stats[f"{model}_high_risk"]))
+            rollups.append(rollup)
+        return rollups
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+            members = self.conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+        return {"path": self.path, "segments": segments, "tracked_employees": members, "high_risk_probability": HIGH_RISK_PROBABILITY}
+
+
+_rollup: Optional[RiskRollup] = None
+_rollup_lock = threading.Lock()
+
+
+def get_risk_rollup() -> RiskRollup:
+    """Process-wide rollup, opened on first use in each process."""
+    global _rollup
+    with _rollup_lock:
+        if _rollup is None:
+            _rollup = RiskRollup()
+        return _rollup
+
+
+def _forget_rollup() -> None:
+    # SQLite connections must not be used across fork; children open their own
+    global _rollup, _rollup_lock
+    _rollup, _rollup_lock = None, threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_rollup)
+
+
+def record_scores(data: pd.DataFrame, results: pd.DataFrame) -> None:
+    """Fold a scored bulk frame into the rollups; failures are logged, never raised to the caller."""
+    if not ROLLUPS_ENABLED or data.empty:
+        return
+    try:
+        get_risk_rollup().apply(risk_members(data, results))
+    except Exception as e:
+        logger.error(f"Could not update risk rollups: {e}")
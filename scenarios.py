@@ -0,0 +1,178 @@
+"""What-if scenario grids for one employee or a cohort.
+
+A scenario grid is the Cartesian product of a few axes, each changing one input field:
+
+- `set`: replace the field with each value (e.g. OverTime -> "No"),
+- `scale`: multiply it (e.g. MonthlyIncome x 1.1),
+- `shift`: add to it (e.g. WorkLifeBalance + 1).
+
+Every employee is repeated once per scenario plus once unchanged as the baseline, in one
+frame built with NumPy indexing, so the models score the whole sweep in one batched call
+each instead of one request per scenario. Shifted and scaled values are clipped to the
+validation bounds, so "one step up" leaves an employee already at the top unchanged.
+Outputs are reported next to their delta against the same employee's baseline.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+import os
+
+import numpy as np
+import pandas as pd
+
+from validation import EMPLOYEE_COLUMNS, NonNegativeRule, RangeRule, Rule
+
+# Scenarios per employee, and employees x (scenarios + baseline) rows scored per request
+SCENARIO_MAX_GRID = int(os.getenv("HR_SCENARIO_MAX_GRID", "256"))
+SCENARIO_MAX_ROWS = int(os.getenv("HR_SCENARIO_MAX_ROWS", "200000"))
+SCENARIO_OPS = ("set", "scale", "shift")
+TEXT_FIELDS = ["Gender", "Department", "JobRole", "OverTime"]
+
+# Scored outputs; retention is the probability of the at-risk class so deltas are comparable
+OUTPUT_COLUMNS = ["AttritionRisk", "AttritionRiskProbability", "PerformanceRating", "RetentionRisk", "RetentionAtRiskProbability"]
+
+
+@dataclass
+class Axis:
+    field: str
+    op: str
+    values: np.ndarray
+
+    @property
+    def name(self) -> str:
+        return f"{self.field}:{self.op}"
+
+
+def parse_axes(axes: Sequence[Dict[str, Any]]) -> List[Axis]:
+    """Check a grid definition and its size; raises ValueError with a client-facing message."""
+    if not axes:
+        raise ValueError("At least one scenario axis is required.")
+    parsed, seen = [], set()
+    for axis in axes:
+        field, op, values = axis["field"], axis.get("op", "set"), list(axis["values"])
+        if field not in EMPLOYEE_COLUMNS:
+            raise ValueError(f"Unknown scenario field: {field}. Use one of {EMPLOYEE_COLUMNS}.")
+        if field in seen:
+            raise ValueError(f"{field} appears in more than one axis; put all its values on one axis.")
+        if op not in SCENARIO_OPS:
+            raise ValueError(f"Unknown scenario op: {op}. Use one of {list(SCENARIO_OPS)}.")
+        if not values:
+            raise ValueError(f"The {field} axis has no values.")
+        if op != "set":
+            if field in TEXT_FIELDS:
+                raise ValueError(f"{field} is categorical; use op 'set'.")
+            if not all(isinstance(value, (int, float)) for value in values):
+                raise ValueError(f"{op} values for {field} must be numbers.")
+        seen.add(field)
+        parsed.append(Axis(field, op, np.asarray(values, dtype=object if field in TEXT_FIELDS else np.float64)))
+
+    size = grid_size(parsed)
+    if size > SCENARIO_MAX_GRID:
+        raise ValueError(f"The grid has {size} scenarios; at most {SCENARIO_MAX_GRID} are allowed.")
+    return parsed
+
+
+def grid_size(axes: Sequence[Axis]) -> int:
+    return int(np.prod([len(axis.values) for axis in axes]))
+
+
+def check_rows(employees: int, axes: Sequence[Axis]) -> None:
+    rows = employees * (grid_size(axes) + 1)
+    if rows > SCENARIO_MAX_ROWS:
+        raise ValueError(
+            f"{employees} employees x {grid_size(axes)} scenarios needs {rows} scored rows; "
+            f"at most {SCENARIO_MAX_ROWS} are allowed. Use a smaller cohort or grid."
+        )
+
+
+def _grid_codes(axes: Sequence[Axis]) -> np.ndarray:
+    # (axes, scenarios) value index of every axis in each scenario, last axis varying fastest
+    return np.indices([len(axis.values) for axis in axes]).reshape(len(axes), -1)
+
+
+def scenario_settings(axes: Sequence[Axis]) -> pd.DataFrame:
+    """One row per scenario (numbered from 1) with the value of each axis."""
+    codes = _grid_codes(axes)
+    settings = pd.DataFrame({"Scenario": np.arange(1, codes.shape[1] + 1)})
+    for position, axis in enumerate(axes):
+        settings[axis.name] = axis.values[codes[position]]
+    return settings
+
+
+def field_bounds(rules: Sequence[Rule]) -> Dict[str, Tuple[float, float]]:
+    """Inclusive (low, high) per field from the range and non-negative rules."""
+    bounds: Dict[str, Tuple[float, float]] = {}
+    for rule in rules:
+        low, high = bounds.get(rule.field, (-np.inf, np.inf))
+        if isinstance(rule, RangeRule):
+            bounds[rule.field] = (max(low, rule.low), min(high, rule.high))
+        elif isinstance(rule, NonNegativeRule):
+            bounds[rule.field] = (max(low, 0.0), high)
+    return bounds
+
+
+def scenario_matrix(base: pd.DataFrame, axes: Sequence[Axis], bounds: Dict[str, Tuple[float, float]]) -> pd.DataFrame:
+    """Every employee in `base` followed by their scenarios: (scenarios + 1) rows each, baseline first."""
+    n, per = len(base), grid_size(axes) + 1
+    matrix = base[EMPLOYEE_COLUMNS].iloc[np.repeat(np.arange(n), per)].reset_index(drop=True)
+    scenario = np.tile(np.arange(per), n)
+    changed = scenario > 0
+    codes = _grid_codes(axes)
+    for position, axis in enumerate(axes):
+        values = axis.values[codes[position]][scenario[changed] - 1]
+        if axis.op != "set":
+            current = matrix[axis.field].to_numpy(dtype=np.float64)[changed]
+            values = current * values if axis.op == "scale" else current + values
+            low, high = bounds.get(axis.field, (-np.inf, np.inf))
+            values = np.clip(values, low, high)
+        column = matrix[axis.field].to_numpy(dtype=object if axis.field in TEXT_FIELDS else np.float64, copy=True)
+        column[changed] = values
+        matrix[axis.field] = column
+    return matrix
+
+
+def scenario_results(outputs: Dict[str, np.ndarray], employees: int, axes: Sequence[Axis], index: np.ndarray) -> pd.DataFrame:
+    """Flat table of every employee x scenario with its settings, outputs and deltas to the baseline."""
+    per = grid_size(axes) + 1
+    settings = scenario_settings(axes)
+    results = pd.DataFrame({
+        "EmployeeIndex": np.repeat(index, per - 1),
+        "Scenario": np.tile(settings["Scenario"].to_numpy(), employees),
+    })
+    for axis in axes:
+        results[axis.name] = np.tile(settings[axis.name].to_numpy(), employees)
+    for column in OUTPUT_COLUMNS:
+        values = np.asarray(outputs[column], dtype=np.float64).reshape(employees, per)
+        results[column] = values[:, 1:].ravel()
+        results[f"Delta{column}"] = (values[:, 1:] - values[:, :1]).ravel()
+    return results
+
+
+def baseline_results(outputs: Dict[str, np.ndarray], employees: int, axes: Sequence[Axis]) -> Dict[str, np.ndarray]:
+    per = grid_size(axes) + 1
+    return {column: np.asarray(outputs[column], dtype=np.float64).reshape(employees, per)[:, 0] for column in OUTPUT_COLUMNS}
+
+
+def cohort_summary(results: pd.DataFrame, baseline: Dict[str, np.ndarray], axes: Sequence[Axis]) -> Dict[str, Any]:
+    """Per scenario: mean of each output and of its delta, plus at-risk headcounts."""
+    columns = OUTPUT_COLUMNS + [f"Delta{column}" for column in OUTPUT_COLUMNS]
+    grouped = results.groupby("Scenario", sort=True)[columns].mean()
+    counts = results.groupby("Scenario", sort=True)[["AttritionRisk", "RetentionRisk"]].sum()
+    settings = scenario_settings(axes).set_index("Scenario")
+    scenarios = []
+    for scenario, row in grouped.iterrows():
+        summary: Dict[str, Any] = {"Scenario": int(scenario)}
+        summary.update({name: settings.at[scenario, name] for name in settings.columns})
+        summary.update({f"Mean{column}": float(row[column]) for column in columns})
+        summary["AttritionRiskCount"] = int(counts.at[scenario, "AttritionRisk"])
+        summary["RetentionRiskCount"] = int(counts.at[scenario, "RetentionRisk"])
+        scenarios.append(summary)
+    return {
+        "employees": len(baseline[OUTPUT_COLUMNS[0]]),
+        "grid_size": grid_size(axes),
+        "baseline": {
+            **{f"Mean{column}": float(values.mean()) for column, values in baseline.items()},
+            "AttritionRiskCount": int(baseline["AttritionRisk"].sum()),
+            "RetentionRiskCount": int(baseline["RetentionRisk"].sum()),
+        },
+        "scenarios": scenarios,
+    }
@@ -0,0 +1,258 @@
+"""Local score store: the latest features and predictions per EmployeeNumber.
+
+A SQLite table keyed by EmployeeNumber keeps each employee's 14 input fields, their
+attrition, performance and retention scores, and a 64-bit hash of the inputs. An
+update reads a full or delta extract in chunks, hashes every row (vectorized, with
+`pd.util.hash_pandas_object`), and scores only employees that are new, whose inputs
+changed, or who were last scored by different model artifacts. Everyone else is left
+as is, so a nightly run costs a hash per employee plus scoring for what changed.
+
+With `--full`, the extract is the whole workforce and employees missing from it are
+removed; a delta extract only adds and updates. Looking up one employee is a primary-key
+read, which the unified service exposes as `GET /scores/{employee_number}`.
+
+    python score_store.py update workforce.parquet [--full] [--skip-invalid] [--store scores.db]
+    python score_store.py get 1234 [--store scores.db]
+    python score_store.py stats [--store scores.db]
+"""
+from typing import Any, Dict, Iterator, List, Optional
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_score import BATCH_CHUNK_ROWS, KEY_COLUMN, MODELS, iter_input, load_services, score_chunk
+from validation import EMPLOYEE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.getenv("HR_SCORE_STORE", "scores.db")
+
+OUTPUT_COLUMNS = ["AttritionRisk", "AttritionRiskProbability", "PerformanceRating", "RetentionRisk", "RetentionRiskProbability"]
+TEXT_COLUMNS = ["Gender", "Department", "JobRole", "OverTime"]
+NUMERIC_COLUMNS = [column for column in EMPLOYEE_COLUMNS if column not in TEXT_COLUMNS]
+STORED_COLUMNS = [KEY_COLUMN, "row_hash"] + EMPLOYEE_COLUMNS + OUTPUT_COLUMNS + ["model_fingerprint", "scored_at"]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS scores (
+    {KEY_COLUMN} INTEGER PRIMARY KEY,
+    row_hash INTEGER NOT NULL,
+    {", ".join(f"{column} {'TEXT' if column in TEXT_COLUMNS else 'REAL'}" for column in EMPLOYEE_COLUMNS)},
+    {", ".join(f"{column} REAL" for column in OUTPUT_COLUMNS)},
+    model_fingerprint TEXT NOT NULL,
+    scored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    full_extract INTEGER NOT NULL,
+    model_fingerprint TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    new INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    unchanged INTEGER NOT NULL,
+    invalid INTEGER NOT NULL,
+    removed INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+"""
+
+
+def row_hashes(data: pd.DataFrame) -> np.ndarray:
+    """A stable 64-bit hash of each row's inputs, as SQLite's signed integers.
+
+    Numbers are hashed as float64 and text as strings, so the same employee hashes the
+    same from CSV (ints) and Parquet (floats, categoricals) extracts.
+    """
+    normalized = pd.DataFrame({
+        column: data[column].astype(np.float64) if column in NUMERIC_COLUMNS else data[column].astype(str)
+        for column in EMPLOYEE_COLUMNS
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy().view(np.int64)
+
+
+def model_fingerprint() -> str:
+    """Content hash of the model artifacts the scores come from; retraining changes it."""
+    services = load_services(list(MODELS))
+    digest = hashlib.sha256()
+    for handle in (services["app"].attrition, services["apps"].performance, services["apps"].retention):
+        with open(handle.path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _rows(frame: pd.DataFrame, columns: List[str]) -> Iterator[tuple]:
+    # tolist() yields Python scalars, which sqlite3 binds without adapters
+    return zip(*(frame[column].tolist() for column in columns))
+
+
+class ScoreStore:
+    """The score table and its update log; one connection shared under a lock."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets the service read while a nightly update writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, employee_number: int) -> Optional[Dict[str, Any]]:
+        """Stored inputs and scores for one employee, or None."""
+        with self._lock:
+            row = self.conn.execute(f"SELECT * FROM scores WHERE {KEY_COLUMN} = ?", (int(employee_number),)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        del record["row_hash"]
+        return record
+
+    def current_hashes(self, fingerprint: str) -> pd.Series:
+        """Row hash per EmployeeNumber for employees scored by the current models."""
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {KEY_COLUMN}, row_hash FROM scores WHERE model_fingerprint = ?", (fingerprint,)).fetchall()
+        keys = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        hashes = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        return pd.Series(hashes, index=keys)
+
+    def upsert(self, rows: pd.DataFrame) -> None:
+        placeholders = ", ".join("?" for _ in STORED_COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in STORED_COLUMNS[1:])
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO scores ({', '.join(STORED_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT({KEY_COLUMN}) DO UPDATE SET {updates}",
+                _rows(rows, STORED_COLUMNS),
+            )
+
+    def update(
+        self,
+        source: str,
+        full: bool = False,
+        chunk_rows: int = BATCH_CHUNK_ROWS,
+        skip_invalid: bool = False,
+    ) -> Dict[str, Any]:
+        """Score the new and changed employees of an extract; returns the run's counts."""
+        started_at, started = time.time(), time.perf_counter()
+        fingerprint = model_fingerprint()
+        known = self.current_hashes(fingerprint)
+        counts = {"rows": 0, "new": 0, "changed": 0, "unchanged": 0, "invalid": 0, "removed": 0}
+        seen: List[np.ndarray] = []
+
+        chunks, _ = iter_input(source, chunk_rows, 0)
+        for chunk in chunks:
+            if KEY_COLUMN not in chunk.columns:
+                raise ValueError(f"The extract has no {KEY_COLUMN} column to key scores by.")
+            # A later row for the same employee supersedes an earlier one
+            chunk = chunk.drop_duplicates(KEY_COLUMN, keep="last")
+            keys = chunk[KEY_COLUMN].to_numpy(dtype=np.int64)
+            hashes = row_hashes(chunk)
+            # Positional lookup keeps the hashes int64; reindex would turn them into lossy floats
+            positions = known.index.get_indexer(keys)
+            is_new = positions < 0
+            is_changed = np.zeros(len(keys), dtype=bool)
+            is_changed[~is_new] = known.to_numpy()[positions[~is_new]] != hashes[~is_new]
+            counts["rows"] += len(chunk)
+            counts["new"] += int(is_new.sum())
+            counts["changed"] += int(is_changed.sum())
+            counts["unchanged"] += int((~is_new & ~is_changed).sum())
+            if full:
+                seen.append(keys)
+
+            stale = is_new | is_changed
+            if not stale.any():
+                continue
+            data = chunk[stale]
+            results, dropped = score_chunk(data, list(MODELS), skip_invalid)
+            counts["invalid"] += dropped
+            rows = data.assign(row_hash=hashes[stale]).merge(results, on=KEY_COLUMN, how="inner")
+            rows["model_fingerprint"] = fingerprint
+            rows["scored_at"] = time.time()
+            self.upsert(rows)
+            logger.info(f"{counts['rows']:,} rows read, {counts['new'] + counts['changed']:,} scored.")
+
+        if full:
+            counts["removed"] = self._remove_missing(np.concatenate(seen) if seen else np.empty(0, dtype=np.int64))
+
+        seconds = time.perf_counter() - started
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (started_at, source, full_extract, model_fingerprint, rows, new, changed, unchanged, invalid, removed, seconds) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (started_at, os.path.abspath(source), int(full), fingerprint, counts["rows"], counts["new"], counts["changed"],
+                 counts["unchanged"], counts["invalid"], counts["removed"], seconds),
+            )
+        return dict(counts, seconds=seconds, model_fingerprint=fingerprint)
+
+    def _remove_missing(self, keys: np.ndarray) -> int:
+        """Delete employees absent from a full extract."""
+        with self._lock, self.conn:
+            self.conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS extract_keys ({KEY_COLUMN} INTEGER PRIMARY KEY)")
+            self.conn.execute("DELETE FROM extract_keys")
+            self.conn.executemany("INSERT OR IGNORE INTO extract_keys VALUES (?)", ((key,) for key in keys.tolist()))
+            cursor = self.conn.execute(f"DELETE FROM scores WHERE {KEY_COLUMN} NOT IN (SELECT {KEY_COLUMN} FROM extract_keys)")
+            self.conn.execute("DROP TABLE extract_keys")
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            employees = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            last_run = self.conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+        return {"path": self.path, "employees": employees, "last_run": dict(last_run) if last_run is not None else None}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default=STORE_PATH, help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    update = commands.add_parser("update", help="score new and changed employees from an extract")
+    update.add_argument("input", help="CSV, Parquet or Arrow extract with an EmployeeNumber column")
+    update.add_argument("--full", action="store_true", help="the extract is the whole workforce; remove employees not in it")
+    update.add_argument("--chunk-rows", type=int, default=BATCH_CHUNK_ROWS)
+    update.add_argument("--skip-invalid", action="store_true", help="leave out rows failing validation instead of stopping")
+    get = commands.add_parser("get", help="print one employee's stored scores")
+    get.add_argument("employee_number", type=int)
+    commands.add_parser("stats", help="print the store size and last update")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    store = ScoreStore(args.store)
+    try:
+        if args.command == "update":
+            try:
+                result = store.update(args.input, full=args.full, chunk_rows=args.chunk_rows, skip_invalid=args.skip_invalid)
+            except (OSError, ValueError) as e:
+                sys.exit(f"Update stopped: {e}")
+            print(
+                f"Read {result['rows']:,} rows: {result['new']:,} new, {result['changed']:,} changed, "
+                f"{result['unchanged']:,} unchanged, {result['invalid']:,} invalid, {result['removed']:,} removed "
+                f"in {result['seconds']:.1f}s."
+            )
+        elif args.command == "get":
+            record = store.get(args.employee_number)
+            if record is None:
+                sys.exit(f"No scores stored for {KEY_COLUMN} {args.employee_number}.")
+            print(json.dumps(record, indent=1))
+        else:
+            print(json.dumps(store.stats(), indent=1))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
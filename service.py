@@ -0,0 +1,449 @@
+"""Unified HR Analytics API: attrition, performance and retention in one process.
+
+Mounts the prediction endpoints of app.py (port 8000) and apps.py (port 8001) next to
+`/predict_all` and `/predict_all_bulk`, which validate an employee record once against
+every model's rules and return attrition, performance and retention together. The
+performance rating feeds retention in memory, so no model runs twice, and a client
+needs one round trip instead of one per model.
+
+    uvicorn service:app --port 8002
+    gunicorn -c gunicorn.conf.py service:app --bind 0.0.0.0:8002
+"""
+from fastapi import FastAPI, Form, Header, HTTPException, UploadFile, File
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from starlette.concurrency import run_in_threadpool
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Union
+import logging
+import os
+import threading
+
+import app as attrition_service
+import apps as performance_service
+from batching import MICROBATCH_ENABLED, MicroBatcher
+from drift_monitor import get_drift_monitor
+from executor import BULK_WORKERS, SINGLE_WORKERS, InferenceExecutor
+from memory_budget import MemoryBudgetExceeded, get_memory_budget
+from metrics import CONTENT_TYPE, REQUEST_ROWS, STAGE_SECONDS, MetricsMiddleware, render_metrics
+from model_registry import MODEL_ADMIN_TOKEN, ModelRegistry, admin_authorized
+from model_store import process_memory
+from prediction_sink import debug_sample, get_prediction_sink
+from rollups import get_risk_rollup, record_scores
+from scenarios import (
+    OUTPUT_COLUMNS as SCENARIO_OUTPUTS, Axis, baseline_results, check_rows, cohort_summary, field_bounds, grid_size,
+    parse_axes, scenario_matrix, scenario_results
+)
+from responses import GZIP_LEVEL, GZIP_MIN_BYTES, encode_results, negotiate_format, results_response
+from score_store import STORE_PATH, ScoreStore
+from streaming import iter_upload_chunks, stream_predictions
+from uploads import UploadSource, detect_upload_format, read_upload, upload_source
+from validation import (
+    ATTRITION_RULES, EMPLOYEE_COLUMNS, PERFORMANCE_RULES, RATING_RULES, RETENTION_INPUT_RULES, UPLOAD_COLUMNS,
+    merge_rules, validate_frame, validate_record
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+prediction_sink = get_prediction_sink()
+
+# Whole-file uploads are admitted against the process's bulk memory budget
+bulk_memory = get_memory_budget()
+
+app = FastAPI(
+    title="HR Analytics API",
+    description="API for predicting employee attrition, performance and retention risk",
+    version="1.0.0"
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Compress large bulk responses for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+# Per-route latency, status and in-flight gauges for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# The per-model endpoints keep working unchanged for existing clients
+for route in attrition_service.app.routes + performance_service.app.routes:
+    if getattr(route, "path", "").startswith(("/predict_", "/explain_")):
+        app.router.routes.append(route)
+
+# Every check any of the three models applies to the raw record, each run once
+EMPLOYEE_RULES = merge_rules(ATTRITION_RULES, PERFORMANCE_RULES, RETENTION_INPUT_RULES)
+
+# What-if sweeps clip scaled and shifted inputs to the same bounds
+SCENARIO_BOUNDS = field_bounds(EMPLOYEE_RULES)
+
+# Separate pools keep single-record latency low while bulk uploads are being scored
+single_executor = InferenceExecutor("single", SINGLE_WORKERS, preload=[__name__])
+bulk_executor = InferenceExecutor("bulk", BULK_WORKERS, preload=[__name__])
+
+# Each service module watches its own artifacts; reloads are routed to the one owning the model
+model_registries: List[ModelRegistry] = [attrition_service.model_registry, performance_service.model_registry]
+
+@app.get("/")
+async def root():
+    return {"message": "Welcome to the HR Analytics API. Use /predict_all to get every prediction at once."}
+
+def predict_all_records(records: List[Dict]) -> tuple:
+    """Return (AttritionRisk, attrition probabilities, PerformanceRating, RetentionRisk, retention probabilities)."""
+    attrition_risks, attrition_probs = attrition_service.attrition.get().predict_records(records)
+    ratings, retention_risks, retention_probs = performance_service.retention_graph.run_records(records)
+    return attrition_risks, attrition_probs, ratings, retention_risks, retention_probs
+
+all_batcher = MicroBatcher("all", predict_all_records, single_executor) if MICROBATCH_ENABLED else None
+
+@app.get("/executor_stats")
+async def executor_stats():
+    return {
+        "executors": [single_executor.stats(), bulk_executor.stats()],
+        "batchers": [all_batcher.stats()] if all_batcher is not None else [],
+        "memory_budget": bulk_memory.stats(),
+        "services": {
+            "attrition": await attrition_service.executor_stats(),
+            "performance": await performance_service.executor_stats(),
+        },
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/model_stats")
+async def model_stats():
+    return {
+        "startup": [attrition_service.startup, performance_service.startup],
+        "registry": [registry.stats() for registry in model_registries],
+        "memory": process_memory(),
+    }
+
+@app.post("/models/{name}/reload")
+async def reload_model(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Reload a model from its configured artifact and swap it in, in this worker process only.
+
+    Requires the HR_ADMIN_TOKEN value in the X-Admin-Token header. To roll out a model,
+    replace its artifact in place: every worker's watcher reloads it within
+    HR_MODEL_RELOAD_POLL_SECONDS, and this endpoint only skips the wait for the worker
+    that answers it.
+    """
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model reload over HTTP is disabled; set HR_ADMIN_TOKEN to enable it.")
+    if not admin_authorized(x_admin_token):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token header.")
+    registry = next((registry for registry in model_registries if name in registry.handles), None)
+    if registry is None:
+        known = [handle for registry in model_registries for handle in registry.handles]
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}. Use one of {known}.")
+    result = await run_in_threadpool(registry.reload, name)
+    if not result["reloaded"]:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version {result['version']}: {result['last_error']}")
+    return result
+
+# Opened on first lookup; `python score_store.py update` keeps it current
+_score_store: Optional[ScoreStore] = None
+_score_store_lock = threading.Lock()
+
+def get_score_store() -> ScoreStore:
+    global _score_store
+    with _score_store_lock:
+        if _score_store is None:
+            if not os.path.isfile(STORE_PATH):
+                raise HTTPException(status_code=503, detail=f"No score store at {STORE_PATH}; run score_store.py update first.")
+            _score_store = ScoreStore(STORE_PATH)
+        return _score_store
+
+@app.get("/scores/{employee_number}")
+async def stored_scores(employee_number: int):
+    """The latest stored inputs and scores for one employee, by primary key."""
+    record = get_score_store().get(employee_number)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No scores stored for EmployeeNumber {employee_number}.")
+    return record
+
+@app.get("/rollups")
+async def risk_rollups(by: str = "Department"):
+    """Attrition and retention risk per segment of every employee scored through the bulk endpoints.
+
+    `by` is a comma-separated subset of Department, JobRole, OverTime and TenureBand; an
+    empty value returns the overall totals.
+    """
+    columns = [column.strip() for column in by.split(",") if column.strip()]
+    try:
+        rollups = await run_in_threadpool(get_risk_rollup().query, columns)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return {"by": columns, "segments": rollups}
+
+@app.get("/drift")
+async def drift():
+    """PSI of every input and output in the prediction log against the training-data profile.
+
+    Each call first reads whatever was appended to the log since the previous one.
+    """
+    try:
+        monitor = await run_in_threadpool(get_drift_monitor)
+    except ValueError as ve:
+        raise HTTPException(status_code=503, detail=str(ve))
+    await run_in_threadpool(monitor.poll)
+    return monitor.report()
+
+@app.post("/predict_all")
+async def predict_all(employee: attrition_service.EmployeeData) -> Dict[str, float]:
+    try:
+        logger.info("Received request for combined prediction.")
+        record = employee.model_dump()
+        debug_sample(logger, lambda: f"Input data: {record}")
+
+        with STAGE_SECONDS.time("predict_all", "validate"):
+            errors = validate_record(record, EMPLOYEE_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
+
+        # All three models run in one executor call over the same record
+        with STAGE_SECONDS.time("predict_all", "predict"):
+            if all_batcher is not None:
+                attrition_risk, attrition_probs, rating, retention_risk, retention_probs = await all_batcher.submit(record)
+            else:
+                attrition_risk, attrition_probs, rating, retention_risk, retention_probs = await single_executor.run(predict_all_records, [record])
+
+        with STAGE_SECONDS.time("predict_all", "validate_rating"):
+            errors = validate_record({"PerformanceRating": float(rating[0])}, RATING_RULES)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
+
+        result = {
+            "AttritionRisk": float(attrition_risk[0]),
+            "AttritionRiskProbability": float(attrition_probs[0][1]) if attrition_probs is not None else 0.0,
+            "PerformanceRating": float(rating[0]),
+            "RetentionRisk": float(retention_risk[0]),
+            "RetentionRiskProbability": float(retention_probs[0][int(retention_risk[0])]) if retention_probs is not None else 0.0,
+        }
+
+        with STAGE_SECONDS.time("predict_all", "log"):
+            prediction_sink.write("predict_all", [record], [result])
+        REQUEST_ROWS.observe(1, "predict_all")
+
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error predicting all: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error predicting all: {str(e)}")
+
+def score_all_frame(data: pd.DataFrame, endpoint: str = "predict_all_bulk") -> pd.DataFrame:
+    """Validate once, then score attrition, performance and retention for a frame of employees."""
+    missing_columns = [col for col in EMPLOYEE_COLUMNS if col not in data.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+
+    with STAGE_SECONDS.time(endpoint, "validate"):
+        report = validate_frame(data, EMPLOYEE_RULES)
+    if not report.ok:
+        logger.info(f"Validation failed with {report.total_violations} violations: {report.counts}")
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    with STAGE_SECONDS.time(endpoint, "predict"):
+        attrition_risks, attrition_probs = attrition_service.predict_attrition_frame(data)
+        ratings, retention_risks, retention_probs = performance_service.retention_graph.run(data)
+
+    with STAGE_SECONDS.time(endpoint, "validate_rating"):
+        report = validate_frame(pd.DataFrame({"PerformanceRating": ratings}, index=data.index), RATING_RULES)
+    if not report.ok:
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    with STAGE_SECONDS.time(endpoint, "build_results"):
+        retention_risks = np.asarray(retention_risks, dtype=np.float64)
+        results = pd.DataFrame({
+            "EmployeeIndex": data.index.to_numpy(dtype=np.int64),
+            "AttritionRisk": np.asarray(attrition_risks, dtype=np.float64),
+            "AttritionRiskProbability": attrition_probs[:, 1].astype(np.float64) if attrition_probs is not None else 0.0,
+            "PerformanceRating": np.asarray(ratings, dtype=np.float64),
+            "RetentionRisk": retention_risks,
+            "RetentionRiskProbability": (
+                retention_probs[np.arange(len(retention_risks)), retention_risks.astype(np.intp)] if retention_probs is not None else 0.0
+            ),
+        })
+
+    with STAGE_SECONDS.time(endpoint, "log"):
+        prediction_sink.write(endpoint, data, results)
+
+    with STAGE_SECONDS.time(endpoint, "rollup"):
+        record_scores(data, results)
+
+    return results
+
+def score_all_upload(source: UploadSource, output_format: str = "json", input_format: str = "csv") -> tuple:
+    """Parse an uploaded CSV, Parquet or Arrow file once, score every model and encode the results."""
+    with STAGE_SECONDS.time("predict_all_bulk", f"parse_{input_format}"):
+        data = read_upload(source, input_format, UPLOAD_COLUMNS)
+    logger.info(f"{input_format.upper()} data loaded with {len(data)} rows.")
+    results = score_all_frame(data)
+    with STAGE_SECONDS.time("predict_all_bulk", "serialize"):
+        return len(results), encode_results(results, output_format)
+
+@app.post("/predict_all_bulk")
+async def predict_all_bulk(file: UploadFile = File(...), stream: Optional[str] = None, accept: Optional[str] = Header(None)) -> Dict[str, List]:
+    output_format = negotiate_format(accept)
+    try:
+        logger.info("Received request for bulk combined prediction.")
+        input_format = await detect_upload_format(file)
+        if stream:
+            chunks = iter_upload_chunks(file, input_format=input_format, columns=UPLOAD_COLUMNS)
+            return await stream_predictions(chunks, score_all_frame, stream, bulk_executor, endpoint="predict_all_bulk", input_format=input_format)
+
+        with STAGE_SECONDS.time("predict_all_bulk", "read_upload"):
+            source = await upload_source(file, bulk_executor)
+        async with bulk_memory.reserve_upload(source, input_format, "predict_all_bulk"):
+            rows, body = await bulk_executor.run(score_all_upload, source, output_format, input_format)
+        REQUEST_ROWS.observe(rows, "predict_all_bulk")
+        return results_response(body, output_format)
+    except HTTPException:
+        raise
+    except MemoryBudgetExceeded as e:
+        logger.warning(f"Rejected bulk combined prediction: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as ve:
+        logger.error(f"ValueError in bulk combined prediction: {str(ve)}")
+        raise HTTPException(status_code=400, detail=f"Invalid data format: {str(ve)}")
+    except Exception as e:
+        logger.error(f"Error predicting bulk all: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error predicting bulk all: {str(e)}")
+
+class ScenarioAxis(BaseModel):
+    field: str
+    op: str = "set"
+    values: List[Union[float, str]]
+
+class ScenarioRequest(BaseModel):
+    employee: attrition_service.EmployeeData
+    axes: List[ScenarioAxis]
+
+def score_scenario_matrix(matrix: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Score every scenario row with one batched call per model."""
+    attrition_risks, attrition_probs = attrition_service.predict_attrition_frame(matrix)
+    ratings, retention_risks, retention_probs = performance_service.retention_graph.run(matrix)
+    at_risk = list(performance_service.retention.get().model.classes_).index(1)
+    return {
+        "AttritionRisk": np.asarray(attrition_risks, dtype=np.float64),
+        "AttritionRiskProbability": attrition_probs[:, 1] if attrition_probs is not None else np.zeros(len(matrix)),
+        "PerformanceRating": np.asarray(ratings, dtype=np.float64),
+        "RetentionRisk": np.asarray(retention_risks, dtype=np.float64),
+        "RetentionAtRiskProbability": retention_probs[:, at_risk] if retention_probs is not None else np.zeros(len(matrix)),
+    }
+
+def sweep_scenarios(base: pd.DataFrame, axes: List[Axis], endpoint: str = "scenarios") -> tuple:
+    """Return (employee x scenario results with deltas, baseline outputs per employee)."""
+    missing_columns = [col for col in EMPLOYEE_COLUMNS if col not in base.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+    try:
+        check_rows(len(base), axes)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    with STAGE_SECONDS.time(endpoint, "validate"):
+        report = validate_frame(base, EMPLOYEE_RULES)
+    if not report.ok:
+        raise HTTPException(status_code=400, detail=report.errors)
+
+    with STAGE_SECONDS.time(endpoint, "build_matrix"):
+        matrix = scenario_matrix(base, axes, SCENARIO_BOUNDS)
+    with STAGE_SECONDS.time(endpoint, "validate_matrix"):
+        report = validate_frame(matrix, EMPLOYEE_RULES)
+    if not report.ok:
+        raise HTTPException(status_code=400, detail=f"The scenario grid produces invalid inputs: {report.errors}")
+
+    # Hypothetical rows are not written to the prediction log or the rollups
+    with STAGE_SECONDS.time(endpoint, "predict"):
+        outputs = score_scenario_matrix(matrix)
+    with STAGE_SECONDS.time(endpoint, "build_results"):
+        results = scenario_results(outputs, len(base), axes, base.index.to_numpy(dtype=np.int64))
+        baseline = baseline_results(outputs, len(base), axes)
+    return results, baseline
+
+def sweep_scenarios_upload(source: UploadSource, input_format: str, axes: List[Axis], detail: bool, output_format: str) -> tuple:
+    """Parse a cohort file and sweep it; returns (rows, encoded rows) with `detail`, else (rows, summary)."""
+    with STAGE_SECONDS.time("scenarios_bulk", f"parse_{input_format}"):
+        data = read_upload(source, input_format, EMPLOYEE_COLUMNS)
+    logger.info(f"{input_format.upper()} cohort loaded with {len(data)} rows.")
+    results, baseline = sweep_scenarios(data, axes, "scenarios_bulk")
+    with STAGE_SECONDS.time("scenarios_bulk", "serialize"):
+        if detail:
+            return len(results), encode_results(results, output_format)
+        return len(results), cohort_summary(results, baseline, axes)
+
+@app.post("/scenarios")
+async def scenarios(request: ScenarioRequest) -> Dict[str, Any]:
+    """What-if sweep for one employee: every combination of the axes, scored in one pass.
+
+    Axes `set`, `scale` or `shift` one field each, e.g.
+    `{"field": "MonthlyIncome", "op": "scale", "values": [1.05, 1.1]}`. Each scenario
+    carries the outputs and their deltas against the unchanged employee.
+    """
+    try:
+        axes = parse_axes([axis.model_dump() for axis in request.axes])
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    try:
+        logger.info("Received request for a scenario sweep.")
+        base = pd.DataFrame([request.employee.model_dump()])
+        results, baseline = await single_executor.run(sweep_scenarios, base, axes)
+        REQUEST_ROWS.observe(len(results) + 1, "scenarios")
+        return {
+            "grid_size": len(results),
+            "baseline": {column: float(baseline[column][0]) for column in SCENARIO_OUTPUTS},
+            "scenarios": results.drop(columns="EmployeeIndex").to_dict("records"),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error sweeping scenarios: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error sweeping scenarios: {str(e)}")
+
+@app.post("/scenarios_bulk")
+async def scenarios_bulk(file: UploadFile = File(...), axes: str = Form(...), detail: bool = False, accept: Optional[str] = Header(None)):
+    """What-if sweep for a cohort file; `axes` is the JSON list of axes as a form field.
+
+    Returns the per-scenario cohort means, deltas and at-risk headcounts, or with
+    `detail=true` every employee x scenario row in the negotiated format.
+    """
+    output_format = negotiate_format(accept)
+    try:
+        parsed = parse_axes([axis.model_dump() for axis in TypeAdapter(List[ScenarioAxis]).validate_json(axes)])
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    try:
+        logger.info("Received request for a cohort scenario sweep.")
+        input_format = await detect_upload_format(file)
+        with STAGE_SECONDS.time("scenarios_bulk", "read_upload"):
+            source = await upload_source(file, bulk_executor)
+        async with bulk_memory.reserve_upload(source, input_format, "scenarios_bulk", rows_per_employee=grid_size(parsed) + 1):
+            rows, body = await bulk_executor.run(sweep_scenarios_upload, source, input_format, parsed, detail, output_format)
+        REQUEST_ROWS.observe(rows, "scenarios_bulk")
+        return results_response(body, output_format) if detail else body
+    except HTTPException:
+        raise
+    except MemoryBudgetExceeded as e:
+        logger.warning(f"Rejected cohort scenario sweep: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as ve:
+        logger.error(f"ValueError in cohort scenario sweep: {str(ve)}")
+        raise HTTPException(status_code=400, detail=f"Invalid data format: {str(ve)}")
+    except Exception as e:
+        logger.error(f"Error sweeping cohort scenarios: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error sweeping cohort scenarios: {str(e)}")
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8002)
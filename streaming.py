@@ -0,0 +1,128 @@
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import pandas as pd
+import orjson
+from typing import AsyncIterator, Callable, Iterator, Optional, Sequence
+import logging
+import os
+import tempfile
+
+from executor import InferenceExecutor
+from metrics import REQUEST_ROWS, STAGE_SECONDS
+from responses import encode_ndjson
+from uploads import compact_frame, csv_options, iter_table_chunks
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed, validated and scored per chunk in streaming mode
+STREAM_CHUNK_ROWS = int(os.getenv("HR_STREAM_CHUNK_ROWS", "10000"))
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_upload_chunks(
+    file: UploadFile,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+    input_format: str = "csv",
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Parse an uploaded CSV, Parquet or Arrow IPC file in fixed-size row chunks.
+
+    Starlette spools multipart uploads to a temporary file, so reading from it keeps
+    at most one chunk of parsed rows in memory. FastAPI closes uploads as soon as the
+    handler returns, before a streamed body is sent, so the spooled file is detached
+    here and closed once the last chunk is read. Chunks keep a running index, so row
+    numbers in validation messages refer to the whole file. Only `columns` are kept, and
+    each chunk is compacted like a whole upload; Parquet and Arrow are read batch by batch.
+    """
+    spooled = file.file
+    file.file = tempfile.SpooledTemporaryFile()
+    spooled.seek(0)
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        try:
+            if input_format == "csv":
+                with pd.read_csv(spooled, chunksize=chunk_rows, **csv_options(columns)) as reader:
+                    for chunk in reader:
+                        yield compact_frame(chunk)
+            else:
+                yield from iter_table_chunks(spooled, input_format, chunk_rows, columns)
+        finally:
+            spooled.close()
+
+    return chunks()
+
+
+def encode_chunk(results: pd.DataFrame, output_format: str, header: bool) -> bytes:
+    if output_format == "csv":
+        return results.to_csv(index=False, header=header).encode() if len(results) else b""
+    return encode_ndjson(results)
+
+
+def score_and_encode(score_chunk: Callable[[pd.DataFrame], pd.DataFrame], chunk: pd.DataFrame, output_format: str, header: bool) -> tuple:
+    """Score one chunk and encode it in the worker, so serialization stays off the event loop too."""
+    results = score_chunk(chunk)
+    return len(results), encode_chunk(results, output_format, header)
+
+
+def next_chunk(chunks: Iterator[pd.DataFrame], endpoint: Optional[str], input_format: str) -> Optional[pd.DataFrame]:
+    if endpoint is None:
+        return next(chunks, None)
+    with STAGE_SECONDS.time(endpoint, f"parse_{input_format}"):
+        return next(chunks, None)
+
+
+async def stream_predictions(
+    chunks: Iterator[pd.DataFrame],
+    score_chunk: Callable[[pd.DataFrame], pd.DataFrame],
+    output_format: str,
+    executor: InferenceExecutor,
+    endpoint: Optional[str] = None,
+    input_format: str = "csv",
+) -> StreamingResponse:
+    """Score an upload chunk by chunk and stream results back as NDJSON or CSV.
+
+    Chunks are parsed in a thread and scored on `executor`. The first chunk is scored
+    before the response starts, so missing columns and validation errors near the top
+    of the file still return a proper error status. A failure in a later chunk ends
+    the stream; NDJSON clients receive an `error` line. With an `endpoint`, chunk
+    parsing and the total rows streamed are recorded in its metrics.
+    """
+    if output_format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {output_format}. Use one of {list(STREAM_FORMATS)}.")
+
+    first_chunk = await run_in_threadpool(next_chunk, chunks, endpoint, input_format)
+    first_rows, first_body = (0, b"")
+    if first_chunk is not None:
+        first_rows, first_body = await executor.run(score_and_encode, score_chunk, first_chunk, output_format, True)
+
+    async def body() -> AsyncIterator[bytes]:
+        yield first_body
+        rows = first_rows
+        # A chunk with no rows produces no CSV output, so the header must still be pending
+        header = not first_rows
+        while True:
+            try:
+                chunk = await run_in_threadpool(next_chunk, chunks, endpoint, input_format)
+                if chunk is None:
+                    break
+                count, encoded = await executor.run(score_and_encode, score_chunk, chunk, output_format, header)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Streaming aborted after {rows} rows: {detail}")
+                if output_format == "ndjson":
+                    yield orjson.dumps({"error": detail}) + b"\n"
+                await run_in_threadpool(chunks.close)
+                return
+            yield encoded
+            header = header and not count
+            rows += count
+        logger.info(f"Streamed {rows} predictions.")
+        if endpoint is not None:
+            REQUEST_ROWS.observe(rows, endpoint)
+
+    return StreamingResponse(body(), media_type=STREAM_FORMATS[output_format])
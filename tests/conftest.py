@@ -0,0 +1,47 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The services load their models and Attrition.csv by relative path
+os.chdir(ROOT)
+
+# Keep the prediction log and rollups written by endpoint tests out of the working tree
+SCRATCH = tempfile.mkdtemp(prefix="hr-analytics-tests-")
+os.environ.setdefault("HR_PREDICTION_LOG", os.path.join(SCRATCH, "predictions.log"))
+os.environ.setdefault("HR_ROLLUP_DB", os.path.join(SCRATCH, "rollups.db"))
+ADMIN_TOKEN = os.environ.setdefault("HR_ADMIN_TOKEN", "test-admin-token")
+
+
+@pytest.fixture(scope="session")
+def employees() -> pd.DataFrame:
+    """Attrition.csv plus rows with an unseen category, a missing value and a fractional input."""
+    data = pd.read_csv(os.path.join(ROOT, "Attrition.csv"), encoding="utf-8-sig")
+    edge_cases = data.head(3).copy()
+    edge_cases.loc[edge_cases.index[0], "JobRole"] = "Chief Happiness Officer"
+    edge_cases.loc[edge_cases.index[1], "MonthlyIncome"] = np.nan
+    edge_cases.loc[edge_cases.index[2], "WorkLifeBalance"] = 2.5
+    return pd.concat([data, edge_cases], ignore_index=True)
+
+
+@pytest.fixture
+def record(employees) -> dict:
+    """The first employee as a JSON request body."""
+    from validation import EMPLOYEE_COLUMNS
+
+    return json.loads(employees[EMPLOYEE_COLUMNS].head(1).to_json(orient="records"))[0]
+
+
+@pytest.fixture(scope="module")
+def client(request) -> TestClient:
+    """Client for the service named by indirect parametrization, else the test module's SERVICE, else service.py."""
+    name = getattr(request, "param", None) or getattr(request.module, "SERVICE", "service")
+    return TestClient(importlib.import_module(name).app)
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+import batch_score
+from batch_score import MODELS, output_columns, score_chunk
+from validation import EMPLOYEE_COLUMNS, KEY_COLUMN
+
+
+@pytest.fixture
+def chunk(employees):
+    return employees[EMPLOYEE_COLUMNS + [KEY_COLUMN]].head(20).copy()
+
+
+@pytest.mark.parametrize("models", [list(MODELS), ["attrition"], ["performance"], ["retention"], ["performance", "retention"]])
+def test_score_chunk_columns(chunk, models):
+    results, dropped = score_chunk(chunk, models, skip_invalid=False)
+    assert dropped == 0
+    assert list(results.columns) == [KEY_COLUMN] + output_columns(models)
+    assert len(results) == len(chunk)
+
+
+@pytest.mark.parametrize("models", [list(MODELS), ["attrition"], ["performance"]])
+def test_all_invalid_chunk_is_skipped(chunk, models):
+    chunk["JobSatisfaction"] = 9
+    valid, _ = score_chunk(chunk.assign(JobSatisfaction=3), models, skip_invalid=False)
+    results, dropped = score_chunk(chunk, models, skip_invalid=True)
+    assert dropped == len(chunk)
+    assert results.empty
+    assert list(results.columns) == list(valid.columns)
+    assert (results.dtypes == valid.dtypes).all()
+
+
+def test_invalid_rows_stop_without_skip(chunk):
+    chunk.loc[chunk.index[0], "OverTime"] = "Maybe"
+    with pytest.raises(ValueError, match="1 rows fail validation"):
+        score_chunk(chunk, list(MODELS), skip_invalid=False)
+
+
+@pytest.mark.parametrize("output_name", ["scores.csv", "scores"])
+def test_run_with_an_all_invalid_chunk(tmp_path, chunk, output_name):
+    chunk = pd.concat([chunk.head(5).assign(OverTime="Maybe"), chunk.iloc[5:]])
+    source = tmp_path / "employees.csv"
+    chunk.to_csv(source, index=False)
+    output = str(tmp_path / output_name)
+    summary = batch_score.run(str(source), output, list(MODELS), workers=1, chunk_rows=5, skip_invalid=True)
+    assert (summary["rows"], summary["dropped_invalid"]) == (20, 5)
+    written = pd.read_csv(output) if output.endswith(".csv") else pd.read_parquet(output)
+    assert written[KEY_COLUMN].tolist() == chunk[KEY_COLUMN].iloc[5:].tolist()
+
+
+def test_store_update_with_an_all_invalid_chunk(tmp_path, chunk):
+    from score_store import ScoreStore
+
+    chunk = pd.concat([chunk.head(5).assign(OverTime="Maybe"), chunk.iloc[5:]])
+    source = tmp_path / "employees.csv"
+    chunk.to_csv(source, index=False)
+    store = ScoreStore(str(tmp_path / "scores.db"))
+    try:
+        counts = store.update(str(source), chunk_rows=5, skip_invalid=True)
+        assert (counts["rows"], counts["new"], counts["invalid"]) == (20, 20, 5)
+        assert store.stats()["employees"] == 15
+        assert store.get(int(chunk[KEY_COLUMN].iloc[0])) is None
+        assert store.get(int(chunk[KEY_COLUMN].iloc[5])) is not None
+    finally:
+        store.close()
@@ -0,0 +1,61 @@
+import io
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import apps
+from responses import ARROW_STREAM, COLUMNAR_JSON
+from validation import EMPLOYEE_COLUMNS
+
+SERVICE = "apps"
+TOP_K = 3
+
+
+@pytest.fixture
+def frame(employees):
+    return employees[EMPLOYEE_COLUMNS].head(20)
+
+
+def explain_bulk(client, frame, accept):
+    return client.post(
+        f"/explain_performance_bulk?top_k={TOP_K}",
+        files={"file": ("employees.csv", frame.to_csv(index=False).encode(), "text/csv")},
+        headers={"Accept": accept},
+    )
+
+
+def test_explain_invalid_record_is_400(client, record):
+    response = client.post("/explain_performance", json=dict(record, JobSatisfaction=9))
+    assert response.status_code == 400
+
+
+def test_explain_bulk_invalid_rows_are_400(client, frame):
+    invalid = frame.copy()
+    invalid.loc[invalid.index[0], "JobSatisfaction"] = 9
+    assert explain_bulk(client, invalid, "application/json").status_code == 400
+
+
+def test_explain_bulk_output_formats_agree(client, frame):
+    response = explain_bulk(client, frame, "application/json")
+    assert response.status_code == 200
+    expected = pd.DataFrame(response.json()["predictions"])
+    feature_columns = [f"Feature{k}" for k in range(1, TOP_K + 1)]
+    assert expected[feature_columns].isin(apps.performance.get().explainer.fields).all().all()
+
+    columnar = explain_bulk(client, frame, COLUMNAR_JSON)
+    assert columnar.status_code == 200
+    pd.testing.assert_frame_equal(pd.DataFrame(orjson.loads(columnar.content)["predictions"]), expected)
+
+    arrow = explain_bulk(client, frame, ARROW_STREAM)
+    assert arrow.status_code == 200
+    pd.testing.assert_frame_equal(pa.ipc.open_stream(arrow.content).read_pandas(), expected, check_dtype=False)
+
+    csv = explain_bulk(client, frame, "text/csv")
+    assert csv.status_code == 200
+    from_csv = pd.read_csv(io.BytesIO(csv.content))
+    assert list(from_csv.columns) == list(expected.columns)
+    assert (from_csv[feature_columns] == expected[feature_columns]).all().all()
+    np.testing.assert_allclose(from_csv["Contribution1"], expected["Contribution1"], rtol=1e-12)
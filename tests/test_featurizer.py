@@ -0,0 +1,74 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from featurizer import CompiledFeaturizer
+
+
+@pytest.fixture(scope="module", params=["performance_model.pkl", "retention_model.pkl"])
+def pipeline(request):
+    return joblib.load(request.param)
+
+
+def reference_transform(pipeline, data: pd.DataFrame) -> np.ndarray:
+    # The preprocessor alone; SMOTE and the model are the last two steps
+    return np.asarray(pipeline[:-2].transform(data), dtype=np.float64)
+
+
+def test_pipeline_parity(pipeline, employees):
+    featurizer, estimator = CompiledFeaturizer.from_pipeline(pipeline)
+    assert estimator is pipeline.steps[-1][1]
+    data = employees[list(featurizer.input_features)]
+    expected = reference_transform(pipeline, data)
+    np.testing.assert_array_equal(featurizer.transform_frame(data), expected)
+    np.testing.assert_array_equal(featurizer.transform_records(data.to_dict("records")), expected)
+
+
+def test_unknown_category_sets_no_column(pipeline, employees):
+    featurizer, _ = CompiledFeaturizer.from_pipeline(pipeline)
+    data = employees[list(featurizer.input_features)].head(1).copy()
+    for name, _ in featurizer.onehot:
+        data[name] = "Never seen in training"
+    expected = reference_transform(pipeline, data)
+    np.testing.assert_array_equal(featurizer.transform_frame(data), expected)
+    np.testing.assert_array_equal(featurizer.transform_records(data.to_dict("records")), expected)
+    for _, positions in featurizer.onehot:
+        assert not featurizer.transform_frame(data)[:, list(positions.values())].any()
+
+
+def test_dropped_first_levels(pipeline, employees):
+    featurizer, _ = CompiledFeaturizer.from_pipeline(pipeline)
+    encoder = pipeline[0].named_transformers_["cat"]
+    columns = pipeline[0].transformers_[1][2]
+    data = employees[list(featurizer.input_features)].head(1).copy()
+    for column, categories, dropped in zip(columns, encoder.categories_, encoder.drop_idx_):
+        data[column] = categories[dropped]
+    expected = reference_transform(pipeline, data)
+    np.testing.assert_array_equal(featurizer.transform_frame(data), expected)
+    np.testing.assert_array_equal(featurizer.transform_records(data.to_dict("records")), expected)
+
+
+def test_single_record(pipeline, employees):
+    featurizer, _ = CompiledFeaturizer.from_pipeline(pipeline)
+    data = employees[list(featurizer.input_features)]
+    for position in [0, len(data) - 3, len(data) - 1]:
+        row = data.iloc[[position]]
+        expected = reference_transform(pipeline, row)
+        np.testing.assert_array_equal(featurizer.transform_records([row.iloc[0].to_dict()]), expected)
+        np.testing.assert_array_equal(featurizer.transform_frame(row), expected)
+
+
+def test_value_maps_match_attrition_preprocessing(employees):
+    import app
+
+    featurizer = CompiledFeaturizer.from_value_maps(app.ATTRITION_FEATURES, {"OverTime": app.OVERTIME_MAP}, fill_value=0)
+    data = employees[app.EMPLOYEE_COLUMNS]
+    expected = (
+        app.preprocess_data(data, ["OverTime"])
+        .reindex(columns=app.ATTRITION_FEATURES, fill_value=0)
+        .to_numpy(dtype=np.float64)
+    )
+    np.testing.assert_array_equal(featurizer.transform_frame(data), expected)
+    np.testing.assert_array_equal(featurizer.transform_records(data.to_dict("records")), expected)
+    np.testing.assert_array_equal(featurizer.transform_records(data.head(1).to_dict("records")), expected[:1])
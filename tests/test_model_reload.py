@@ -0,0 +1,29 @@
+import app
+from conftest import ADMIN_TOKEN
+
+SERVICE = "app"
+
+
+def test_reload_requires_token(client):
+    assert client.post("/models/attrition/reload").status_code == 401
+    assert client.post("/models/attrition/reload", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+
+def test_reload_disabled_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(app, "MODEL_ADMIN_TOKEN", "")
+    response = client.post("/models/attrition/reload", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+
+
+def test_reload_ignores_path(client):
+    before = app.attrition.path
+    response = client.post(
+        "/models/attrition/reload", params={"path": "/etc/passwd"}, headers={"X-Admin-Token": ADMIN_TOKEN}
+    )
+    assert response.status_code == 200
+    assert response.json()["reloaded"]
+    assert app.attrition.path == before
+
+
+def test_reload_unknown_model(client):
+    assert client.post("/models/salary/reload", headers={"X-Admin-Token": ADMIN_TOKEN}).status_code == 404
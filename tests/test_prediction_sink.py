@@ -0,0 +1,79 @@
+import glob
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from prediction_sink import PredictionSink
+
+
+def log_lines(path: str) -> list:
+    return [json.loads(line.split(" - ", 1)[1]) for name in glob.glob(f"{path}*") for line in open(name)]
+
+
+def test_large_frame_waits_for_room_instead_of_dropping(tmp_path):
+    path = str(tmp_path / "predictions.log")
+    sink = PredictionSink(path=path, queue_rows=100, write_rows=30, flush_seconds=0.01)
+    inputs = pd.DataFrame({"Age": range(1000)})
+    sink.write("bulk", inputs, pd.DataFrame({"AttritionRisk": [0.0] * 1000}))
+    sink.flush()
+    sink.close()
+    assert (sink.written, sink.dropped) == (1000, 0)
+    assert sorted(line["input"]["Age"] for line in log_lines(path)) == list(range(1000))
+
+
+def test_overflow_is_dropped_and_counted(tmp_path):
+    sink = PredictionSink(path=str(tmp_path / "predictions.log"), queue_rows=5, write_rows=2, block_seconds=0.05)
+    gate = threading.Event()
+    flush = sink._flush
+    sink._flush = lambda items: gate.wait() and flush(items)
+    for i in range(7):
+        sink.write("single", [{"Age": i}], [{"AttritionRisk": 0.0}])
+    # Nothing leaves the queue while the writer is held, so both slices of the frame time out
+    sink.write("bulk", pd.DataFrame({"Age": range(4)}), pd.DataFrame({"AttritionRisk": [0.0] * 4}))
+    assert sink.dropped == 2 + 4
+    gate.set()
+    sink.flush()
+    sink.close()
+    assert sink.written == 5
+
+
+def test_parquet_timestamps_are_utc(tmp_path):
+    sink = PredictionSink(path=str(tmp_path / "predictions"), fmt="parquet", flush_seconds=0.01)
+    before = pd.Timestamp.now(tz="UTC")
+    sink.write("single", [{"Age": 30}], [{"AttritionRisk": 1.0}])
+    sink.flush()
+    sink.close()
+    (segment,) = glob.glob(str(tmp_path / "predictions.parquet" / "*.parquet"))
+    table = pq.read_table(segment)
+    assert str(table.schema.field("timestamp").type.tz) == "UTC"
+    logged = table.column("timestamp").to_pandas()[0]
+    assert before - pd.Timedelta(seconds=1) <= logged <= pd.Timestamp.now(tz="UTC")
+
+
+def _write_from_process(args):
+    path, worker = args
+    sink = PredictionSink(path=path, max_bytes=20000, backups=1000, flush_seconds=0.01)
+    for i in range(300):
+        sink.write("single", [{"worker": worker, "i": i}], [{"AttritionRisk": 0.0}])
+        if i % 7 == 0:
+            time.sleep(0.001)
+    sink.close()
+    return sink.written
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork and flock")
+def test_processes_share_one_rotating_log(tmp_path):
+    path = str(tmp_path / "predictions.log")
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        assert pool.map(_write_from_process, [(path, worker) for worker in range(4)]) == [300] * 4
+    lines = log_lines(path)
+    assert len(glob.glob(f"{path}.*")) > 1
+    assert sorted((line["input"]["worker"], line["input"]["i"]) for line in lines) == [
+        (worker, i) for worker in range(4) for i in range(300)
+    ]
@@ -0,0 +1,45 @@
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from responses import encode_results
+
+
+@pytest.fixture
+def results() -> pd.DataFrame:
+    return pd.DataFrame({
+        "EmployeeIndex": np.arange(4, dtype=np.int64),
+        "Feature1": ["OverTime", "JobRole", None, "Age"],
+        "Contribution1": [0.5, -0.25, np.nan, 1.0],
+        "OverTime:set": pd.Categorical(["Yes", "No", "Yes", "No"]),
+        "AttritionRisk": np.array([1, 0, 1, 0], dtype=np.int8),
+        "Flagged": np.array([True, False, True, False]),
+    })
+
+
+def test_columnar_round_trip_with_text_columns(results):
+    decoded = orjson.loads(encode_results(results, "columnar"))["predictions"]
+    assert list(decoded) == list(results.columns)
+    assert decoded["EmployeeIndex"] == [0, 1, 2, 3]
+    assert decoded["Feature1"] == ["OverTime", "JobRole", None, "Age"]
+    assert decoded["Contribution1"] == [0.5, -0.25, None, 1.0]
+    assert decoded["OverTime:set"] == ["Yes", "No", "Yes", "No"]
+    assert decoded["AttritionRisk"] == [1, 0, 1, 0]
+    assert decoded["Flagged"] == [True, False, True, False]
+
+
+def test_columnar_matches_row_json(results):
+    rows = orjson.loads(encode_results(results, "json"))["predictions"]
+    columns = orjson.loads(encode_results(results, "columnar"))["predictions"]
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == rows
+
+
+def test_arrow_and_csv_keep_text_columns(results):
+    table = pa.ipc.open_stream(encode_results(results, "arrow")).read_all()
+    assert table.column("Feature1").to_pylist() == ["OverTime", "JobRole", None, "Age"]
+    assert table.column("OverTime:set").to_pylist() == ["Yes", "No", "Yes", "No"]
+    csv = encode_results(results, "csv").decode().splitlines()
+    assert csv[0] == ",".join(results.columns)
+    assert csv[1] == "0,OverTime,0.5,Yes,1,True"
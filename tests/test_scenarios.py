@@ -0,0 +1,48 @@
+import json
+
+import orjson
+import pytest
+
+import service
+from responses import COLUMNAR_JSON
+from validation import EMPLOYEE_COLUMNS
+
+OVERTIME_AXIS = [{"field": "OverTime", "values": ["Yes", "No"]}]
+
+
+@pytest.fixture
+def cohort(employees):
+    return {"file": ("cohort.csv", employees[EMPLOYEE_COLUMNS].head(10).to_csv(index=False).encode(), "text/csv")}
+
+
+def test_scenarios(client, record):
+    response = client.post("/scenarios", json={"employee": record, "axes": OVERTIME_AXIS})
+    assert response.status_code == 200
+    assert response.json()["grid_size"] == 2
+
+
+def test_scenarios_invalid_grid_is_400(client, record):
+    axes = [{"field": "JobSatisfaction", "values": [9]}]
+    response = client.post("/scenarios", json={"employee": record, "axes": axes})
+    assert response.status_code == 400
+    assert "invalid inputs" in response.json()["detail"]
+
+
+def test_scenarios_bulk_invalid_grid_is_400(client, cohort):
+    axes = [{"field": "JobSatisfaction", "values": [9]}]
+    response = client.post("/scenarios_bulk", files=cohort, data={"axes": json.dumps(axes)})
+    assert response.status_code == 400
+
+
+def test_scenarios_bulk_detail_columnar(client, cohort):
+    response = client.post(
+        "/scenarios_bulk?detail=true", files=cohort, data={"axes": json.dumps(OVERTIME_AXIS)}, headers={"Accept": COLUMNAR_JSON}
+    )
+    assert response.status_code == 200
+    assert orjson.loads(response.content)["predictions"]["OverTime:set"] == ["Yes", "No"] * 10
+
+
+def test_scenarios_bulk_over_memory_budget_is_413(client, cohort, monkeypatch):
+    monkeypatch.setattr(service.bulk_memory, "limit", 1024)
+    response = client.post("/scenarios_bulk", files=cohort, data={"axes": json.dumps(OVERTIME_AXIS)})
+    assert response.status_code == 413
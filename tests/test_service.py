@@ -0,0 +1,34 @@
+import pandas as pd
+
+from validation import EMPLOYEE_COLUMNS
+
+
+def upload(frame: pd.DataFrame):
+    return {"file": ("employees.csv", frame.to_csv(index=False).encode(), "text/csv")}
+
+
+def test_predict_all(client, record):
+    response = client.post("/predict_all", json=record)
+    assert response.status_code == 200
+    assert set(response.json()) == {
+        "AttritionRisk", "AttritionRiskProbability", "PerformanceRating", "RetentionRisk", "RetentionRiskProbability"
+    }
+
+
+def test_predict_all_invalid_record_is_400(client, record):
+    response = client.post("/predict_all", json=dict(record, JobSatisfaction=9))
+    assert response.status_code == 400
+    assert "JobSatisfaction" in response.json()["detail"]
+
+
+def test_predict_all_bulk_invalid_rows_are_400(client, employees):
+    frame = employees[EMPLOYEE_COLUMNS].head(5).copy()
+    frame.loc[frame.index[2], "JobSatisfaction"] = 9
+    response = client.post("/predict_all_bulk", files=upload(frame))
+    assert response.status_code == 400
+    assert any("JobSatisfaction" in str(error) for error in response.json()["detail"])
+
+
+def test_predict_all_bulk_missing_columns_are_400(client, employees):
+    response = client.post("/predict_all_bulk", files=upload(employees[EMPLOYEE_COLUMNS[:-1]].head(5)))
+    assert response.status_code == 400
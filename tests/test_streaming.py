@@ -0,0 +1,50 @@
+import orjson
+import pytest
+from validation import EMPLOYEE_COLUMNS
+
+BULK_ENDPOINTS = [
+    ("app", "/predict_attrition_bulk"),
+    ("apps", "/predict_performance_bulk"),
+    ("apps", "/predict_retention_bulk"),
+    ("apps", "/explain_performance_bulk"),
+    ("service", "/predict_all_bulk"),
+]
+
+
+@pytest.fixture
+def frame(employees):
+    return employees[EMPLOYEE_COLUMNS].head(30).copy()
+
+
+def upload(frame):
+    return {"file": ("employees.csv", frame.to_csv(index=False).encode(), "text/csv")}
+
+
+@pytest.mark.parametrize("client, path", BULK_ENDPOINTS, indirect=["client"])
+def test_stream_ndjson(client, path, frame):
+    response = client.post(f"{path}?stream=ndjson", files=upload(frame))
+    assert response.status_code == 200
+    lines = [orjson.loads(line) for line in response.content.splitlines()]
+    assert len(lines) == len(frame)
+    assert all("error" not in line for line in lines)
+
+
+@pytest.mark.parametrize("client, path", BULK_ENDPOINTS, indirect=["client"])
+def test_unsupported_stream_format_is_400(client, path, frame):
+    response = client.post(f"{path}?stream=xml", files=upload(frame))
+    assert response.status_code == 400
+    assert "Unsupported stream format" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("client, path", BULK_ENDPOINTS, indirect=["client"])
+def test_invalid_first_chunk_is_400(client, path, frame):
+    frame.loc[frame.index[1], "OverTime"] = "Maybe"
+    response = client.post(f"{path}?stream=ndjson", files=upload(frame))
+    assert response.status_code == 400
+    assert response.json()["detail"] == ["Row 1: OverTime must be 'Yes' or 'No'."]
+
+
+@pytest.mark.parametrize("client, path", BULK_ENDPOINTS, indirect=["client"])
+def test_missing_columns_in_first_chunk_are_400(client, path, frame):
+    response = client.post(f"{path}?stream=csv", files=upload(frame.drop(columns="JobSatisfaction")))
+    assert response.status_code == 400
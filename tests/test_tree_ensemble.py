@@ -0,0 +1,83 @@
+import joblib
+import numpy as np
+import pytest
+import xgboost as xgb
+
+import app
+from featurizer import CompiledFeaturizer
+from tree_ensemble import FLAT_TREES_MAX_ROWS, FlatTreeEnsemble, TreePredictor
+
+# XGBoost computes the softmax with its own float32 expf, which can round the last bit
+# differently from NumPy's exp; the margins it is applied to match exactly
+XGBOOST_PROBABILITY_MAX_ULP = 1
+
+
+@pytest.fixture(scope="module")
+def forest():
+    return joblib.load("attrition_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def attrition_X(employees):
+    featurizer = CompiledFeaturizer.from_value_maps(app.ATTRITION_FEATURES, {"OverTime": app.OVERTIME_MAP}, fill_value=0)
+    return featurizer.transform_frame(employees)
+
+
+@pytest.fixture(scope="module")
+def booster_and_X(employees):
+    featurizer, estimator = CompiledFeaturizer.from_pipeline(joblib.load("performance_model.pkl"))
+    return estimator, featurizer.transform_frame(employees)
+
+
+@pytest.mark.parametrize("rows", [1, 100, None])
+def test_forest_probabilities_are_exact(forest, attrition_X, rows):
+    X = attrition_X[:rows]
+    flat = FlatTreeEnsemble.from_sklearn_forest(forest)
+    np.testing.assert_array_equal(flat.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X), forest.predict(X))
+
+
+@pytest.mark.parametrize("rows", [1, 100, None])
+def test_xgboost_margins_exact_probabilities_within_one_ulp(booster_and_X, rows):
+    estimator, X = booster_and_X
+    X = X[:rows]
+    flat = FlatTreeEnsemble.from_xgboost(estimator)
+    native_margins = estimator.get_booster().predict(xgb.DMatrix(X), output_margin=True)
+    np.testing.assert_array_equal(flat.margins(X), native_margins)
+    expected, actual = estimator.predict_proba(X), flat.predict_proba(X)
+    assert actual.dtype == expected.dtype == np.float32
+    np.testing.assert_array_max_ulp(actual, expected, maxulp=XGBOOST_PROBABILITY_MAX_ULP)
+    np.testing.assert_array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_save_and_memory_mapped_load_round_trip(forest, attrition_X, tmp_path):
+    flat = FlatTreeEnsemble.from_sklearn_forest(forest)
+    flat.save(str(tmp_path / "forest"))
+    loaded = FlatTreeEnsemble.load(str(tmp_path / "forest"), mmap_mode="r")
+    np.testing.assert_array_equal(loaded.predict_proba(attrition_X), flat.predict_proba(attrition_X))
+
+
+@pytest.mark.parametrize("model_name", ["forest", "booster"])
+def test_predictor_switches_at_max_rows(request, monkeypatch, attrition_X, model_name):
+    if model_name == "forest":
+        model, X = request.getfixturevalue("forest"), attrition_X
+    else:
+        model, X = request.getfixturevalue("booster_and_X")
+    predictor = TreePredictor(model, enabled=True)
+    assert predictor.flat is not None
+    assert predictor.max_rows == FLAT_TREES_MAX_ROWS[predictor.flat.kind]
+
+    calls = []
+    flat_predict, native_predict = predictor.flat.predict_proba, model.predict_proba
+    monkeypatch.setattr(predictor.flat, "predict_proba", lambda X: calls.append("flat") or flat_predict(X))
+    monkeypatch.setattr(model, "predict_proba", lambda X: calls.append("native") or native_predict(X))
+
+    predictor.predict_proba(X[:predictor.max_rows])
+    predictor.predict_proba(X[:predictor.max_rows + 1])
+    assert calls == ["flat", "native"]
+
+
+def test_predictor_disabled_uses_native(forest, attrition_X):
+    predictor = TreePredictor(forest, enabled=False)
+    assert predictor.flat is None
+    np.testing.assert_array_equal(predictor.predict_proba(attrition_X[:1]), forest.predict_proba(attrition_X[:1]))
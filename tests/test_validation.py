@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from validation import (
+    ATTRITION_RULES, EMPLOYEE_COLUMNS, MAX_REPORTED_ERRORS, PERFORMANCE_RULES, RETENTION_RULES,
+    merge_rules, validate_frame, validate_record,
+)
+
+
+@pytest.fixture
+def frame(employees) -> pd.DataFrame:
+    return employees[EMPLOYEE_COLUMNS].head(40).copy()
+
+
+def test_valid_frame(frame):
+    report = validate_frame(frame, ATTRITION_RULES)
+    assert report.ok
+    assert report.total_violations == 0
+    assert set(report.counts) == {rule.name for rule in ATTRITION_RULES}
+
+
+def test_messages_name_the_row_index_in_row_then_rule_order(frame):
+    frame.index = frame.index + 100
+    frame.loc[103, "OverTime"] = "Maybe"
+    frame.loc[103, "JobSatisfaction"] = 9
+    frame.loc[101, "MonthlyIncome"] = 0
+    report = validate_frame(frame, ATTRITION_RULES)
+    assert report.errors == [
+        "Row 101: MonthlyIncome must be greater than 0.",
+        "Row 103: JobSatisfaction must be between 1 and 5.",
+        "Row 103: OverTime must be 'Yes' or 'No'.",
+    ]
+
+
+def test_messages_are_capped_and_counts_cover_every_violation(frame):
+    frame["Age"] = 10
+    frame.loc[frame.index[:5], "Gender"] = None
+    report = validate_frame(frame, ATTRITION_RULES)
+    assert len(report.errors) == MAX_REPORTED_ERRORS
+    assert report.errors[:2] == ["Row 0: Age must be between 18 and 100.", "Row 0: Gender must be 'Male' or 'Female'."]
+    assert report.counts["Age:range"] == len(frame)
+    assert report.counts["Gender:allowed_values"] == 5
+    assert report.total_violations == len(frame) + 5
+    assert len(validate_frame(frame, ATTRITION_RULES, max_errors=3).errors) == 3
+
+
+def test_missing_numbers_are_skipped_and_missing_categories_reported(frame):
+    frame["MonthlyIncome"] = frame["MonthlyIncome"].astype(float)
+    frame.loc[frame.index[0], "MonthlyIncome"] = np.nan
+    frame.loc[frame.index[1], "OverTime"] = None
+    report = validate_frame(frame, PERFORMANCE_RULES)
+    assert report.counts["MonthlyIncome:positive"] == 0
+    assert report.errors == ["Row 1: OverTime must be 'Yes' or 'No'."]
+
+
+def test_categorical_columns_match_object_columns(frame):
+    frame.loc[frame.index[2], "Gender"] = "Other"
+    frame.loc[frame.index[4], "OverTime"] = None
+    categorical = frame.astype({"Gender": "category", "OverTime": "category"})
+    assert validate_frame(categorical, ATTRITION_RULES) == validate_frame(frame, ATTRITION_RULES)
+
+
+def test_validate_record(record):
+    assert validate_record(record, ATTRITION_RULES) == []
+    invalid = dict(record, JobSatisfaction=0, Gender="Other")
+    assert validate_record(invalid, ATTRITION_RULES) == [
+        "JobSatisfaction must be between 1 and 5.", "Gender must be 'Male' or 'Female'."
+    ]
+
+
+def test_merge_rules_keeps_shared_checks_once():
+    merged = merge_rules(ATTRITION_RULES, PERFORMANCE_RULES, RETENTION_RULES)
+    keys = [(rule.name, rule.message()) for rule in merged]
+    assert len(keys) == len(set(keys))
+    # Different checks on the same field are all kept
+    assert {"Age:range", "Age:non_negative", "PerformanceRating:range"} <= {rule.name for rule in merged}
+
+
+@pytest.mark.parametrize("client, path", [
+    ("app", "/predict_attrition"),
+    ("apps", "/predict_performance"),
+    ("apps", "/predict_retention"),
+], indirect=["client"])
+def test_single_endpoints_return_400_for_invalid_records(client, path, record):
+    response = client.post(path, json=dict(record, JobSatisfaction=9))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "JobSatisfaction must be between 1 and 5."
+
+
+@pytest.mark.parametrize("client, path", [
+    ("app", "/predict_attrition_bulk"),
+    ("apps", "/predict_performance_bulk"),
+    ("apps", "/predict_retention_bulk"),
+], indirect=["client"])
+def test_bulk_endpoints_return_400_for_invalid_rows(client, path, frame):
+    frame.loc[frame.index[3], "JobSatisfaction"] = 9
+    upload = {"file": ("employees.csv", frame.to_csv(index=False).encode(), "text/csv")}
+    response = client.post(path, files=upload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == ["Row 3: JobSatisfaction must be between 1 and 5."]
@@ -0,0 +1,359 @@
+"""Rebuild attrition_model.pkl, performance_model.pkl and retention_model.pkl.
+
+Runs the recipes from the notebooks as one reproducible command:
+
+- attrition (HR_Analytics_Project.ipynb): SMOTE, then a random forest over JobSatisfaction,
+  WorkLifeBalance and OverTime, saved as the bare forest app.py expects;
+- performance (performance_model.ipynb): scaler and one-hot encoder, SMOTE, then XGBoost
+  on the synthetic 1-5 rating, saved as the whole imblearn pipeline;
+- retention (performance&rettention_modle.ipynb): the same preprocessing over five inputs,
+  SMOTE, then logistic regression on RetentionScore < 0.5.
+
+Each model's grid is searched with 5-fold GridSearchCV across all cores. The pipelines
+cache their fitted preprocessors and SMOTE-resampled folds with `joblib.Memory`, so the
+candidates of a grid share one transform and resample per fold instead of repeating it,
+and a rerun on the same data reuses them from disk. Searching runs on a stratified
+training split; the remainder is scored as a holdout before the artifact is written.
+
+Artifacts are replaced atomically, so a running service's model registry picks them up
+on its next check. Every stage is timed and reported.
+
+    python training.py [--data Attrition.csv] [--models attrition performance retention]
+        [--output-dir .] [--jobs -1] [--cv 5] [--test-size 0.2] [--no-search]
+        [--cache-dir .training_cache] [--no-cache] [--report training_report.json]
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline as ImbPipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, get_scorer
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from validation import EMPLOYEE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+TRAINING_DATA_PATH = os.getenv("HR_TRAINING_DATA", "Attrition.csv")
+TRAINING_CACHE_DIR = os.getenv("HR_TRAINING_CACHE", ".training_cache")
+RANDOM_STATE = 42
+
+# Same inputs and encoding as app.ATTRITION_FEATURES / app.OVERTIME_MAP
+ATTRITION_FEATURES = ["JobSatisfaction", "WorkLifeBalance", "OverTime"]
+OVERTIME_MAP = {"Yes": 1, "No": 0}
+
+NUMERIC_FEATURES = [
+    "Age", "MonthlyIncome", "YearsAtCompany", "TotalWorkingYears", "TrainingTimesLastYear",
+    "JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "EnvironmentSatisfaction", "RelationshipSatisfaction"
+]
+CATEGORICAL_FEATURES = ["Gender", "Department", "JobRole", "OverTime"]
+RETENTION_FEATURES = ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "OverTime", "Gender"]
+
+# Columns read from the extract: the inputs plus the recorded labels the targets come from
+TRAINING_COLUMNS = EMPLOYEE_COLUMNS + ["Attrition", "PerformanceRating"]
+
+
+def load_training_data(path: str) -> pd.DataFrame:
+    """The training columns, with text columns as categoricals.
+
+    Categoricals fit the same encoders as strings, and `joblib.Memory` hashes their codes
+    instead of pickling every string, which otherwise costs more than the cached steps save.
+    """
+    if path.endswith(".parquet"):
+        data = pd.read_parquet(path, columns=TRAINING_COLUMNS)
+    else:
+        data = pd.read_csv(path, usecols=TRAINING_COLUMNS)
+    return data.astype({column: "category" for column in CATEGORICAL_FEATURES + ["Attrition"]})
+
+
+def attrition_features(data: pd.DataFrame) -> np.ndarray:
+    # The forest is fitted without column names, as the shipped model was
+    return data[ATTRITION_FEATURES].assign(OverTime=data["OverTime"].map(OVERTIME_MAP)).to_numpy(dtype=np.float64)
+
+
+def attrition_target(data: pd.DataFrame) -> np.ndarray:
+    return (data["Attrition"] == "Yes").to_numpy(dtype=np.int64)
+
+
+def performance_target(data: pd.DataFrame) -> np.ndarray:
+    """The notebook's synthetic rating (assign_performance), vectorized, shifted to 0-4."""
+    score = (
+        data["JobSatisfaction"] * 0.3 + data["WorkLifeBalance"] * 0.3
+        + data["EnvironmentSatisfaction"] * 0.2 + data["JobInvolvement"] * 0.2
+    )
+    income_factor = np.minimum(data["MonthlyIncome"] / 10000, 1.5)
+    final_score = score * income_factor + data["TrainingTimesLastYear"] / 6
+    return np.digitize(final_score.to_numpy(), [1.5, 2.5, 3.5, 4.5])
+
+
+def retention_target(data: pd.DataFrame) -> np.ndarray:
+    """1 (high risk) where the notebook's RetentionScore is below 0.5."""
+    retention_score = (
+        0.3 * (data["JobSatisfaction"] / 4) + 0.3 * (data["WorkLifeBalance"] / 4)
+        + 0.2 * (data["PerformanceRating"] / 5) + 0.2 * (data["JobInvolvement"] / 4)
+    )
+    return (retention_score < 0.5).to_numpy(dtype=np.int64)
+
+
+def preprocessor(numeric: List[str], categorical: List[str]) -> ColumnTransformer:
+    return ColumnTransformer(transformers=[
+        ("num", StandardScaler(), numeric),
+        ("cat", OneHotEncoder(drop="first", handle_unknown="ignore"), categorical),
+    ])
+
+
+def attrition_pipeline() -> ImbPipeline:
+    return ImbPipeline([
+        ("smote", SMOTE(random_state=RANDOM_STATE)),
+        ("model", RandomForestClassifier(random_state=RANDOM_STATE)),
+    ])
+
+
+def performance_pipeline() -> ImbPipeline:
+    return ImbPipeline([
+        ("preprocessor", preprocessor(NUMERIC_FEATURES, CATEGORICAL_FEATURES)),
+        ("smote", SMOTE(random_state=RANDOM_STATE, k_neighbors=3)),
+        ("model", XGBClassifier(eval_metric="mlogloss", random_state=RANDOM_STATE)),
+    ])
+
+
+def retention_pipeline() -> ImbPipeline:
+    return ImbPipeline([
+        ("preprocessor", preprocessor(["JobSatisfaction", "WorkLifeBalance", "JobInvolvement"], ["OverTime", "Gender"])),
+        ("smote", SMOTE(random_state=RANDOM_STATE)),
+        ("model", LogisticRegression(max_iter=1000, random_state=RANDOM_STATE)),
+    ])
+
+
+@dataclass
+class ModelSpec:
+    """How one artifact is built: inputs, target, pipeline, search grid and the notebook's chosen parameters."""
+
+    name: str
+    path: str
+    features: Callable[[pd.DataFrame], Any]
+    target: Callable[[pd.DataFrame], np.ndarray]
+    pipeline: Callable[[], ImbPipeline]
+    param_grid: Dict[str, List[Any]]
+    best_params: Dict[str, Any]
+    scoring: str
+    # The attrition service loads the bare forest; the others load the whole pipeline
+    artifact: Callable[[ImbPipeline], Any] = field(default=lambda pipeline: pipeline)
+
+
+MODEL_SPECS: Dict[str, ModelSpec] = {
+    "attrition": ModelSpec(
+        name="attrition",
+        path="attrition_model.pkl",
+        features=attrition_features,
+        target=attrition_target,
+        pipeline=attrition_pipeline,
+        param_grid={
+            "model__n_estimators": [100, 200],
+            "model__max_depth": [10, 20, None],
+            "model__min_samples_split": [2, 5],
+            "model__class_weight": ["balanced", None],
+        },
+        best_params={"model__n_estimators": 200, "model__max_depth": 10, "model__min_samples_split": 5, "model__class_weight": "balanced"},
+        scoring="f1",
+        artifact=lambda pipeline: pipeline.named_steps["model"],
+    ),
+    "performance": ModelSpec(
+        name="performance",
+        path="performance_model.pkl",
+        features=lambda data: data[EMPLOYEE_COLUMNS],
+        target=performance_target,
+        pipeline=performance_pipeline,
+        param_grid={
+            "model__n_estimators": [100, 200],
+            "model__max_depth": [3, 6, 10],
+            "model__learning_rate": [0.01, 0.1],
+        },
+        best_params={"model__n_estimators": 200, "model__max_depth": 6, "model__learning_rate": 0.1},
+        scoring="f1_macro",
+    ),
+    "retention": ModelSpec(
+        name="retention",
+        path="retention_model.pkl",
+        features=lambda data: data[RETENTION_FEATURES],
+        target=retention_target,
+        pipeline=retention_pipeline,
+        param_grid={
+            "model__C": [0.1, 1, 10],
+            "model__solver": ["lbfgs", "liblinear"],
+            "model__class_weight": [None, "balanced"],
+        },
+        best_params={"model__C": 10, "model__solver": "lbfgs", "model__class_weight": None},
+        scoring="f1",
+    ),
+}
+
+
+class StageTimer:
+    """Wall time per named stage, in the order the stages ran."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+
+def save_artifact(model: Any, path: str) -> None:
+    """Write next to the target and rename over it, so readers never see a partial pickle."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".", suffix=".tmp")
+    os.close(fd)
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def train_model(
+    spec: ModelSpec,
+    data: pd.DataFrame,
+    output_dir: str,
+    search: bool = True,
+    cv: int = 5,
+    n_jobs: int = -1,
+    test_size: float = 0.2,
+    memory: Optional[joblib.Memory] = None,
+) -> Dict[str, Any]:
+    """Search (or fit with the notebook's parameters), evaluate and save one model; returns its report."""
+    timer = StageTimer()
+    with timer.stage("prepare"):
+        X, y = spec.features(data), spec.target(data)
+        if test_size > 0:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=RANDOM_STATE, stratify=y)
+        else:
+            X_train, X_test, y_train, y_test = X, None, y, None
+
+    pipeline = spec.pipeline()
+    # Fitted preprocessors and resampled folds are reused across candidates and reruns
+    pipeline.set_params(memory=memory)
+    report: Dict[str, Any] = {"model": spec.name, "rows": int(len(y)), "train_rows": int(len(y_train))}
+
+    if search:
+        # Parallelism comes from the search; one thread per fit avoids oversubscribing the cores
+        pipeline.set_params(model__n_jobs=1)
+        grid = GridSearchCV(pipeline, spec.param_grid, cv=cv, scoring=spec.scoring, n_jobs=n_jobs, error_score="raise")
+        with timer.stage("search"):
+            grid.fit(X_train, y_train)
+        fitted = grid.best_estimator_
+        fit_times = grid.cv_results_["mean_fit_time"]
+        report.update({
+            "candidates": len(grid.cv_results_["params"]),
+            "folds": cv,
+            "best_params": grid.best_params_,
+            "cv_score": float(grid.best_score_),
+            "refit_seconds": float(grid.refit_time_),
+            "mean_fold_fit_seconds": {"first_candidate": float(fit_times[0]), "mean": float(np.mean(fit_times))},
+        })
+    else:
+        pipeline.set_params(**spec.best_params)
+        with timer.stage("fit"):
+            fitted = pipeline.fit(X_train, y_train)
+        report["best_params"] = spec.best_params
+
+    # The saved pipeline must not point at this run's cache, and should predict with every core
+    fitted.set_params(memory=None, model__n_jobs=None)
+
+    if X_test is not None:
+        with timer.stage("evaluate"):
+            report["holdout_score"] = float(get_scorer(spec.scoring)(fitted, X_test, y_test))
+            report["holdout_accuracy"] = float(accuracy_score(y_test, fitted.predict(X_test)))
+    report["scoring"] = spec.scoring
+
+    path = os.path.join(output_dir, spec.path)
+    with timer.stage("save"):
+        save_artifact(spec.artifact(fitted), path)
+    report["path"] = path
+    report["stage_seconds"] = timer.seconds
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    name = report["model"]
+    if "candidates" in report:
+        print(
+            f"{name:<12} searched {report['candidates']} candidates x {report['folds']} folds on {report['train_rows']:,} rows: "
+            f"best {report['scoring']} {report['cv_score']:.4f} with {report['best_params']}"
+        )
+    else:
+        print(f"{name:<12} fitted on {report['train_rows']:,} rows with {report['best_params']}")
+    if "holdout_score" in report:
+        print(f"{'':<12} holdout {report['scoring']} {report['holdout_score']:.4f}, accuracy {report['holdout_accuracy']:.4f}")
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in report["stage_seconds"].items())
+    print(f"{'':<12} {stages}; saved {report['path']}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=TRAINING_DATA_PATH, help="CSV or Parquet employee extract")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_SPECS), choices=list(MODEL_SPECS))
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits during the search (-1: all cores)")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--test-size", type=float, default=0.2, help="holdout fraction; 0 trains on every row")
+    parser.add_argument("--no-search", action="store_true", help="fit the notebooks' chosen parameters without searching")
+    parser.add_argument("--cache-dir", default=TRAINING_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--clear-cache", action="store_true", help="empty the cache before training")
+    parser.add_argument("--report", help="also write the per-model reports to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.clear_cache:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+    memory = None if args.no_cache else joblib.Memory(args.cache_dir, verbose=0)
+
+    timer = StageTimer()
+    try:
+        with timer.stage("load"):
+            data = load_training_data(args.data)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Could not read {args.data}: {e}")
+    print(f"Loaded {len(data):,} rows from {args.data} in {timer.seconds['load']:.2f}s.", flush=True)
+
+    reports = []
+    for name in args.models:
+        with timer.stage(name):
+            report = train_model(
+                MODEL_SPECS[name], data, args.output_dir, search=not args.no_search, cv=args.cv,
+                n_jobs=args.jobs, test_size=args.test_size, memory=memory,
+            )
+        print_report(report)
+        reports.append(report)
+    print(f"Trained {len(reports)} model(s) in {sum(timer.seconds.values()):.1f}s.")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"data": args.data, "rows": len(data), "stage_seconds": timer.seconds, "models": reports}, f, indent=1, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import numpy as np
+from typing import Optional
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Small batches use the flattened evaluator; larger ones go to the native predictors, whose
+# compiled traversal wins once per-call overhead is amortised. The defaults are the
+# crossover points measured with `python -m benchmarks.tree_evaluator`.
+FLAT_TREES_ENABLED = os.getenv("HR_FLAT_TREES", "1") == "1"
+FLAT_TREES_MAX_ROWS = {
+    "forest": int(os.getenv("HR_FLAT_FOREST_MAX_ROWS", "256")),
+    "xgboost": int(os.getenv("HR_FLAT_XGBOOST_MAX_ROWS", "4")),
+}
+
+# (rows x trees) node indices walked per block; small enough to stay in cache
+_BLOCK_CELLS = 1 << 16
+
+
+class FlatTreeEnsemble:
+    """A tree ensemble flattened into struct-of-arrays NumPy buffers.
+
+    Every tree's nodes are concatenated into shared `feature`, `threshold`, `left`,
+    `missing_left` and `value` arrays, and `roots` holds each tree's first node. Nodes are
+    laid out breadth-first with siblings side by side, so a split moves to `left + (x >
+    threshold)`. Leaves point to themselves with an infinite threshold, so all trees are
+    walked together, one level per step, for `max_depth` steps.
+
+    Features are rounded to float32 as both sklearn and XGBoost do, and each threshold is
+    stored as the float32 bound that gives the same decision (sklearn's `x <= t` and
+    XGBoost's `x < t` both become `x > threshold` -> right). Leaf values are accumulated
+    in tree order, so probabilities match the pickled models.
+
+    `kind` selects the aggregation: "forest" averages per-leaf class distributions,
+    "xgboost" sums leaf margins per class from `base_score` and applies softmax.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        missing_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        tree_class: np.ndarray,
+        classes: np.ndarray,
+        n_features: int,
+        max_depth: int,
+        base_score: float = 0.0,
+    ):
+        if kind not in ("forest", "xgboost"):
+            raise ValueError(f"Unknown ensemble kind: {kind}. Use 'forest' or 'xgboost'.")
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.tree_class = tree_class
+        self.classes_ = classes
+        self.n_features = n_features
+        self.max_depth = max_depth
+        self.base_score = base_score
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    @classmethod
+    def from_sklearn_forest(cls, forest) -> "FlatTreeEnsemble":
+        """Flatten a fitted single-output RandomForestClassifier / ExtraTreesClassifier."""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be flattened.")
+        trees = []
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            if not np.allclose(normalizer, 1.0):
+                # scikit-learn < 1.4 stores class counts and normalises them in predict_proba
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            # x <= t goes left; for float32 x that is x <= (largest float32 <= t)
+            threshold = tree.threshold.astype(np.float32)
+            above = threshold.astype(np.float64) > tree.threshold
+            threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+            missing = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+            trees.append((tree.children_left, tree.children_right, tree.feature, threshold, missing, value))
+        return cls(
+            kind="forest",
+            tree_class=np.zeros(len(trees), dtype=np.int32),
+            classes=np.asarray(forest.classes_),
+            n_features=forest.n_features_in_,
+            **_concatenate(trees),
+        )
+
+    @classmethod
+    def from_xgboost(cls, model) -> "FlatTreeEnsemble":
+        """Flatten a fitted XGBClassifier (gbtree, numeric splits, softprob/softmax objective)."""
+        config = json.loads(model.get_booster().save_raw("json"))["learner"]
+        objective = config["objective"]["name"]
+        if objective not in ("multi:softprob", "multi:softmax"):
+            raise ValueError(f"Unsupported XGBoost objective for flattening: {objective}")
+        gbm = config["gradient_booster"]
+        if gbm["name"] != "gbtree":
+            raise ValueError("Only gbtree boosters can be flattened.")
+        if int(gbm["model"]["gbtree_model_param"]["num_parallel_tree"]) != 1:
+            raise ValueError("Boosted random forests (num_parallel_tree > 1) cannot be flattened.")
+        dumped = gbm["model"]["trees"]
+        tree_info = gbm["model"]["tree_info"]
+        # Honour early stopping the same way XGBClassifier.predict_proba does
+        best_iteration = getattr(model, "best_iteration", None)
+        if best_iteration is not None:
+            n_trees = gbm["model"]["iteration_indptr"][best_iteration + 1]
+            dumped, tree_info = dumped[:n_trees], tree_info[:n_trees]
+        trees = []
+        for tree in dumped:
+            if any(tree.get("split_type", [])):
+                raise ValueError("Trees with categorical splits cannot be flattened.")
+            left = np.array(tree["left_children"], dtype=np.int64)
+            conditions = np.array(tree["split_conditions"], dtype=np.float32)
+            # x < t goes left; for float32 x that is x <= (the float32 just below t)
+            threshold = np.nextafter(conditions, np.float32(-np.inf))
+            # Leaves keep their (already learning-rate scaled) weight in split_conditions
+            value = np.where(left == -1, conditions, np.float32(0))[:, None]
+            trees.append((left, np.array(tree["right_children"]), np.array(tree["split_indices"]), threshold, np.array(tree["default_left"]), value))
+        return cls(
+            kind="xgboost",
+            tree_class=np.array(tree_info, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            n_features=int(config["learner_model_param"]["num_feature"]),
+            base_score=float(config["learner_model_param"]["base_score"]),
+            **_concatenate(trees),
+        )
+
+    @classmethod
+    def from_model(cls, model) -> "FlatTreeEnsemble":
+        if hasattr(model, "get_booster"):
+            return cls.from_xgboost(model)
+        if hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+            return cls.from_sklearn_forest(model)
+        raise ValueError(f"Cannot flatten {type(model).__name__}.")
+
+    def save(self, path: str) -> None:
+        """Export the flattened buffers as one uncompressed .npy file each under `path`."""
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            "kind": self.kind,
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+            "base_score": self.base_score,
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        np.save(os.path.join(path, "classes.npy"), self.classes_, allow_pickle=False)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name), allow_pickle=False)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> "FlatTreeEnsemble":
+        """Load exported buffers; with `mmap_mode="r"` they are paged in from the shared file cache."""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False) for name in _ARRAYS}
+        return cls(classes=np.load(os.path.join(path, "classes.npy"), allow_pickle=False), **meta, **arrays)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape (n_trees, n_rows)."""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected an array of shape (n, {self.n_features}), got {X.shape}.")
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        has_missing = bool(np.isnan(X).any())
+        n_rows = X.shape[0]
+        leaves = np.empty((self.n_trees, n_rows), dtype=np.int32)
+        block = max(1, _BLOCK_CELLS // self.n_trees)
+        for start in range(0, n_rows, block):
+            stop = min(start + block, n_rows)
+            values = X[start:stop].ravel()
+            row_offset = np.arange(stop - start, dtype=np.int32) * self.n_features
+            node = np.repeat(self.roots[:, None], stop - start, axis=1)
+            index = np.empty_like(node)
+            x = np.empty(node.shape, dtype=np.float32)
+            threshold = np.empty(node.shape, dtype=np.float32)
+            right = np.empty(node.shape, dtype=bool)
+            for _ in range(self.max_depth):
+                np.take(self.feature, node, out=index)
+                index += row_offset
+                np.take(values, index, out=x)
+                np.take(self.threshold, node, out=threshold)
+                np.greater(x, threshold, out=right)
+                if has_missing:
+                    missing = np.isnan(x)
+                    right[missing] = ~self.missing_left[node[missing]]
+                np.take(self.left, node, out=index)
+                np.add(index, right, out=node)
+            leaves[:, start:stop] = node
+        return leaves
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        if self.kind == "forest":
+            # (n_trees, n_rows, n_classes) summed in tree order, then averaged like the forest
+            proba = np.add.reduce(self.value[leaves], axis=0)
+            proba /= self.n_trees
+            return proba
+        return _softmax(self._margins(leaves))
+
+    def margins(self, X: np.ndarray) -> np.ndarray:
+        """Untransformed per-class scores of an XGBoost ensemble (`output_margin=True`)."""
+        if self.kind != "xgboost":
+            raise ValueError("Margins are only defined for boosted ensembles.")
+        return self._margins(self.apply(X))
+
+    def _margins(self, leaves: np.ndarray) -> np.ndarray:
+        # Group the trees by class, keeping boosting order within each class
+        n_classes = len(self.classes_)
+        order = np.argsort(self.tree_class, kind="stable")
+        n_rows = leaves.shape[1]
+        weights = np.empty((n_classes, leaves.shape[0] // n_classes + 1, n_rows), dtype=np.float32)
+        weights[:, 0] = self.base_score
+        weights[:, 1:] = self.value[leaves[order], 0].reshape(n_classes, -1, n_rows)
+        # float32 accumulation from base_score, tree by tree, as the CPU predictor does.
+        # cumsum always adds in order; np.add.reduce sums pairwise when a single row makes
+        # the tree axis contiguous, which rounds differently
+        return np.cumsum(weights, axis=1, dtype=np.float32)[:, -1].T
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+_ARRAYS = ("feature", "threshold", "left", "missing_left", "value", "roots", "tree_class")
+
+
+def _concatenate(trees: list) -> dict:
+    """Lay out (left, right, feature, threshold, missing_left, value) trees breadth-first.
+
+    Node ids are renumbered so that every right child directly follows its left sibling;
+    leaves become self-loops whose infinite threshold always keeps them in place.
+    """
+    parts = {name: [] for name in ("feature", "threshold", "left", "missing_left", "value")}
+    roots, offset, max_depth = [], 0, 0
+    for left, right, feature, threshold, missing_left, value in trees:
+        order, depth, level = [0], 0, [0]
+        while True:
+            level = [child for node in level if left[node] != -1 for child in (left[node], right[node])]
+            if not level:
+                break
+            order.extend(level)
+            depth += 1
+        order = np.array(order)
+        position = np.empty(len(left), dtype=np.int64)
+        position[order] = np.arange(len(order)) + offset
+        leaf = left[order] == -1
+        parts["feature"].append(np.where(leaf, 0, feature[order]).astype(np.int32))
+        parts["threshold"].append(np.where(leaf, np.float32(np.inf), threshold[order]).astype(np.float32))
+        parts["left"].append(np.where(leaf, position[order], position[np.maximum(left[order], 0)]).astype(np.int32))
+        parts["missing_left"].append(np.where(leaf, True, np.asarray(missing_left, dtype=bool)[order]))
+        parts["value"].append(value[order])
+        roots.append(offset)
+        offset += len(order)
+        max_depth = max(max_depth, depth)
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    return dict(arrays, roots=np.array(roots, dtype=np.int32), max_depth=max_depth)
+
+
+def _softmax(margins: np.ndarray) -> np.ndarray:
+    # XGBoost's Softmax: float32 exp of shifted margins, double-precision sum, float32 divide
+    shifted = margins - margins.max(axis=1, keepdims=True)
+    exps = np.exp(shifted.astype(np.float64)).astype(np.float32)
+    total = np.zeros(len(margins), dtype=np.float64)
+    for c in range(margins.shape[1]):
+        total += exps[:, c]
+    return exps / total.astype(np.float32)[:, None]
+
+
+class TreePredictor:
+    """`predict_proba` front end that picks the flattened or the native evaluator per call.
+
+    Batches up to the model kind's row limit go to the flattened ensemble; bigger ones, or
+    models that cannot be flattened, use the model's own `predict_proba`.
+    """
+
+    def __init__(
+        self,
+        model,
+        enabled: bool = FLAT_TREES_ENABLED,
+        max_rows: Optional[int] = None,
+        flat: Optional[FlatTreeEnsemble] = None,
+    ):
+        self.model = model
+        self.classes_ = model.classes_
+        self.flat: Optional[FlatTreeEnsemble] = None
+        self.max_rows = 0
+        if enabled:
+            try:
+                # A prebuilt (e.g. memory-mapped) ensemble skips flattening the model again
+                self.flat = flat if flat is not None else FlatTreeEnsemble.from_model(model)
+                self.max_rows = max_rows if max_rows is not None else FLAT_TREES_MAX_ROWS[self.flat.kind]
+                logger.info(
+                    f"Flattened {type(model).__name__}: {self.flat.n_trees} trees, {self.flat.n_nodes} nodes, "
+                    f"depth {self.flat.max_depth}, {self.flat.nbytes / 1024:.0f} KiB; used for batches up to {self.max_rows} rows."
+                )
+            except Exception as e:
+                logger.warning(f"Using native predict_proba for {type(model).__name__}: {str(e)}")
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.flat is not None and len(X) <= self.max_rows:
+            return self.flat.predict_proba(X)
+        return self.model.predict_proba(X)
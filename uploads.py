@@ -0,0 +1,243 @@
+from fastapi import UploadFile
+import pandas as pd
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Union
+import io
+import logging
+
+from executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+
+# Bulk uploads may be CSV, Parquet or Arrow IPC (file or stream format)
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+# Arrow IPC streams open with a continuation marker before the first message
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+PARQUET_CONTENT_TYPES = {"application/vnd.apache.parquet", "application/parquet", "application/x-parquet"}
+ARROW_CONTENT_TYPES = {"application/vnd.apache.arrow.file", "application/vnd.apache.arrow.stream", "application/x-arrow"}
+
+UPLOAD_FORMATS = ("csv", "parquet", "arrow")
+
+# Text fields with a handful of distinct values, held as pandas categoricals (integer codes)
+CATEGORY_COLUMNS = ["Gender", "Department", "JobRole", "OverTime"]
+
+# CSV bytes scanned per read when counting rows
+COUNT_BLOCK_BYTES = 1 << 20
+
+# A whole upload as bytes, or a binary file positioned at its start
+UploadSource = Union[bytes, BinaryIO]
+
+
+def detect_format(head: bytes, content_type: Optional[str] = None) -> str:
+    """Upload format from its first bytes, falling back to the declared content type, then CSV.
+
+    Magic bytes win over the content type, since clients often send every file as
+    application/octet-stream.
+    """
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(ARROW_FILE_MAGIC) or head.startswith(ARROW_STREAM_MAGIC):
+        return "arrow"
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in PARQUET_CONTENT_TYPES:
+        return "parquet"
+    if media_type in ARROW_CONTENT_TYPES:
+        return "arrow"
+    return "csv"
+
+
+async def detect_upload_format(file: UploadFile) -> str:
+    """Sniff an upload's format without consuming it."""
+    head = await file.read(len(ARROW_FILE_MAGIC))
+    await file.seek(0)
+    return detect_format(head, file.content_type)
+
+
+async def upload_source(file: UploadFile, executor: InferenceExecutor) -> UploadSource:
+    """What a bulk scoring function on `executor` parses the upload from.
+
+    Thread workers read Starlette's spooled file directly, so the raw upload is never
+    held in memory next to the frame parsed from it. Worker processes cannot be sent a
+    file object and get the bytes instead.
+    """
+    if executor.kind == "process":
+        return await file.read()
+    await file.seek(0)
+    return file.file
+
+
+def _present(names: Sequence[str], columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    # Absent columns are left out here and reported by the scoring function's column check
+    if columns is None:
+        return None
+    return [column for column in columns if column in names]
+
+
+def csv_options(columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """`read_csv` arguments that keep only `columns` and parse the text fields straight to categoricals."""
+    options: Dict[str, Any] = {"dtype": {column: "category" for column in CATEGORY_COLUMNS}}
+    if columns is not None:
+        wanted = set(columns)
+        options["usecols"] = lambda name: name in wanted
+    return options
+
+
+def compact_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a parsed upload in place and return it.
+
+    CATEGORY_COLUMNS become categoricals and integer columns take the smallest integer
+    dtype that holds their values, so a 1-5 score is one byte per row instead of eight.
+    Float columns stay float64: the models' scalers compute in the input's precision, so
+    float32 inputs would change their outputs.
+    """
+    for column in data.columns:
+        dtype = data[column].dtype
+        if column in CATEGORY_COLUMNS:
+            if not isinstance(dtype, pd.CategoricalDtype):
+                data[column] = data[column].astype("category")
+        elif pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype) and dtype.itemsize > 1:
+            data[column] = pd.to_numeric(data[column], downcast="integer")
+    return data
+
+
+def table_to_frame(table, start: int = 0) -> pd.DataFrame:
+    """Arrow table to a compact pandas frame with as few copies as possible.
+
+    CATEGORY_COLUMNS are dictionary-encoded in Arrow and arrive as categoricals; other
+    dictionary-encoded columns are decoded to plain values like the CSV path produces.
+    Blocks are not consolidated, and each Arrow column is released as soon as it has been
+    converted.
+    """
+    import pyarrow as pa
+
+    for i, field in enumerate(table.schema):
+        if field.name in CATEGORY_COLUMNS:
+            if not pa.types.is_dictionary(field.type) and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+                table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+        elif pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    data = table.to_pandas(split_blocks=True, self_destruct=True)
+    data.index = pd.RangeIndex(start, start + len(data))
+    return compact_frame(data)
+
+
+def _open_arrow(source: Any):
+    import pyarrow as pa
+
+    if isinstance(source, str):
+        source = pa.memory_map(source)
+
+    head = source.read(len(ARROW_FILE_MAGIC)) if hasattr(source, "read") else bytes(source[:len(ARROW_FILE_MAGIC)])
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if head == ARROW_FILE_MAGIC:
+        return pa.ipc.open_file(source)
+    return pa.ipc.open_stream(source)
+
+
+def read_upload(source: UploadSource, fmt: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Parse a whole upload into one compact frame. Only `columns` are kept; Parquet and Arrow skip type inference."""
+    if fmt == "csv":
+        return compact_frame(pd.read_csv(io.BytesIO(source) if isinstance(source, bytes) else source, **csv_options(columns)))
+
+    import pyarrow as pa
+
+    if isinstance(source, bytes):
+        source = pa.py_buffer(source)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(pa.BufferReader(source) if isinstance(source, pa.Buffer) else source)
+        table = parquet_file.read(columns=_present(parquet_file.schema_arrow.names, columns))
+    elif fmt == "arrow":
+        table = _open_arrow(source).read_all()
+        selected = _present(table.schema.names, columns)
+        if selected is not None:
+            # Arrow buffers are referenced, not copied, so selecting after the read is free
+            table = table.select(selected)
+    else:
+        raise ValueError(f"Unknown upload format: {fmt}. Use one of {list(UPLOAD_FORMATS)}.")
+    return table_to_frame(table)
+
+
+def iter_table_chunks(
+    source: Any,
+    fmt: str,
+    chunk_rows: int,
+    columns: Optional[Sequence[str]] = None,
+    skip_rows: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """Read a Parquet or Arrow IPC file (path or file object) in chunks of at most `chunk_rows` rows.
+
+    The first `skip_rows` rows are passed over without converting them to pandas; chunk
+    indexes still count from the start of the file.
+    """
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        batches = parquet_file.iter_batches(batch_size=chunk_rows, columns=_present(parquet_file.schema_arrow.names, columns))
+    elif fmt == "arrow":
+        reader = _open_arrow(source)
+        selected = _present(reader.schema.names, columns)
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+        if selected is not None:
+            batches = (batch.select(selected) for batch in batches)
+    else:
+        raise ValueError(f"Unknown upload format: {fmt}. Use one of {list(UPLOAD_FORMATS)}.")
+
+    start = 0
+    for batch in batches:
+        if start + batch.num_rows <= skip_rows:
+            start += batch.num_rows
+            continue
+        if start < skip_rows:
+            batch = batch.slice(skip_rows - start)
+            start = skip_rows
+        for offset in range(0, batch.num_rows, chunk_rows):
+            piece = batch.slice(offset, chunk_rows)
+            yield table_to_frame(pa.Table.from_batches([piece]), start)
+            start += piece.num_rows
+
+
+def count_upload_rows(source: UploadSource, fmt: str) -> int:
+    """Rows in an upload without parsing it: CSV line breaks, the Parquet footer, or Arrow batch headers.
+
+    A file source is left positioned at its start.
+    """
+    if fmt == "csv":
+        if isinstance(source, bytes):
+            lines, last = source.count(b"\n"), source[-1:]
+        else:
+            lines, last = 0, b""
+            while True:
+                block = source.read(COUNT_BLOCK_BYTES)
+                if not block:
+                    break
+                lines += block.count(b"\n")
+                last = block[-1:]
+            source.seek(0)
+        # Minus the header line; the last row may not end with a line break
+        return max(lines - 1 + (last not in (b"", b"\n")), 0)
+
+    import pyarrow as pa
+
+    buffer = pa.py_buffer(source) if isinstance(source, bytes) else source
+    try:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.ParquetFile(pa.BufferReader(buffer) if isinstance(buffer, pa.Buffer) else buffer).metadata.num_rows
+        reader = _open_arrow(buffer)
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return sum(batch.num_rows for batch in reader)
+    finally:
+        if not isinstance(source, bytes):
+            source.seek(0)
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Columns every employee record must carry for the attrition and performance models
+EMPLOYEE_COLUMNS = [
+    "Age", "Gender", "Department", "JobRole", "MonthlyIncome", "YearsAtCompany",
+    "OverTime", "JobSatisfaction", "WorkLifeBalance", "TotalWorkingYears",
+    "TrainingTimesLastYear", "JobInvolvement", "EnvironmentSatisfaction",
+    "RelationshipSatisfaction"
+]
+
+# Optional employee identifier; uploads that carry it are scored and tracked per employee
+KEY_COLUMN = "EmployeeNumber"
+UPLOAD_COLUMNS = EMPLOYEE_COLUMNS + [KEY_COLUMN]
+
+LIKERT_FIELDS = ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "EnvironmentSatisfaction", "RelationshipSatisfaction"]
+
+MAX_REPORTED_ERRORS = 10
+
+
+class Rule:
+    """A single column check, evaluated as a boolean violation mask over a whole column."""
+
+    kind = "rule"
+    skip_missing = True
+
+    def __init__(self, field: str):
+        self.field = field
+
+    @property
+    def name(self) -> str:
+        return f"{self.field}:{self.kind}"
+
+    def message(self) -> str:
+        raise NotImplementedError
+
+    def check(self, values: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def violations(self, values: np.ndarray) -> np.ndarray:
+        """Return a mask of rows breaking the rule; missing numeric values are not checked."""
+        if self.skip_missing:
+            missing = pd.isna(values)
+            if missing.any():
+                mask = np.zeros(len(values), dtype=bool)
+                present = ~missing
+                mask[present] = self.check(values[present])
+                return mask
+        return self.check(values)
+
+
+class RangeRule(Rule):
+    kind = "range"
+
+    def __init__(self, field: str, low: float, high: float):
+        super().__init__(field)
+        self.low = low
+        self.high = high
+
+    def message(self) -> str:
+        return f"{self.field} must be between {self.low} and {self.high}."
+
+    def check(self, values: np.ndarray) -> np.ndarray:
+        return (values < self.low) | (values > self.high)
+
+
+class NonNegativeRule(Rule):
+    kind = "non_negative"
+
+    def message(self) -> str:
+        return f"{self.field} cannot be negative."
+
+    def check(self, values: np.ndarray) -> np.ndarray:
+        return values < 0
+
+
+class PositiveRule(Rule):
+    kind = "positive"
+
+    def message(self) -> str:
+        return f"{self.field} must be greater than 0."
+
+    def check(self, values: np.ndarray) -> np.ndarray:
+        return values <= 0
+
+
+class AllowedValuesRule(Rule):
+    kind = "allowed_values"
+    # Missing categories are reported, matching `value not in [...]`
+    skip_missing = False
+
+    def __init__(self, field: str, allowed: Sequence[str]):
+        super().__init__(field)
+        self.allowed = list(allowed)
+
+    def message(self) -> str:
+        return f"{self.field} must be " + " or ".join(f"'{value}'" for value in self.allowed) + "."
+
+    def check(self, values: np.ndarray) -> np.ndarray:
+        return ~pd.Series(values).isin(self.allowed).to_numpy()
+
+
+# Rule tables for each service, in the order violations are reported for a row
+ATTRITION_RULES: List[Rule] = (
+    [RangeRule(field, 1, 5) for field in LIKERT_FIELDS]
+    + [
+        AllowedValuesRule("OverTime", ["Yes", "No"]),
+        RangeRule("Age", 18, 100),
+        PositiveRule("MonthlyIncome"),
+        NonNegativeRule("YearsAtCompany"),
+        NonNegativeRule("TotalWorkingYears"),
+        NonNegativeRule("TrainingTimesLastYear"),
+        AllowedValuesRule("Gender", ["Male", "Female"]),
+    ]
+)
+
+PERFORMANCE_RULES: List[Rule] = (
+    [RangeRule(field, 1, 5) for field in LIKERT_FIELDS]
+    + [
+        PositiveRule("MonthlyIncome"),
+        NonNegativeRule("Age"),
+        NonNegativeRule("YearsAtCompany"),
+        NonNegativeRule("TotalWorkingYears"),
+        NonNegativeRule("TrainingTimesLastYear"),
+        AllowedValuesRule("OverTime", ["Yes", "No"]),
+        AllowedValuesRule("Gender", ["Male", "Female"]),
+    ]
+)
+
+RETENTION_RULES: List[Rule] = (
+    [RangeRule(field, 1, 5) for field in ["JobSatisfaction", "WorkLifeBalance", "JobInvolvement", "PerformanceRating"]]
+    + [
+        AllowedValuesRule("OverTime", ["Yes", "No"]),
+        AllowedValuesRule("Gender", ["Male", "Female"]),
+    ]
+)
+
+# Retention checks split into those on the request and the one on the predicted rating
+RETENTION_INPUT_RULES: List[Rule] = [rule for rule in RETENTION_RULES if rule.field != "PerformanceRating"]
+RATING_RULES: List[Rule] = [rule for rule in RETENTION_RULES if rule.field == "PerformanceRating"]
+
+
+def merge_rules(*rule_tables: List[Rule]) -> List[Rule]:
+    """One table covering several services' inputs, each shared check kept once, in first-seen order."""
+    merged: Dict[Tuple[str, str], Rule] = {}
+    for rules in rule_tables:
+        for rule in rules:
+            merged.setdefault((rule.name, rule.message()), rule)
+    return list(merged.values())
+
+
+@dataclass
+class ValidationReport:
+    errors: List[str] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def total_violations(self) -> int:
+        return sum(self.counts.values())
+
+
+def column_violations(rule: Rule, column: pd.Series) -> np.ndarray:
+    """`rule.violations` over a column; categoricals are checked once per category, not per row."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # The extra trailing slot stands for missing values, which have code -1
+        categories = np.append(column.cat.categories.to_numpy(dtype=object), None)
+        return rule.violations(categories)[column.cat.codes.to_numpy()]
+    return rule.violations(column.to_numpy())
+
+
+def validate_frame(data: pd.DataFrame, rules: List[Rule], max_errors: int = MAX_REPORTED_ERRORS) -> ValidationReport:
+    """Validate a DataFrame column-wise against a rule table.
+
+    Messages are ordered row by row, then by rule order, like the original per-row loops,
+    and only the first `max_errors` are kept. Counts cover every violation.
+    """
+    report = ValidationReport()
+    hits: List[Tuple[int, int]] = []
+    for rule_idx, rule in enumerate(rules):
+        mask = column_violations(rule, data[rule.field])
+        positions = np.flatnonzero(mask)
+        report.counts[rule.name] = int(len(positions))
+        # Any of the first `max_errors` messages overall is among the first `max_errors` of its rule
+        hits.extend((int(pos), rule_idx) for pos in positions[:max_errors])
+    hits.sort()
+    index = data.index
+    report.errors = [f"Row {index[pos]}: {rules[rule_idx].message()}" for pos, rule_idx in hits[:max_errors]]
+    return report
+
+
+def validate_record(record: Dict[str, Any], rules: List[Rule]) -> List[str]:
+    """Validate a single record against a rule table, returning messages without a row prefix."""
+    errors = []
+    for rule in rules:
+        values = np.array([record.get(rule.field)], dtype=object if isinstance(rule, AllowedValuesRule) else float)
+        if rule.violations(values)[0]:
+            errors.append(rule.message())
+    return errors